@@ -330,6 +330,21 @@ export class WebSocketApiAdapter extends ApiAdapter {
           resumePending = false;
         }
         
+        // Replayed history arrives in pages; newest/forward pages render like live
+        // chat.text events, older pages (client.replay_page) are prepended by the page.
+        if (data.type === 'chat.replay_batch' && data.data?.direction !== 'older') {
+          const page = data.data || {};
+          if (callbacks.onMessage) {
+            (page.messages || []).forEach((item) => {
+              callbacks.onMessage({ type: 'chat.text', data: item, timestamp: data.timestamp });
+            });
+          }
+          if (page.has_more_before && callbacks.onMessage) {
+            callbacks.onMessage({ type: 'chat.replay_cursor', data: { before_index: page.start_index } });
+          }
+          return;
+        }
+
         // Production: Only handle chat.* namespace events
         if (callbacks.onMessage) callbacks.onMessage(data);
         
@@ -368,6 +383,12 @@ export class WebSocketApiAdapter extends ApiAdapter {
         }
         return false;
       },
+      // Request the page of history before beforeIndex (arrives as chat.replay_batch, direction 'older')
+      requestOlderHistory: (beforeIndex, limit) => {
+        if (socket.readyState !== WebSocket.OPEN || typeof beforeIndex !== 'number' || beforeIndex <= 0) return false;
+        socket.send(JSON.stringify({ type: 'client.replay_page', chat_id: chatId, beforeIndex, ...(limit ? { limit } : {}) }));
+        return true;
+      },
       close: () => {
         try {
           socket.close();
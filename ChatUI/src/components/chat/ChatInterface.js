@@ -154,6 +154,7 @@ const ModernChatInterface = ({
   onRetry,
   submitInputRequest,
   onBrandClick, // Optional callback when brand/logo clicked
+  onReachTop, // Optional callback when scrolled to the top (loads older replayed history)
   isOnChatPage = true // Whether we're on the primary chat page (not discovery/workflows)
 }) => {
   const [message, setMessage] = useState('');
@@ -200,6 +201,7 @@ const ModernChatInterface = ({
       const isAtBottom = scrollHeight - scrollTop - clientHeight < 50;
       const hasScrolledUp = scrollTop > 100;
       setIsScrolledUp(!isAtBottom && hasScrolledUp);
+      if (scrollTop < 40 && onReachTop) onReachTop();
     }
   };
   
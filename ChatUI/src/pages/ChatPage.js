@@ -220,6 +220,9 @@ const ChatPage = () => {
   useEffect(() => { messagesRef.current = messages; }, [messages]);
   const [ws, setWs] = useState(null);
   const wsRef = useRef(null);
+  // Index of the oldest replayed message still missing above the transcript (null = full history shown)
+  const replayCursorRef = useRef(null);
+  const replayPagePendingRef = useRef(false);
   const [loading, setLoading] = useState(true);
   const setMessagesWithLogging = useCallback(updater => setMessages(prev => typeof updater==='function'?updater(prev):updater), []);
   const [connectionStatus, setConnectionStatus] = useState('disconnected');
@@ -1463,6 +1466,33 @@ const ChatPage = () => {
       case 'input_ack':
         // Acknowledgment: no UI mutation needed
         return;
+      case 'replay_cursor':
+        replayCursorRef.current = data.data?.before_index ?? null;
+        return;
+      case 'replay_batch': {
+        // Older history page (client.replay_page): prepend in order above the current transcript
+        const page = data.data || {};
+        const older = (page.messages || [])
+          .filter((m) => m && String(m.content || '').trim())
+          .map((m) => {
+            const isUser = String(m.role || '').toLowerCase() === 'user' || String(m.agent || '').toLowerCase() === 'user';
+            return {
+              id: `replay-${m.index}`,
+              sender: isUser ? 'user' : 'agent',
+              agentName: isUser ? 'You' : extractAgentName(m),
+              content: m.content,
+              isStreaming: false,
+              isStructuredCapable: !!m.is_structured_capable,
+              isVisual: !!m.is_visual,
+              isToolAgent: !!m.is_tool_agent,
+              metadata: m.metadata || {},
+            };
+          });
+        replayCursorRef.current = page.has_more_before ? page.start_index : null;
+        replayPagePendingRef.current = false;
+        if (older.length) setMessagesWithLogging(prev => [...older, ...prev]);
+        return;
+      }
       case 'resume_boundary':
   // Replay boundary marker: insert a divider system note
   setMessagesWithLogging(prev => [...prev, { id:`resume-${Date.now()}`, sender:'system', agentName:'System', content:`🔄 Session replay complete. Live events resumed.`, isStreaming:false }]);
@@ -1472,6 +1502,12 @@ const ChatPage = () => {
     }
   }, [currentChatId, currentWorkflowName, setMessagesWithLogging, extractAgentName, isSidePanelOpen, showInitSpinner, setLayoutMode, isMobileView, mobileDrawerState, setConversationMode, setActiveGeneralChatId, setGeneralChatSummary, hydrateGeneralTranscript, refreshGeneralSessions, setActiveChatId, setActiveWorkflowName, setCurrentChatId]);
 
+  const loadOlderHistory = useCallback(() => {
+    const beforeIndex = replayCursorRef.current;
+    if (beforeIndex == null || replayPagePendingRef.current) return;
+    if (wsRef.current?.requestOlderHistory?.(beforeIndex)) replayPagePendingRef.current = true;
+  }, []);
+
   // Debug: Log spinner state changes
   useEffect(() => {
     console.log('🧹 [SPINNER] State changed to:', showInitSpinner);
@@ -2672,6 +2708,7 @@ useEffect(() => {
     <ChatInterface 
       messages={messages} 
       onSendMessage={sendMessage} 
+      onReachTop={loadOlderHistory}
       loading={loading}
       onAgentAction={handleAgentAction}
       onArtifactToggle={artifactToggleHandler}
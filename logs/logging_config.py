@@ -5,7 +5,8 @@
 # ======================================================================
 from __future__ import annotations
 
-import logging, logging.handlers, json, traceback, re
+import logging, logging.handlers, json, traceback, re, queue, atexit, textwrap
+from collections import Counter
 from time import perf_counter
 from pathlib import Path
 import os
@@ -52,6 +53,35 @@ try:
 except ValueError:
     LOG_MESSAGE_TRUNCATE_LIMIT = 0
 
+# Queue mode: handlers run on background QueueListener threads so log calls on the
+# event loop only enqueue a record (no file/console I/O or rotation inline).
+LOGS_QUEUE_ENABLED = os.getenv("LOGS_QUEUE_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+try:
+    LOGS_QUEUE_MAX = max(1, int(os.getenv("LOGS_QUEUE_MAX", "10000")))
+except ValueError:
+    LOGS_QUEUE_MAX = 10000
+# How long a WARNING+ record may wait for queue space when nothing lower-level can be evicted.
+try:
+    LOGS_QUEUE_BLOCK_MS = max(0, int(os.getenv("LOGS_QUEUE_BLOCK_MS", "100")))
+except ValueError:
+    LOGS_QUEUE_BLOCK_MS = 100
+
+
+def _resolve_agent_log_limit(env_key: str, default: Optional[int]) -> Optional[int]:
+    """Resolve agent conversation log length limits from environment."""
+    raw_value = os.getenv(env_key)
+    if raw_value is None:
+        return default
+    try:
+        parsed = int(raw_value.strip())
+    except ValueError:
+        return default
+    return None if parsed <= 0 else parsed
+
+
+AGENT_CONV_JSON_MAX_LEN = _resolve_agent_log_limit("AGENT_CONV_JSON_MAX_LEN", None)
+AGENT_CONV_TEXT_MAX_LEN = _resolve_agent_log_limit("AGENT_CONV_TEXT_MAX_LEN", None)
+
 # Sensitive key substrings for redaction
 _SENSITIVE_KEYS = {"api_key", "apikey", "authorization", "auth", "secret", "password", "token"}
 
@@ -255,6 +285,162 @@ class PrettyConsoleFormatter(logging.Formatter):
             base += "\n" + "".join(traceback.format_exception(*record.exc_info)).rstrip()
         return base
 
+class AgentConversationFormatter(PrettyConsoleFormatter):
+    """Renders agent transcript records as a readable block.
+
+    Callers log the raw message via ``extra`` (``agent_name``, ``agent_content``,
+    ``chat_id``, ``app_id``, ``sequence``, ``event_id``); JSON pretty-printing,
+    truncation and wrapping happen here, i.e. on the listener thread in queue mode.
+    """
+    def __init__(self, *, json_max_len: Optional[int] = None, text_max_len: Optional[int] = None):
+        super().__init__(no_color=True, max_length=0)  # Keep conversation transcripts intact
+        self.json_max_len = json_max_len
+        self.text_max_len = text_max_len
+
+    def render_body(self, content_str: str) -> str:
+        display_content = content_str
+        is_json = False
+        stripped = content_str.strip()
+        if stripped.startswith('{') or stripped.startswith('['):
+            try:
+                display_content = json.dumps(json.loads(content_str), indent=2, ensure_ascii=False)
+                is_json = True
+            except Exception:
+                # Not valid JSON, use as-is
+                pass
+
+        max_len = self.json_max_len if is_json else self.text_max_len
+        truncated_suffix = ""
+        if max_len is not None and len(display_content) > max_len:
+            display_content = display_content[:max_len]
+            truncated_suffix = "\n... (truncated)"
+
+        if not is_json and display_content:
+            wrapped_lines: list[str] = []
+            for raw_line in display_content.splitlines() or [display_content]:
+                if not raw_line.strip():
+                    wrapped_lines.append("")
+                    continue
+                wrapped_lines.extend(
+                    textwrap.wrap(raw_line, width=100, break_long_words=False, break_on_hyphens=False)
+                )
+            display_content = "\n".join(wrapped_lines)
+
+        if truncated_suffix:
+            display_content = f"{display_content}{truncated_suffix}"
+        return display_content if display_content else "(empty)"
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "agent_content"):
+            return super().format(record)
+        separator = "=" * 80
+        meta_lines = [
+            f"agent: {getattr(record, 'agent_name', 'unknown')}",
+            f"chat_id: {getattr(record, 'chat_id', None)}",
+            f"app_id: {getattr(record, 'app_id', None)}",
+            f"sequence: {getattr(record, 'sequence', None)}",
+            f"event_id: {getattr(record, 'event_id', None)}",
+        ]
+        block = logging.makeLogRecord(record.__dict__)
+        block.msg = f"\n{separator}\n" + "\n".join(meta_lines) + f"\n{separator}\n{self.render_body(str(record.agent_content))}\n"
+        block.args = None
+        return super().format(block)
+
+# ----------------------------------------------------------------------
+# Queue-based (non-blocking) handlers
+# ----------------------------------------------------------------------
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that drops (and counts) records when full.
+
+    Only records below WARNING are ever dropped outright. A WARNING+ record that
+    finds the queue full evicts the oldest queued lower-level record; if there is
+    none it blocks up to ``block_sec`` for space and is counted as dropped only
+    when the listener is still stuck after that.
+    """
+
+    def __init__(self, name: str, maxsize: int, block_sec: float = LOGS_QUEUE_BLOCK_MS / 1000.0):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.name = name
+        self.block_sec = block_sec
+        self.enqueued = 0
+        self.evicted = 0
+        self.dropped: Counter[str] = Counter()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+            return
+        except queue.Full:
+            pass
+        if record.levelno >= logging.WARNING:
+            if self._evict_lower(record):
+                return
+            try:
+                self.queue.put(record, timeout=self.block_sec)
+                self.enqueued += 1
+                return
+            except queue.Full:
+                pass
+        self.dropped[record.levelname] += 1
+
+    def _evict_lower(self, record: logging.LogRecord) -> bool:
+        """Swap the oldest queued record below WARNING for ``record`` (queue size unchanged)."""
+        q = self.queue
+        with q.mutex:
+            for index, queued in enumerate(q.queue):
+                if queued.levelno < logging.WARNING:
+                    del q.queue[index]
+                    q.queue.append(record)
+                    self.dropped[queued.levelname] += 1
+                    self.evicted += 1
+                    self.enqueued += 1
+                    return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "depth": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": sum(self.dropped.values()),
+            "dropped_by_level": dict(self.dropped),
+            "evicted": self.evicted,
+        }
+
+
+_queue_handlers: list[DroppingQueueHandler] = []
+_queue_listeners: list[logging.handlers.QueueListener] = []
+
+
+def _queued(name: str, handlers: Sequence[logging.Handler]) -> logging.Handler:
+    """Wrap ``handlers`` behind a bounded queue drained by a listener thread."""
+    qh = DroppingQueueHandler(name, LOGS_QUEUE_MAX)
+    listener = logging.handlers.QueueListener(qh.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _queue_handlers.append(qh)
+    _queue_listeners.append(listener)
+    return qh
+
+
+def stop_logging_listeners() -> None:
+    """Drain queued records and stop listener threads (safe to call repeatedly)."""
+    while _queue_listeners:
+        listener = _queue_listeners.pop()
+        try:
+            listener.stop()
+        except Exception:
+            pass
+    _queue_handlers.clear()
+
+
+def get_logging_queue_stats() -> Dict[str, Any]:
+    """Per-queue depth, enqueue and drop counters (empty when queue mode is off)."""
+    return {qh.name: qh.snapshot() for qh in _queue_handlers}
+
+
+atexit.register(stop_logging_listeners)
+
 # ----------------------------------------------------------------------
 # Generic keyword / level filter
 # ----------------------------------------------------------------------
@@ -322,6 +508,9 @@ def setup_logging(
     """
     Configure root logger with two rotating file handlers (chat + workflows) + console.
     Prevents duplicate initialization with global flag.
+
+    With LOGS_QUEUE_ENABLED (default) the handlers sit behind bounded queues and
+    run on listener threads; callers only pay for an enqueue.
     """
     global _logging_initialized
     if _logging_initialized: return
@@ -371,22 +560,27 @@ def setup_logging(
         max_bytes=max_file_size, 
         backup_count=backup_count
     )
-    root.addHandler(file_handler)
-    ch = logging.StreamHandler(); ch.setLevel(getattr(logging, console_level.upper())); ch.setFormatter(console_fmt); root.addHandler(ch)
+    ch = logging.StreamHandler(); ch.setLevel(getattr(logging, console_level.upper())); ch.setFormatter(console_fmt)
+    if LOGS_QUEUE_ENABLED:
+        root.addHandler(_queued("root", [file_handler, ch]))
+    else:
+        root.addHandler(file_handler)
+        root.addHandler(ch)
     
     # Dedicated handler for agent conversation messages
     agent_conv_file = LOGS_DIR / "agent_conversations.log"
     agent_conv_handler = _make_handler(
         agent_conv_file,
         logging.INFO,
-        PrettyConsoleFormatter(no_color=True, max_length=0),  # Keep conversation transcripts intact
+        AgentConversationFormatter(json_max_len=AGENT_CONV_JSON_MAX_LEN, text_max_len=AGENT_CONV_TEXT_MAX_LEN),
         log_filter=None,
         max_bytes=max_file_size,
         backup_count=backup_count
     )
     # Only attach to the agent_messages logger (created in log_conversation_to_agent_chat_file)
     agent_messages_logger = logging.getLogger("mozaiks.workflow.agent_messages")
-    agent_messages_logger.addHandler(agent_conv_handler)
+    agent_messages_logger.handlers.clear()
+    agent_messages_logger.addHandler(_queued("agent_messages", [agent_conv_handler]) if LOGS_QUEUE_ENABLED else agent_conv_handler)
     agent_messages_logger.setLevel(logging.INFO)
     # Don't propagate to root to avoid duplication in mozaiks.log
     agent_messages_logger.propagate = False
@@ -400,6 +594,7 @@ def setup_logging(
             "files_as_json": LOGS_AS_JSON,
             "file_extension": ".log",
             "file_format": "jsonl" if LOGS_AS_JSON else "pretty",
+            "queue_mode": LOGS_QUEUE_ENABLED,
             "cleared_on_start": clear_flag,
             "cleared_files_count": len(cleared_files),
         },
@@ -413,6 +608,7 @@ def setup_logging(
 def reset_logging_state():
     """Reset logging initialization state for testing purposes"""
     global _logging_initialized; _logging_initialized = False
+    stop_logging_listeners()
 
 # Public getters -----------------------------------------------------
 # Enhanced core module loggers
@@ -42,6 +42,7 @@ class AuthConfig:
     # Caching TTLs
     jwks_cache_ttl_seconds: int = 3600  # 1 hour
     discovery_cache_ttl_seconds: int = 86400  # 24 hours
+    verified_token_cache_size: int = 1024  # 0 disables the verified-token LRU
 
     # Allowed algorithms
     algorithms: List[str] = field(default_factory=lambda: ["RS256"])
@@ -103,6 +104,7 @@ def get_auth_config() -> AuthConfig:
     Cache Variables:
         AUTH_JWKS_CACHE_TTL: JWKS cache TTL in seconds (default: 3600)
         AUTH_DISCOVERY_CACHE_TTL: Discovery cache TTL in seconds (default: 86400)
+        AUTH_VERIFIED_TOKEN_CACHE_SIZE: Max already-verified tokens kept in memory (default: 1024, 0 = off)
 
     Other Variables:
         AUTH_ALGORITHMS: Comma-separated list of allowed algorithms (default: RS256)
@@ -135,6 +137,7 @@ def get_auth_config() -> AuthConfig:
         # Cache TTLs
         jwks_cache_ttl_seconds=int(os.getenv("AUTH_JWKS_CACHE_TTL", "3600")),
         discovery_cache_ttl_seconds=int(os.getenv("AUTH_DISCOVERY_CACHE_TTL", "86400")),
+        verified_token_cache_size=int(os.getenv("AUTH_VERIFIED_TOKEN_CACHE_SIZE", "1024")),
         # Other
         algorithms=algorithms,
         clock_skew_seconds=int(os.getenv("AUTH_CLOCK_SKEW", "120")),
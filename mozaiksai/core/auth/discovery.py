@@ -6,6 +6,7 @@ Fetches the OpenID Connect discovery document to obtain:
 - issuer: Expected token issuer
 
 This makes JWT validation provider-agnostic by dynamically discovering endpoints.
+Refresh is stale-while-revalidate and single-flight (see auth.refresh).
 """
 
 import asyncio
@@ -16,6 +17,7 @@ from dataclasses import dataclass
 
 import aiohttp
 
+from mozaiksai.core.auth.refresh import SingleFlightRefresher, get_refresh_ahead_ratio, get_stale_grace_seconds
 from logs.logging_config import get_core_logger
 
 logger = get_core_logger("auth.discovery")
@@ -38,6 +40,12 @@ class CachedDiscovery:
     def is_expired(self) -> bool:
         return time.time() > (self.fetched_at + self.ttl_seconds)
 
+    def refresh_due(self, ratio: float) -> bool:
+        return time.time() > (self.fetched_at + self.ttl_seconds * ratio)
+
+    def within_grace(self, grace_seconds: int) -> bool:
+        return time.time() <= (self.fetched_at + self.ttl_seconds + grace_seconds)
+
     @property
     def jwks_uri(self) -> Optional[str]:
         return self.document.get("jwks_uri")
@@ -52,7 +60,7 @@ class OIDCDiscoveryClient:
     Async OIDC discovery client with in-memory caching.
 
     Fetches the .well-known/openid-configuration document and caches it.
-    Thread-safe via asyncio.Lock.
+    Fetches are single-flight: concurrent callers share one outbound request.
     """
 
     def __init__(
@@ -85,7 +93,9 @@ class OIDCDiscoveryClient:
             os.getenv("AUTH_DISCOVERY_CACHE_TTL", str(_DEFAULT_DISCOVERY_CACHE_TTL))
         )
         self._cache: Optional[CachedDiscovery] = None
-        self._lock = asyncio.Lock()
+        self._refresh_ahead_ratio = get_refresh_ahead_ratio()
+        self._stale_grace_seconds = get_stale_grace_seconds()
+        self._refresher = SingleFlightRefresher("OIDC discovery", lambda: self._fetch_discovery())
 
     @property
     def discovery_url(self) -> str:
@@ -100,12 +110,22 @@ class OIDCDiscoveryClient:
             CachedDiscovery with the document and metadata
 
         Raises:
-            RuntimeError on fetch failure (fail-closed)
+            RuntimeError on fetch failure with no usable cached document (fail-closed)
         """
-        if self._cache is not None and not self._cache.is_expired():
-            return self._cache
-
-        return await self._fetch_discovery()
+        cache = self._cache
+        if cache is not None:
+            if not cache.is_expired():
+                if cache.refresh_due(self._refresh_ahead_ratio):
+                    self._refresher.refresh_in_background()
+                return cache
+            if cache.within_grace(self._stale_grace_seconds):
+                # Serve the stale document while the IdP is slow or unreachable.
+                self._refresher.refresh_in_background()
+                return cache
+
+        await self._refresher.refresh()
+        assert self._cache is not None
+        return self._cache
 
     async def get_jwks_uri(self) -> str:
         """
@@ -139,55 +159,50 @@ class OIDCDiscoveryClient:
             raise RuntimeError("Discovery document missing issuer")
         return issuer
 
-    async def _fetch_discovery(self, force: bool = False) -> CachedDiscovery:
-        """Fetch OIDC discovery document from the identity provider."""
-        async with self._lock:
-            # Double-check after acquiring lock
-            if not force and self._cache is not None and not self._cache.is_expired():
-                return self._cache
-
-            logger.info(f"Fetching OIDC discovery from {self._discovery_url}")
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        self._discovery_url,
-                        timeout=aiohttp.ClientTimeout(total=10),
-                    ) as resp:
-                        if resp.status != 200:
-                            error_text = await resp.text()
-                            logger.error(
-                                f"OIDC discovery fetch failed: {resp.status} {error_text}"
-                            )
-                            raise RuntimeError(
-                                f"Failed to fetch OIDC discovery: {resp.status}"
-                            )
-
-                        document = await resp.json()
-
-                # Validate required fields
-                if "jwks_uri" not in document:
-                    raise RuntimeError("OIDC discovery missing jwks_uri")
-                if "issuer" not in document:
-                    raise RuntimeError("OIDC discovery missing issuer")
-
-                self._cache = CachedDiscovery(
-                    document=document,
-                    fetched_at=time.time(),
-                    ttl_seconds=self._cache_ttl,
-                )
-
-                logger.info(
-                    f"OIDC discovery loaded: issuer={document.get('issuer')}, "
-                    f"jwks_uri={document.get('jwks_uri')}"
-                )
-                return self._cache
-
-            except asyncio.TimeoutError:
-                logger.error("OIDC discovery fetch timed out")
-                raise RuntimeError("OIDC discovery fetch timed out")
-            except aiohttp.ClientError as e:
-                logger.error(f"OIDC discovery fetch client error: {e}")
-                raise RuntimeError(f"OIDC discovery fetch failed: {e}")
+    async def _fetch_discovery(self) -> CachedDiscovery:
+        """Fetch OIDC discovery document (called via the single-flight refresher)."""
+        logger.info(f"Fetching OIDC discovery from {self._discovery_url}")
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    self._discovery_url,
+                    timeout=aiohttp.ClientTimeout(total=10),
+                ) as resp:
+                    if resp.status != 200:
+                        error_text = await resp.text()
+                        logger.error(
+                            f"OIDC discovery fetch failed: {resp.status} {error_text}"
+                        )
+                        raise RuntimeError(
+                            f"Failed to fetch OIDC discovery: {resp.status}"
+                        )
+
+                    document = await resp.json()
+
+            # Validate required fields
+            if "jwks_uri" not in document:
+                raise RuntimeError("OIDC discovery missing jwks_uri")
+            if "issuer" not in document:
+                raise RuntimeError("OIDC discovery missing issuer")
+
+            self._cache = CachedDiscovery(
+                document=document,
+                fetched_at=time.time(),
+                ttl_seconds=self._cache_ttl,
+            )
+
+            logger.info(
+                f"OIDC discovery loaded: issuer={document.get('issuer')}, "
+                f"jwks_uri={document.get('jwks_uri')}"
+            )
+            return self._cache
+
+        except asyncio.TimeoutError:
+            logger.error("OIDC discovery fetch timed out")
+            raise RuntimeError("OIDC discovery fetch timed out")
+        except aiohttp.ClientError as e:
+            logger.error(f"OIDC discovery fetch client error: {e}")
+            raise RuntimeError(f"OIDC discovery fetch failed: {e}")
 
     def clear_cache(self) -> None:
         """Clear the discovery cache (useful for testing)."""
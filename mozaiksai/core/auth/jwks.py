@@ -3,6 +3,8 @@ JWKS (JSON Web Key Set) client with caching.
 
 Fetches public keys from the identity provider for JWT signature validation.
 Supports OIDC discovery-driven jwks_uri or explicit URL override.
+Parsed public key objects are kept per kid so requests do not rebuild them.
+Refresh is stale-while-revalidate and single-flight (see auth.refresh).
 """
 
 import asyncio
@@ -13,10 +15,15 @@ from dataclasses import dataclass
 import aiohttp
 
 from mozaiksai.core.auth.config import get_auth_config
+from mozaiksai.core.auth.refresh import SingleFlightRefresher, get_refresh_ahead_ratio, get_stale_grace_seconds
 from logs.logging_config import get_core_logger
 
 logger = get_core_logger("auth.jwks")
 
+# Minimum spacing between refetches triggered by unknown kids, so tokens with
+# bogus kids cannot turn into a stream of requests to the IdP.
+_UNKNOWN_KID_REFETCH_INTERVAL = 5.0
+
 
 @dataclass
 class CachedJWKS:
@@ -30,6 +37,12 @@ class CachedJWKS:
     def is_expired(self) -> bool:
         return time.time() > (self.fetched_at + self.ttl_seconds)
 
+    def refresh_due(self, ratio: float) -> bool:
+        return time.time() > (self.fetched_at + self.ttl_seconds * ratio)
+
+    def within_grace(self, grace_seconds: int) -> bool:
+        return time.time() <= (self.fetched_at + self.ttl_seconds + grace_seconds)
+
 
 class JWKSClient:
     """
@@ -39,7 +52,8 @@ class JWKSClient:
     1. Discovery-driven: jwks_uri obtained from OIDC discovery document
     2. Explicit URL: jwks_url set directly via constructor or AUTH_JWKS_URL env var
 
-    Thread-safe via asyncio.Lock.
+    Fetches are single-flight: concurrent callers (and background refreshes)
+    share one outbound request.
     """
 
     def __init__(
@@ -61,8 +75,12 @@ class JWKSClient:
         self._cache_ttl = cache_ttl or config.jwks_cache_ttl_seconds
         self._use_discovery = use_discovery and not self._explicit_jwks_url
         self._cache: Optional[CachedJWKS] = None
-        self._lock = asyncio.Lock()
+        self._refresh_ahead_ratio = get_refresh_ahead_ratio()
+        self._stale_grace_seconds = get_stale_grace_seconds()
+        self._refresher = SingleFlightRefresher("JWKS", lambda: self._fetch_keys())
+        self._last_unknown_kid_refetch = 0.0
         self._keys_by_kid: Dict[str, Dict[str, Any]] = {}
+        self._public_keys_by_kid: Dict[str, Any] = {}
         self._resolved_jwks_url: Optional[str] = None
 
     async def _get_jwks_url(self) -> str:
@@ -100,72 +118,114 @@ class JWKSClient:
         if key:
             return key
 
-        # Key not found - force refresh in case of key rotation
-        logger.info(f"Key {kid} not found, forcing JWKS refresh")
-        await self._fetch_keys(force=True)
+        # Key not found - refetch in case of key rotation. Concurrent requests with
+        # the new kid join one fetch; repeated misses are rate limited.
+        if not self._refresher.in_flight:
+            now = time.monotonic()
+            if now - self._last_unknown_kid_refetch < _UNKNOWN_KID_REFETCH_INTERVAL:
+                return None
+            self._last_unknown_kid_refetch = now
+            logger.info(f"Key {kid} not found, forcing JWKS refresh")
+        await self._refresher.refresh()
         return self._keys_by_kid.get(kid)
 
+    async def get_public_key(self, kid: str) -> Optional[Any]:
+        """
+        Get the parsed public key object for a key ID (kid).
+
+        The JWK is converted once per key set and reused until the keys are
+        replaced by a refresh. Returns None if the kid is unknown.
+
+        Raises:
+            ValueError if the JWK cannot be converted to a public key
+        """
+        await self._ensure_keys_loaded()
+        public_key = self._public_keys_by_kid.get(kid)
+        if public_key is not None and kid in self._keys_by_kid:
+            return public_key
+
+        jwk = await self.get_signing_key(kid)
+        if not jwk:
+            return None
+        public_key = self._public_keys_by_kid.get(kid)
+        if public_key is None:
+            from jwt import algorithms
+            public_key = algorithms.RSAAlgorithm.from_jwk(jwk)
+            self._public_keys_by_kid[kid] = public_key
+        return public_key
+
+    def has_key(self, kid: str) -> bool:
+        """Whether `kid` is in the currently loaded key set (no fetch)."""
+        return kid in self._keys_by_kid
+
     async def get_all_keys(self) -> Dict[str, Dict[str, Any]]:
         """Get all signing keys (kid -> JWK)."""
         await self._ensure_keys_loaded()
         return self._keys_by_kid.copy()
 
     async def _ensure_keys_loaded(self) -> None:
-        """Load keys if not cached or expired."""
-        if self._cache is None or self._cache.is_expired():
-            await self._fetch_keys()
-
-    async def _fetch_keys(self, force: bool = False) -> None:
-        """Fetch JWKS from the identity provider."""
-        async with self._lock:
-            # Double-check after acquiring lock
-            if not force and self._cache is not None and not self._cache.is_expired():
+        """Load keys if missing; otherwise serve the cache and revalidate in the background."""
+        cache = self._cache
+        if cache is not None:
+            if not cache.is_expired():
+                if cache.refresh_due(self._refresh_ahead_ratio):
+                    self._refresher.refresh_in_background()
                 return
-
-            # Resolve JWKS URL (may involve discovery)
-            jwks_url = await self._get_jwks_url()
-            self._resolved_jwks_url = jwks_url
-
-            logger.info(f"Fetching JWKS from {jwks_url}")
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        jwks_url,
-                        timeout=aiohttp.ClientTimeout(total=10),
-                    ) as resp:
-                        if resp.status != 200:
-                            error_text = await resp.text()
-                            logger.error(f"JWKS fetch failed: {resp.status} {error_text}")
-                            raise RuntimeError(f"Failed to fetch JWKS: {resp.status}")
-
-                        data = await resp.json()
-
-                keys = data.get("keys", [])
-                if not keys:
-                    logger.warning("JWKS response contains no keys")
-
-                # Index by kid
-                self._keys_by_kid = {k["kid"]: k for k in keys if "kid" in k}
-                self._cache = CachedJWKS(
-                    keys=data,
-                    fetched_at=time.time(),
-                    ttl_seconds=self._cache_ttl,
-                    source_url=jwks_url,
-                )
-
-                logger.info(f"Loaded {len(self._keys_by_kid)} signing keys from JWKS")
-
-            except asyncio.TimeoutError:
-                logger.error("JWKS fetch timed out")
-                raise RuntimeError("JWKS fetch timed out")
-            except aiohttp.ClientError as e:
-                logger.error(f"JWKS fetch client error: {e}")
-                raise RuntimeError(f"JWKS fetch failed: {e}")
+            if cache.within_grace(self._stale_grace_seconds):
+                # Serve stale keys while the IdP is slow or unreachable.
+                self._refresher.refresh_in_background()
+                return
+        await self._refresher.refresh()
+
+    async def _fetch_keys(self) -> None:
+        """Fetch JWKS from the identity provider (called via the single-flight refresher)."""
+        # Resolve JWKS URL (may involve discovery)
+        jwks_url = await self._get_jwks_url()
+        self._resolved_jwks_url = jwks_url
+
+        logger.info(f"Fetching JWKS from {jwks_url}")
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    jwks_url,
+                    timeout=aiohttp.ClientTimeout(total=10),
+                ) as resp:
+                    if resp.status != 200:
+                        error_text = await resp.text()
+                        logger.error(f"JWKS fetch failed: {resp.status} {error_text}")
+                        raise RuntimeError(f"Failed to fetch JWKS: {resp.status}")
+
+                    data = await resp.json()
+
+            keys = data.get("keys", [])
+            if not keys:
+                logger.warning("JWKS response contains no keys")
+
+            # Index by kid
+            self._keys_by_kid = {k["kid"]: k for k in keys if "kid" in k}
+            # Rotation: parsed keys are rebuilt lazily from the new set.
+            self._public_keys_by_kid = {}
+            self._cache = CachedJWKS(
+                keys=data,
+                fetched_at=time.time(),
+                ttl_seconds=self._cache_ttl,
+                source_url=jwks_url,
+            )
+
+            logger.info(f"Loaded {len(self._keys_by_kid)} signing keys from JWKS")
+
+        except asyncio.TimeoutError:
+            logger.error("JWKS fetch timed out")
+            raise RuntimeError("JWKS fetch timed out")
+        except aiohttp.ClientError as e:
+            logger.error(f"JWKS fetch client error: {e}")
+            raise RuntimeError(f"JWKS fetch failed: {e}")
 
     def clear_cache(self) -> None:
         """Clear the JWKS cache (useful for testing)."""
         self._cache = None
         self._keys_by_kid = {}
+        self._public_keys_by_kid = {}
         self._resolved_jwks_url = None
 
 
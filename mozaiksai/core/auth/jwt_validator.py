@@ -9,10 +9,16 @@ Validates access tokens against JWKS, checking:
 - Required scope (scp claim)
 
 Supports OIDC discovery-driven validation or explicit configuration.
+
+Successfully verified tokens are kept in a bounded LRU (keyed by token hash)
+until their `exp`, so polling clients do not pay RSA verification per request.
+An entry is only reused while its signing key is still in the loaded JWKS.
 """
 
+from collections import OrderedDict
 from typing import Optional, List, Any, Dict
 from dataclasses import dataclass
+import hashlib
 import time
 
 import jwt
@@ -75,6 +81,15 @@ class AuthError(Exception):
         super().__init__(message)
 
 
+@dataclass
+class _VerifiedToken:
+    """A token that already passed signature and claim validation."""
+
+    claims: Dict[str, Any]
+    kid: str
+    expires_at: float
+
+
 class JWTValidator:
     """
     JWT validator using JWKS for signature verification.
@@ -86,6 +101,40 @@ class JWTValidator:
     def __init__(self, config: Optional[AuthConfig] = None):
         self._config = config or get_auth_config()
         self._cached_issuer: Optional[str] = None
+        self._verified: "OrderedDict[str, _VerifiedToken]" = OrderedDict()
+        self._verified_max = max(0, int(self._config.verified_token_cache_size))
+
+    def _lookup_verified(self, token: str) -> Optional[Dict[str, Any]]:
+        if not self._verified_max:
+            return None
+        cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        entry = self._verified.get(cache_key)
+        if entry is None:
+            return None
+        # Honor expiry and key rotation: drop the entry once exp passes or its kid
+        # is no longer in the loaded key set.
+        if entry.expires_at <= time.time() or not get_jwks_client().has_key(entry.kid):
+            self._verified.pop(cache_key, None)
+            return None
+        self._verified.move_to_end(cache_key)
+        return entry.claims
+
+    def _store_verified(self, token: str, kid: str, claims: Dict[str, Any]) -> None:
+        if not self._verified_max:
+            return
+        try:
+            expires_at = float(claims["exp"])
+        except (KeyError, TypeError, ValueError):
+            return
+        cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        self._verified[cache_key] = _VerifiedToken(claims=claims, kid=kid, expires_at=expires_at)
+        self._verified.move_to_end(cache_key)
+        while len(self._verified) > self._verified_max:
+            self._verified.popitem(last=False)
+
+    def clear_verified_cache(self) -> None:
+        """Forget all cached verified tokens."""
+        self._verified.clear()
 
     async def _get_issuer(self) -> str:
         """
@@ -134,6 +183,15 @@ class JWTValidator:
 
         token = token.strip()
 
+        cached_claims = self._lookup_verified(token)
+        if cached_claims is not None:
+            return self._build_token_claims(cached_claims, require_scope=require_scope)
+
+        claims = await self._verify(token)
+        return self._build_token_claims(claims, require_scope=require_scope)
+
+    async def _verify(self, token: str) -> Dict[str, Any]:
+        """Verify signature and registered claims; cache the result on success."""
         # Decode header to get kid
         try:
             unverified_header = jwt.get_unverified_header(token)
@@ -145,26 +203,21 @@ class JWTValidator:
         if not kid:
             raise AuthError("Token missing key ID (kid)", 401)
 
-        # Fetch signing key from JWKS (may trigger discovery + JWKS fetch)
+        # Parsed public key from JWKS (may trigger discovery + JWKS fetch)
         jwks_client = get_jwks_client()
         try:
-            jwk = await jwks_client.get_signing_key(kid)
+            public_key = await jwks_client.get_public_key(kid)
         except RuntimeError as e:
             logger.error(f"Failed to fetch signing key: {e}")
             raise AuthError("Unable to validate token signature", 401)
-
-        if not jwk:
-            logger.warning(f"Signing key not found: {kid}")
-            raise AuthError("Invalid signing key", 401)
-
-        # Build public key from JWK
-        try:
-            from jwt import algorithms
-            public_key = algorithms.RSAAlgorithm.from_jwk(jwk)
         except Exception as e:
             logger.error(f"Failed to load public key from JWK: {e}")
             raise AuthError("Invalid signing key format", 401)
 
+        if public_key is None:
+            logger.warning(f"Signing key not found: {kid}")
+            raise AuthError("Invalid signing key", 401)
+
         # Get expected issuer (may trigger discovery fetch)
         try:
             expected_issuer = await self._get_issuer()
@@ -208,6 +261,11 @@ class JWTValidator:
             logger.error(f"Unexpected token validation error: {e}")
             raise AuthError("Token validation failed", 401)
 
+        self._store_verified(token, kid, claims)
+        return claims
+
+    def _build_token_claims(self, claims: Dict[str, Any], *, require_scope: bool) -> TokenClaims:
+        """Map verified claims to TokenClaims and enforce the required scope."""
         # Extract user claims
         user_id = claims.get(self._config.user_id_claim)
         if not user_id:
@@ -239,7 +297,7 @@ class JWTValidator:
             email=str(email) if email else None,
             roles=roles,
             scopes=scopes,
-            raw_claims=claims,
+            raw_claims=dict(claims),
             mozaiks_token_use=mozaiks_token_use,
             mozaiks_app_id=mozaiks_app_id,
             mozaiks_chat_id=mozaiks_chat_id,
@@ -0,0 +1,82 @@
+"""
+Single-flight background refresh for cached IdP documents (JWKS, OIDC discovery).
+
+Both caches follow the same stale-while-revalidate policy:
+- Fresh: served as-is. Once `AUTH_REFRESH_AHEAD_RATIO` of the TTL has elapsed a
+  background refresh is started, so expiry is normally never observed.
+- Expired but within `AUTH_STALE_GRACE_SECONDS`: the stale document is served
+  while a background refresh runs (covers IdP slowness and outages).
+- Missing or beyond the grace window: callers wait for the fetch (fail-closed).
+
+At most one fetch per document is in flight; concurrent callers share it.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Optional
+
+from logs.logging_config import get_core_logger
+
+logger = get_core_logger("auth.refresh")
+
+_DEFAULT_REFRESH_AHEAD_RATIO = 0.8
+_DEFAULT_STALE_GRACE_SECONDS = 3600
+
+
+def get_refresh_ahead_ratio() -> float:
+    """Fraction of the TTL after which a background refresh is started."""
+    try:
+        ratio = float(os.getenv("AUTH_REFRESH_AHEAD_RATIO", str(_DEFAULT_REFRESH_AHEAD_RATIO)))
+    except ValueError:
+        return _DEFAULT_REFRESH_AHEAD_RATIO
+    return min(1.0, max(0.0, ratio))
+
+
+def get_stale_grace_seconds() -> int:
+    """How long past expiry a cached document may still be served."""
+    try:
+        return max(0, int(os.getenv("AUTH_STALE_GRACE_SECONDS", str(_DEFAULT_STALE_GRACE_SECONDS))))
+    except ValueError:
+        return _DEFAULT_STALE_GRACE_SECONDS
+
+
+class SingleFlightRefresher:
+    """Runs `fetch` at most once at a time; waiters and background triggers share it."""
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Any]]):
+        self._name = name
+        self._fetch = fetch
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def in_flight(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _start(self) -> asyncio.Task:
+        if not self.in_flight:
+            self._task = asyncio.create_task(self._fetch())
+            self._task.add_done_callback(self._on_done)
+        assert self._task is not None
+        return self._task
+
+    async def refresh(self) -> None:
+        """Fetch now (or join the in-flight fetch) and wait for it.
+
+        Raises whatever the fetch raised. A cancelled waiter does not cancel
+        the shared fetch.
+        """
+        await asyncio.shield(self._start())
+
+    def refresh_in_background(self) -> None:
+        """Start a fetch unless one is already running; never waits."""
+        self._start()
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.warning(f"{self._name} refresh failed: {exc}")
+
+
+__all__ = ["SingleFlightRefresher", "get_refresh_ahead_ratio", "get_stale_grace_seconds"]
@@ -31,7 +31,12 @@ ChatSessions Stored Fields (superset; some optional):
     usage_total_cost_final?, usage_summary_raw?, messages[]
 
 WorkflowSummaryDoc Stored Fields:
-    _id, app_id (+ legacy app_id), workflow_name, overall_avg, chat_sessions, agents
+    _id, app_id (+ legacy app_id), workflow_name, totals, agents.{name}.totals
+    (overall_avg / agents.{name}.avg are derived from totals at read time)
+
+WorkflowSessionStats (per-chat usage entries, one doc per chat):
+    _id = {summary_id}:{chat_id}, summary_id, chat_id, token/cost/duration sums,
+    last_event_ts, agents.{name}.*
 
 NOTE: We intentionally keep rollup computation *read‑only* over ChatSessions;
             token & cost fields are copied from flattened usage_* finals in sessions.
@@ -40,7 +45,6 @@ NOTE: We intentionally keep rollup computation *read‑only* over ChatSessions;
 import asyncio
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any, Mapping
-from collections import defaultdict
 from enum import IntEnum, Enum
 from pydantic import BaseModel, Field, ConfigDict, model_validator
 from pymongo.errors import DuplicateKeyError
@@ -51,6 +55,8 @@ from logs.logging_config import get_workflow_logger
 
 logger = get_workflow_logger("chat_workflow_models")
 
+WORKFLOW_SESSION_STATS_COLLECTION = "WorkflowSessionStats"
+
 # ===========================================
 # EXACT PYDANTIC MODELS (MATCH SPECIFICATION)
 # ===========================================
@@ -82,6 +88,32 @@ class AggregateAverages(BaseModel):
     avg_cost_total_usd: float = Field(0, ge=0)
 
 
+class RollupTotals(BaseModel):
+    """Running sums behind a rollup (maintained with $inc); averages are derived on read."""
+    model_config = ConfigDict(extra="forbid")
+    n: int = Field(0, ge=0)
+    prompt_tokens: int = Field(0, ge=0)
+    completion_tokens: int = Field(0, ge=0)
+    total_tokens: int = Field(0, ge=0)
+    cost_total_usd: float = Field(0, ge=0)
+    duration_sec: float = Field(0, ge=0)
+    # Completed chats and their wall-clock duration (created_at -> completed_at)
+    completed: int = Field(0, ge=0)
+    completed_duration_sec: float = Field(0, ge=0)
+
+    def averages(self) -> AggregateAverages:
+        n = self.n
+        if not n:
+            return AggregateAverages()
+        return AggregateAverages(
+            avg_duration_sec=self.duration_sec / n,
+            avg_prompt_tokens=int(self.prompt_tokens / n),
+            avg_completion_tokens=int(self.completion_tokens / n),
+            avg_total_tokens=int(self.total_tokens / n),
+            avg_cost_total_usd=self.cost_total_usd / n,
+        )
+
+
 class ChatSessionStats(BaseModel):
     """Per-session metrics snapshot used inside rollups."""
     model_config = ConfigDict(extra="forbid")
@@ -136,7 +168,9 @@ class SessionMetricsDoc(BaseModel):
 
 class AgentAggregate(BaseModel):
     model_config = ConfigDict(extra="forbid")
-    avg: AggregateAverages
+    avg: AggregateAverages = Field(default_factory=AggregateAverages)
+    totals: RollupTotals = Field(default_factory=RollupTotals)
+    # Legacy: per-chat agent entries now live in WorkflowSessionStats
     sessions: Dict[str, ChatSessionStats] = Field(default_factory=dict)
 
 
@@ -145,6 +179,9 @@ class WorkflowSummaryDoc(BaseModel):
 
     _id pattern: mon_{app_id}_{workflow_name}
     (Deterministic; one summary per (app, workflow)).
+
+    Only ``totals`` (and ``agents.*.totals``) are written live; ``overall_avg`` /
+    ``agents.*.avg`` are derived from them on validation.
     """
     model_config = ConfigDict(extra="forbid", populate_by_name=True)
     id: str = Field(alias="_id")
@@ -161,9 +198,21 @@ class WorkflowSummaryDoc(BaseModel):
         avg_total_tokens=0,
         avg_cost_total_usd=0.0,
     )
+    totals: RollupTotals = Field(default_factory=RollupTotals)
+    # Legacy: per-chat entries now live in WorkflowSessionStats
     chat_sessions: Dict[str, ChatSessionStats] = Field(default_factory=dict)
     agents: Dict[str, AgentAggregate] = Field(default_factory=dict)
 
+    @model_validator(mode="after")
+    def _derive_averages(self):
+        # Live rollups only store running totals; averages are computed here.
+        if self.totals.n:
+            self.overall_avg = self.totals.averages()
+        for agent in self.agents.values():
+            if agent.totals.n:
+                agent.avg = agent.totals.averages()
+        return self
+
     @model_validator(mode="before")
     @classmethod
     def _coerce_scope(cls, data: Any):  # noqa: ANN001
@@ -354,88 +403,82 @@ class ChatWorkflowManager:
         app_id: str,
         workflow_name: str,
     ) -> WorkflowSummaryDoc:
+        """Rebuild a rollup from its WorkflowSessionStats entries (repair path).
+
+        The live rollup is maintained incrementally by
+        AG2PersistenceManager.update_session_metrics; this re-derives the same
+        running totals server-side with $group so it stays cheap on long histories.
+        """
         await self._ensure_client()
         resolved_app_id = coalesce_app_id(app_id=app_id)
         if not resolved_app_id:
             raise ValueError("app_id is required")
         assert self.chat_sessions is not None
-        cursor = self.chat_sessions.find({
-            "workflow_name": workflow_name,
-            "status": WorkflowStatus.COMPLETED,
-            **build_app_scope_filter(str(resolved_app_id)),
-        })
-        sessions: List[Dict[str, Any]] = [doc async for doc in cursor]
-        if not sessions:
-            return WorkflowSummaryDoc(
-                _id=f"mon_{resolved_app_id}_{workflow_name}",
-                app_id=str(resolved_app_id),
-                workflow_name=workflow_name,
-            )
-        overall_sessions: Dict[str, ChatSessionStats] = {}
-        # per_agent_totals will hold lists of (sid, ChatSessionStats) so we can map back by id
-        per_agent_totals: Dict[str, List[tuple]] = defaultdict(list)
-
-        for sess in sessions:
-            sid = sess["_id"]
-            created = sess.get("created_at")
-            completed = sess.get("completed_at")
-            dur = float((completed - created).total_seconds()) if created and completed else 0.0
-            prompt = int(sess.get("usage_prompt_tokens_final") or 0)
-            completion = int(sess.get("usage_completion_tokens_final") or 0)
-            total = int(sess.get("usage_total_tokens_final") or (prompt + completion))
-            cost = float(sess.get("usage_total_cost_final") or 0.0)
-
-            stats = ChatSessionStats(
-                duration_sec=dur,
-                prompt_tokens=prompt,
-                completion_tokens=completion,
-                total_tokens=total,
-                cost_total_usd=cost,
-            )
-            overall_sessions[sid] = stats
-
-            agents_in_session = [m.get("agent_name") for m in sess.get("messages", []) if m.get("role") == "assistant" and m.get("agent_name")]
-            for agent in agents_in_session:
-                per_agent_totals[agent].append((sid, stats))
-
-        # Overall averages
-        n = len(overall_sessions)
-        overall_avg = AggregateAverages(
-            avg_duration_sec=(sum(s.duration_sec for s in overall_sessions.values()) / n) if n else 0.0,
-            avg_prompt_tokens=int(sum(s.prompt_tokens for s in overall_sessions.values()) / n) if n else 0,
-            avg_completion_tokens=int(sum(s.completion_tokens for s in overall_sessions.values()) / n) if n else 0,
-            avg_total_tokens=int(sum(s.total_tokens for s in overall_sessions.values()) / n) if n else 0,
-            avg_cost_total_usd=(sum(s.cost_total_usd for s in overall_sessions.values()) / n) if n else 0.0,
+        summary_id = f"mon_{resolved_app_id}_{workflow_name}"
+        session_stats = self.db[WORKFLOW_SESSION_STATS_COLLECTION]
+        sum_fields = {
+            "prompt_tokens": {"$sum": "$prompt_tokens"},
+            "completion_tokens": {"$sum": "$completion_tokens"},
+            "total_tokens": {"$sum": "$total_tokens"},
+            "cost_total_usd": {"$sum": "$cost_total_usd"},
+            "duration_sec": {"$sum": "$duration_sec"},
+        }
+        overall_rows = await session_stats.aggregate([
+            {"$match": {"summary_id": summary_id}},
+            {"$group": {"_id": None, "n": {"$sum": 1}, "user_id": {"$first": "$user_id"}, **sum_fields}},
+        ]).to_list(length=1)
+        agent_rows = await session_stats.aggregate([
+            {"$match": {"summary_id": summary_id}},
+            {"$project": {"agents": {"$objectToArray": {"$ifNull": ["$agents", {}]}}}},
+            {"$unwind": "$agents"},
+            {"$group": {
+                "_id": "$agents.k",
+                "n": {"$sum": 1},
+                **{k: {"$sum": f"$agents.v.{k}"} for k in sum_fields},
+            }},
+        ]).to_list(length=None)
+        completed_rows = await self.chat_sessions.aggregate([
+            {"$match": {
+                "workflow_name": workflow_name,
+                "status": int(WorkflowStatus.COMPLETED),
+                **build_app_scope_filter(str(resolved_app_id)),
+            }},
+            {"$group": {"_id": None, "completed": {"$sum": 1}, "completed_duration_sec": {"$sum": {"$ifNull": ["$duration_sec", 0]}}}},
+        ]).to_list(length=1)
+
+        overall = overall_rows[0] if overall_rows else {}
+        completed = completed_rows[0] if completed_rows else {}
+        totals = RollupTotals(
+            n=int(overall.get("n", 0)),
+            prompt_tokens=int(overall.get("prompt_tokens", 0)),
+            completion_tokens=int(overall.get("completion_tokens", 0)),
+            total_tokens=int(overall.get("total_tokens", 0)),
+            cost_total_usd=float(overall.get("cost_total_usd", 0.0)),
+            duration_sec=float(overall.get("duration_sec", 0.0)),
+            completed=int(completed.get("completed", 0)),
+            completed_duration_sec=float(completed.get("completed_duration_sec", 0.0)),
         )
-
-        agents_rollup: Dict[str, AgentAggregate] = {}
-        for agent, sid_stats_pairs in per_agent_totals.items():
-            stats_list = [s for (_sid, s) in sid_stats_pairs]
-            an = len(stats_list)
-            agent_avg = AggregateAverages(
-                avg_duration_sec=(sum(s.duration_sec for s in stats_list) / an) if an else 0.0,
-                avg_prompt_tokens=int(sum(s.prompt_tokens for s in stats_list) / an) if an else 0,
-                avg_completion_tokens=int(sum(s.completion_tokens for s in stats_list) / an) if an else 0,
-                avg_total_tokens=int(sum(s.total_tokens for s in stats_list) / an) if an else 0,
-                avg_cost_total_usd=(sum(s.cost_total_usd for s in stats_list) / an) if an else 0.0,
-            )
-            # Build a sessions dict keyed by session id with the ChatSessionStats
-            session_map = {sid: stats for (sid, stats) in sid_stats_pairs}
-            agents_rollup[agent] = AgentAggregate(avg=agent_avg, sessions=session_map)
-
-        # user_id: try to surface a representative user (first session's user_id)
-        representative_user = sessions[0].get("user_id") if sessions else None
+        agents_rollup = {
+            str(row["_id"]): AgentAggregate(totals=RollupTotals(
+                n=int(row.get("n", 0)),
+                prompt_tokens=int(row.get("prompt_tokens", 0)),
+                completion_tokens=int(row.get("completion_tokens", 0)),
+                total_tokens=int(row.get("total_tokens", 0)),
+                cost_total_usd=float(row.get("cost_total_usd", 0.0)),
+                duration_sec=float(row.get("duration_sec", 0.0)),
+            ))
+            for row in agent_rows
+        }
         return WorkflowSummaryDoc(
-            _id=f"mon_{resolved_app_id}_{workflow_name}",
+            _id=summary_id,
             app_id=str(resolved_app_id),
-            user_id=representative_user,
+            user_id=overall.get("user_id"),
             workflow_name=workflow_name,
             last_updated_at=datetime.now(timezone.utc),
-            overall_avg=overall_avg,
-            chat_sessions=overall_sessions,
+            totals=totals,
             agents=agents_rollup,
         )
-    
+
     async def upsert_workflow_summary(self, summary: WorkflowSummaryDoc) -> WorkflowSummaryDoc:
         await self._ensure_client()
         assert self.workflow_summaries is not None
@@ -18,14 +18,17 @@ import os
 from datetime import datetime, UTC
 from typing import Dict, List, Any, Optional, Union, cast
 import hashlib
+from collections import OrderedDict
 from copy import deepcopy
-import textwrap
-from pymongo import ReturnDocument
+import logging
+from pymongo import ReturnDocument, UpdateOne
 from uuid import uuid4
 from logs.logging_config import get_workflow_logger
 from mozaiksai.core.core_config import get_mongo_client
 from mozaiksai.core.multitenant import build_app_scope_filter, coalesce_app_id, dual_write_app_scope
-from ..models import WorkflowStatus
+from ..models import WORKFLOW_SESSION_STATS_COLLECTION, WorkflowStatus
+from .write_behind import get_transcript_write_behind, write_behind_enabled
+from .run_lease import fence_filter
 from autogen.events.base_event import BaseEvent
 from autogen.events.agent_events import TextEvent
 from mozaiksai.core.workflow.outputs.structured import agent_has_structured_output, get_structured_output_model_fields
@@ -48,11 +51,59 @@ def _resolve_agent_log_limit(env_key: str, default: Optional[int]) -> Optional[i
     return None if parsed <= 0 else parsed
 
 
-_AGENT_CONV_JSON_MAX_LEN = _resolve_agent_log_limit("AGENT_CONV_JSON_MAX_LEN", None)
-_AGENT_CONV_TEXT_MAX_LEN = _resolve_agent_log_limit("AGENT_CONV_TEXT_MAX_LEN", None)
+def _env_int(env_key: str, default: int) -> int:
+    """Read a positive integer setting; invalid or non-positive values use ``default``."""
+    raw_value = os.getenv(env_key)
+    if raw_value is None:
+        return default
+    try:
+        parsed = int(raw_value.strip())
+    except ValueError:
+        logger.warning("Invalid %s value '%s'; using default %s", env_key, raw_value, default)
+        return default
+    return parsed if parsed > 0 else default
+
+
+# Agent transcript log (formatted by logs.logging_config.AgentConversationFormatter)
+_agent_conv_logger = logging.getLogger("mozaiks.workflow.agent_messages")
 
 _GENERAL_CHAT_COLLECTION = "GeneralChatSessions"
 _GENERAL_CHAT_COUNTER_COLLECTION = "GeneralChatCounters"
+CHAT_MESSAGE_BUCKET_COLLECTION = "ChatMessageBuckets"
+# Fields returned by session listing queries; never includes the embedded transcript.
+_SESSION_SUMMARY_PROJECTION = {"_id": 1, "workflow_name": 1, "status": 1, "created_at": 1, "last_updated_at": 1, "last_artifact": 1}
+
+TRANSCRIPT_STORAGE_EMBEDDED = "embedded"
+TRANSCRIPT_STORAGE_BUCKETED = "bucketed"
+
+
+def _resolve_transcript_storage_mode() -> str:
+    """Resolve where chat transcripts live (CHAT_TRANSCRIPT_STORAGE).
+
+    embedded (default): messages[] array on the ChatSessions document.
+    bucketed: ChatMessageBuckets documents keyed by (chat_id, sequence range).
+    """
+    raw_value = (os.getenv("CHAT_TRANSCRIPT_STORAGE") or TRANSCRIPT_STORAGE_EMBEDDED).strip().lower()
+    if raw_value not in (TRANSCRIPT_STORAGE_EMBEDDED, TRANSCRIPT_STORAGE_BUCKETED):
+        logger.warning(
+            "Invalid CHAT_TRANSCRIPT_STORAGE value '%s'; using '%s'", raw_value, TRANSCRIPT_STORAGE_EMBEDDED
+        )
+        return TRANSCRIPT_STORAGE_EMBEDDED
+    return raw_value
+
+
+_TRANSCRIPT_STORAGE_MODE = _resolve_transcript_storage_mode()
+_CHAT_MESSAGE_BUCKET_SIZE = _env_int("CHAT_MESSAGE_BUCKET_SIZE", 200)
+
+
+def message_bucket_index(sequence: int, bucket_size: int = _CHAT_MESSAGE_BUCKET_SIZE) -> int:
+    """Return the zero-based bucket number holding ``sequence`` (sequences start at 1)."""
+    return max(0, int(sequence) - 1) // bucket_size
+
+
+def message_bucket_id(chat_id: str, bucket: int) -> str:
+    """Deterministic _id for a transcript bucket document."""
+    return f"{chat_id}:{int(bucket):06d}"
 
 
 class PersistenceManager:
@@ -95,7 +146,22 @@ class PersistenceManager:
                 if "idx_status" not in index_names and "cs_status_created" not in index_names:
                     await coll.create_index("status", name="idx_status")
                     logger.debug("Created status index")
-                    
+
+                # Session summary listings: in-progress sessions per user (newest update first)
+                # and per-workflow chat listings per user (newest first).
+                if "cs_app_user_status_updated" not in index_names:
+                    await coll.create_index(
+                        [("app_id", 1), ("user_id", 1), ("status", 1), ("last_updated_at", -1)],
+                        name="cs_app_user_status_updated",
+                    )
+                    logger.debug("Created app/user/status/updated index")
+                if "cs_app_wf_user_created" not in index_names:
+                    await coll.create_index(
+                        [("app_id", 1), ("workflow_name", 1), ("user_id", 1), ("created_at", -1)],
+                        name="cs_app_wf_user_created",
+                    )
+                    logger.debug("Created app/workflow/user/created index")
+
                 # Note: per-event normalized rows and their indexes in WorkflowStats
                 # were removed to reduce collection noise; WorkflowStats now holds
                 # live rollup documents (mon_ prefix) only, so no per-event index is needed.
@@ -138,6 +204,23 @@ class PersistenceManager:
                         unique=True,
                     )
                     logger.debug("Created general chat app counter unique index")
+
+                bucket_coll = self.client["MozaiksAI"][CHAT_MESSAGE_BUCKET_COLLECTION]
+                bucket_indexes = await bucket_coll.list_indexes().to_list(length=None)
+                bucket_index_names = [idx["name"] for idx in bucket_indexes]
+                if "cmb_chat_seq" not in bucket_index_names:
+                    await bucket_coll.create_index(
+                        [("chat_id", 1), ("seq_start", 1)],
+                        name="cmb_chat_seq",
+                        unique=True,
+                    )
+                    logger.debug("Created chat message bucket chat/sequence index")
+
+                session_stats_coll = self.client["MozaiksAI"][WORKFLOW_SESSION_STATS_COLLECTION]
+                session_stats_indexes = await session_stats_coll.list_indexes().to_list(length=None)
+                if "wss_summary" not in [idx["name"] for idx in session_stats_indexes]:
+                    await session_stats_coll.create_index("summary_id", name="wss_summary")
+                    logger.debug("Created workflow session stats summary index")
             except Exception as e:  # pragma: no cover
                 logger.warning(f"Index ensure issue: {e}")
 
@@ -149,14 +232,33 @@ class AG2PersistenceManager:
 
     Per-event normalized rows were intentionally disabled to reduce collection noise.
     Replay/resume relies on ChatSessions.messages; metrics aggregate in real-time
-    in the mon_ rollup documents.
+    in the mon_ rollup documents as running totals ($inc), with per-chat usage
+    entries kept in WorkflowSessionStats so the rollup stays O(1) in size.
+
+    Transcript storage (CHAT_TRANSCRIPT_STORAGE=bucketed): messages are written to
+    ChatMessageBuckets instead, one document per (chat_id, sequence range) of
+    CHAT_MESSAGE_BUCKET_SIZE messages. ChatSessions keeps status, counters and
+    metadata only, so long chats no longer grow towards the 16 MB document limit
+    and diff/resume reads touch only the buckets covering the requested range.
     """
 
+    _WORKFLOW_NAME_CACHE_MAX = 4096
+
     def __init__(self):
         self.persistence = PersistenceManager()
-        logger.info("AG2PersistenceManager (lean) ready")
+        self.transcript_mode = _TRANSCRIPT_STORAGE_MODE
+        self.bucket_size = _CHAT_MESSAGE_BUCKET_SIZE
+        # chat_id -> workflow_name; immutable per chat, lets save_event skip a read
+        self._workflow_name_cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        # TRANSCRIPT_WRITE_BEHIND: save_event queues messages instead of awaiting Mongo
+        self.write_behind = write_behind_enabled()
+        logger.info("AG2PersistenceManager (lean) ready", extra={"transcript_mode": self.transcript_mode})
         self._workflow_stats_indexes_checked = False
 
+    @property
+    def uses_bucketed_transcripts(self) -> bool:
+        return self.transcript_mode == TRANSCRIPT_STORAGE_BUCKETED
+
     async def _coll(self):
         await self.persistence._ensure_client()
         assert self.persistence.client is not None, "Mongo client not initialized"
@@ -189,6 +291,16 @@ class AG2PersistenceManager:
             # Avoid repeated attempts in tight loops if Mongo unavailable
             self._workflow_stats_indexes_checked = True
 
+    async def _session_stats_coll(self):
+        await self.persistence._ensure_client()
+        assert self.persistence.client is not None, "Mongo client not initialized"
+        return self.persistence.client["MozaiksAI"][WORKFLOW_SESSION_STATS_COLLECTION]
+
+    async def _message_bucket_coll(self):
+        await self.persistence._ensure_client()
+        assert self.persistence.client is not None, "Mongo client not initialized"
+        return self.persistence.client["MozaiksAI"][CHAT_MESSAGE_BUCKET_COLLECTION]
+
     async def _general_coll(self):
         await self.persistence._ensure_client()
         assert self.persistence.client is not None, "Mongo client not initialized"
@@ -317,38 +429,22 @@ class AG2PersistenceManager:
             # a per-chat metrics_{chat_id} document plus a completion rollup.
             stats_coll = await self._workflow_stats_coll()
             summary_id = f"mon_{resolved_app_id}_{workflow_name}"
-            # Use $setOnInsert so we don't clobber existing real-time aggregates if concurrent chats start.
-            await stats_coll.update_one(
-                {"_id": summary_id},
-                {"$setOnInsert": {
-                    "_id": summary_id,
-                    "app_id": resolved_app_id,
-                    "workflow_name": workflow_name,
-                    "last_updated_at": now,
-                    # overall_avg block mirrors models.WorkflowSummaryDoc schema
-                    "overall_avg": {
-                        "avg_duration_sec": 0.0,
-                        "avg_prompt_tokens": 0,
-                        "avg_completion_tokens": 0,
-                        "avg_total_tokens": 0,
-                        "avg_cost_total_usd": 0.0,
-                    },
-                    "chat_sessions": {},
-                    "agents": {}
-                }},
-                upsert=True
-            )
-            # Seed empty per-chat metrics container if not present
-            await stats_coll.update_one(
-                {"_id": summary_id, f"chat_sessions.{chat_id}": {"$exists": False}},
-                {"$set": {f"chat_sessions.{chat_id}": {
-                    "duration_sec": 0.0,
-                    "prompt_tokens": 0,
-                    "completion_tokens": 0,
-                    "total_tokens": 0,
-                    "cost_total_usd": 0.0
-                }, "last_updated_at": now}}
+            # Seed the per-chat usage entry; the rollup counts the chat only if the entry is new.
+            seeded = await self._seed_session_stats(
+                summary_id=summary_id,
+                chat_id=chat_id,
+                app_id=str(resolved_app_id),
+                workflow_name=workflow_name,
+                user_id=user_id,
+                now=now,
             )
+            rollup_update: Dict[str, Any] = {
+                "$set": {"last_updated_at": now},
+                "$setOnInsert": {"app_id": resolved_app_id, "workflow_name": workflow_name},
+            }
+            if seeded:
+                rollup_update["$inc"] = {"totals.n": 1}
+            await stats_coll.update_one({"_id": summary_id}, rollup_update, upsert=True)
         except Exception as e:  # pragma: no cover
             logger.error(f"Failed to create chat session {chat_id}: {e}")
 
@@ -479,10 +575,15 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            # Completed transcripts must be complete: drain write-behind first.
+            await self.flush_pending_events(chat_id)
             coll = await self._coll()
             now = datetime.now(UTC)
             # Fetch created_at & usage to compute duration for rollup averages
-            base_doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(resolved_app_id)}, {"created_at": 1})
+            base_doc = await coll.find_one(
+                {"_id": chat_id, **build_app_scope_filter(resolved_app_id)},
+                {"created_at": 1, "status": 1, "workflow_name": 1},
+            )
             created_at = base_doc.get("created_at") if base_doc else None
             if isinstance(created_at, datetime) and created_at.tzinfo is None:
                 # Mongo can return naive datetimes when tz_aware=False; treat as UTC for compatibility.
@@ -494,17 +595,23 @@ class AG2PersistenceManager:
                 "last_updated_at": now,
                 "duration_sec": dur,
             }})
-            # Fire & forget rollup refresh (no await block on success path)
-            if res.modified_count > 0:
+            # Count the completion in the live rollup (once per chat; O(1) $inc)
+            already_completed = base_doc is not None and base_doc.get("status") == int(WorkflowStatus.COMPLETED)
+            if res.modified_count > 0 and not already_completed:
                 try:  # pragma: no cover
-                    from ..models import refresh_workflow_rollup_by_id  # local import to avoid circular at module import
-                    # Need workflow_name for rollup; fetch minimally
-                    doc = await coll.find_one({"_id": chat_id}, {"workflow_name": 1})
-                    if doc and (wf := doc.get("workflow_name")):
-                        summary_id = f"mon_{resolved_app_id}_{wf}"
-                        asyncio.create_task(refresh_workflow_rollup_by_id(summary_id))
+                    if base_doc and (wf := base_doc.get("workflow_name")):
+                        stats_coll = await self._workflow_stats_coll()
+                        await stats_coll.update_one(
+                            {"_id": f"mon_{resolved_app_id}_{wf}"},
+                            {
+                                "$inc": {"totals.completed": 1, "totals.completed_duration_sec": dur},
+                                "$set": {"last_updated_at": now},
+                                "$setOnInsert": {"app_id": resolved_app_id, "workflow_name": wf},
+                            },
+                            upsert=True,
+                        )
                 except Exception as e:
-                    logger.debug(f"Rollup refresh failed for {chat_id}: {e}")
+                    logger.debug(f"Rollup completion update failed for {chat_id}: {e}")
             return res.modified_count > 0
         except Exception as e:  # pragma: no cover
             logger.error(f"Failed to mark chat {chat_id} as completed: {e}")
@@ -576,7 +683,8 @@ class AG2PersistenceManager:
             ChatSessions with an empty messages[] array until the first agent reply.
 
         Behavior:
-            - Each provided message gets an auto-assigned sequence (incrementing last_sequence).
+            - Each provided message gets an auto-assigned sequence (incrementing last_sequence);
+              the whole batch reserves its sequences and is appended in one write.
             - event_id is generated with 'init_' prefix for traceability.
             - Skips if list empty or chat session missing.
             - Safe to call multiple times: we perform a basic duplicate guard by checking
@@ -590,10 +698,14 @@ class AG2PersistenceManager:
             raise ValueError("app_id is required")
         try:
             coll = await self._coll()
-            base_doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(resolved_app_id)}, {"messages": {"$slice": -5}})
             recent: List[Dict[str, Any]] = []
-            if base_doc and isinstance(base_doc.get("messages"), list):
-                recent = [m for m in base_doc["messages"] if isinstance(m, dict)]
+            pending: List[Dict[str, Any]] = []
+            if self.uses_bucketed_transcripts:
+                recent = await self._load_recent_bucketed_messages(chat_id=chat_id, app_id=resolved_app_id, count=5)
+            else:
+                base_doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(resolved_app_id)}, {"messages": {"$slice": -5}})
+                if base_doc and isinstance(base_doc.get("messages"), list):
+                    recent = [m for m in base_doc["messages"] if isinstance(m, dict)]
             for m in messages:
                 role = m.get("role") or "user"
                 content = m.get("content")
@@ -604,30 +716,22 @@ class AG2PersistenceManager:
                     last = recent[-1]
                     if last.get("role") == role and last.get("content") == content:
                         continue
-                # Increment sequence counter atomically & fetch new value
-                bump = await coll.find_one_and_update(
-                    {"_id": chat_id, **build_app_scope_filter(resolved_app_id)},
-                    {"$inc": {"last_sequence": 1}, "$set": {"last_updated_at": datetime.now(UTC)}},
-                    return_document=ReturnDocument.AFTER,
-                )
-                seq = int(bump.get("last_sequence", 1)) if bump else 1
                 msg_doc = {
                     "role": role,
                     "content": str(content),
                     "timestamp": datetime.now(UTC),
                     "event_type": "message.created",
                     "event_id": f"init_{uuid4()}",
-                    "sequence": seq,
                     "agent_name": m.get("name") or ("user" if role == "user" else "assistant"),
                 }
-                await coll.update_one(
-                    {"_id": chat_id, **build_app_scope_filter(resolved_app_id)},
-                    {"$push": {"messages": msg_doc}, "$set": {"last_updated_at": datetime.now(UTC)}},
-                )
                 recent.append(msg_doc)
+                pending.append(msg_doc)
+            # Reserve len(pending) sequences and append the whole batch at once
+            sequences = await self.append_sequenced_messages(chat_id=chat_id, app_id=resolved_app_id, messages=pending)
+            for msg_doc, seq in zip(pending, sequences):
                 logger.debug(
                     "[INIT_MSG_PERSIST] Inserted initial message",
-                    extra={"chat_id": chat_id, "app_id": resolved_app_id, "seq": seq, "role": role},
+                    extra={"chat_id": chat_id, "app_id": resolved_app_id, "seq": seq, "role": msg_doc["role"]},
                 )
         except Exception as e:  # pragma: no cover
             logger.debug(f"[INIT_MSG_PERSIST] Failed chat_id={chat_id}: {e}")
@@ -643,8 +747,10 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            await self.flush_pending_events(chat_id)
             coll = await self._coll()
-            doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(resolved_app_id)}, {"messages": 1, "status": 1})
+            projection = {"status": 1} if self.uses_bucketed_transcripts else {"messages": 1, "status": 1}
+            doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(resolved_app_id)}, projection)
             
             if not doc:
                 logger.warning(f"[RESUME_CHAT] No document found for chat_id={chat_id} app_id={resolved_app_id}")
@@ -652,7 +758,10 @@ class AG2PersistenceManager:
             
             status = int(doc.get("status", -1))
             status_name = WorkflowStatus(status).name if status in [s.value for s in WorkflowStatus] else "UNKNOWN"
-            msgs = doc.get("messages", [])
+            if self.uses_bucketed_transcripts:
+                msgs = await self._load_bucketed_messages(chat_id=chat_id, app_id=resolved_app_id)
+            else:
+                msgs = doc.get("messages", [])
             
             logger.info(f"[RESUME_CHAT] chat_id={chat_id} status={status_name}({status}) messages_count={len(msgs)}")
             
@@ -762,11 +871,74 @@ class AG2PersistenceManager:
             )
         return sessions
 
+    # ------------------------------------------------------------------
+    # Session summaries (listing endpoints)
+    # ------------------------------------------------------------------
+    async def list_workflow_chat_ids(
+        self,
+        *,
+        app_id: Optional[str] = None,
+        workflow_name: str,
+        user_id: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[str]:
+        """Return the newest chat ids for a workflow (served by ``cs_app_wf_user_created``)."""
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not resolved_app_id:
+            raise ValueError("app_id is required")
+        query: Dict[str, Any] = {"workflow_name": workflow_name, **build_app_scope_filter(str(resolved_app_id))}
+        if user_id:
+            query["user_id"] = user_id
+        coll = await self._coll()
+        docs = await coll.find(query, {"_id": 1}).sort("created_at", -1).limit(limit).to_list(length=limit)
+        return [d["_id"] for d in docs]
+
+    async def list_in_progress_sessions(
+        self,
+        *,
+        app_id: Optional[str] = None,
+        user_id: str,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Return IN_PROGRESS session summaries for a user, most recently updated first.
+
+        Only the summary fields are projected (never the embedded transcript);
+        the query is covered by the ``cs_app_user_status_updated`` index.
+        """
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not resolved_app_id:
+            raise ValueError("app_id is required")
+        coll = await self._coll()
+        return (
+            await coll.find(
+                {
+                    "user_id": user_id,
+                    "status": int(WorkflowStatus.IN_PROGRESS),
+                    **build_app_scope_filter(str(resolved_app_id)),
+                },
+                _SESSION_SUMMARY_PROJECTION,
+            )
+            .sort("last_updated_at", -1)
+            .limit(limit)
+            .to_list(length=limit)
+        )
+
+    async def get_most_recent_in_progress_session(
+        self,
+        *,
+        app_id: Optional[str] = None,
+        user_id: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Return the most recently updated IN_PROGRESS session summary, if any."""
+        sessions = await self.list_in_progress_sessions(app_id=app_id, user_id=user_id, limit=1)
+        return sessions[0] if sessions else None
+
     async def get_user_workflow_statuses(self, *, app_id: Optional[str] = None, user_id: str) -> Dict[str, Dict[str, Any]]:
         """Return a mapping of workflow_name -> { chat_id, status } for a given user.
 
-        - Queries `ChatSessions` for the app/user and returns a simple dict
-          suitable for seeding the `workflows` field in the pattern context contract.
+        - Groups `ChatSessions` for the app/user by workflow server-side and
+          returns a simple dict suitable for seeding the `workflows` field in
+          the pattern context contract.
         - `status` is normalized to the canonical strings: `not_started`,
           `in_progress`, `completed`, or `unknown`.
         """
@@ -777,21 +949,22 @@ class AG2PersistenceManager:
             coll = await self._coll()
             # Deterministic selection: when multiple sessions exist for the same workflow,
             # we treat the *most recently created* session as canonical (prevents cross-run bleed).
-            cursor = (
-                coll.find(
-                    {"user_id": user_id, **build_app_scope_filter(str(resolved_app_id))},
-                    {"_id": 1, "workflow_name": 1, "status": 1, "created_at": 1},
-                )
-                .sort("created_at", -1)
-            )
-            docs = await cursor.to_list(length=None)
+            pipeline = [
+                {"$match": {"user_id": user_id, **build_app_scope_filter(str(resolved_app_id))}},
+                {"$project": {"_id": 1, "workflow_name": 1, "workflow": 1, "status": 1, "created_at": 1}},
+                {"$sort": {"created_at": -1}},
+                {
+                    "$group": {
+                        "_id": {"$ifNull": ["$workflow_name", {"$ifNull": ["$workflow", "unnamed_workflow"]}]},
+                        "chat_id": {"$first": "$_id"},
+                        "status": {"$first": "$status"},
+                    }
+                },
+            ]
+            groups = await coll.aggregate(pipeline).to_list(length=None)
             result: Dict[str, Dict[str, Any]] = {}
-            for d in docs:
-                wf = d.get("workflow_name") or d.get("workflow") or "unnamed_workflow"
-                if wf in result:
-                    continue
-                chat_id = d.get("_id")
-                status_int = int(d.get("status", -1) or -1)
+            for g in groups:
+                status_int = int(g.get("status", -1) or -1)
                 try:
                     status_name = WorkflowStatus(status_int).name.lower()
                 except Exception:
@@ -805,7 +978,7 @@ class AG2PersistenceManager:
                 else:
                     normalized = status_name
 
-                result[wf] = {"chat_id": chat_id, "status": normalized}
+                result[g["_id"]] = {"chat_id": g.get("chat_id"), "status": normalized}
             return result
         except Exception as e:
             logger.warning(f"[GET_WORKFLOW_STATUSES] Failed to fetch workflows for app_id={resolved_app_id} user={user_id}: {e}")
@@ -884,6 +1057,11 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            await self.flush_pending_events(chat_id)
+            if self.uses_bucketed_transcripts:
+                return await self._load_bucketed_messages(
+                    chat_id=chat_id, app_id=str(resolved_app_id), after_sequence=int(last_sequence)
+                )
             coll = await self._coll()
             doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))}, {"messages": 1})
             if not doc:
@@ -894,6 +1072,359 @@ class AG2PersistenceManager:
             logger.warning(f"Failed to fetch event diff for {chat_id}: {e}")
             return []
 
+    # Transcript storage ------------------------------------------------
+    async def append_chat_messages(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        messages: List[Dict[str, Any]],
+    ) -> None:
+        """Append already-sequenced messages to the chat transcript.
+
+        Embedded mode pushes onto ChatSessions.messages; bucketed mode upserts the
+        ChatMessageBuckets documents covering each message's sequence. Messages
+        without a ``sequence`` are assigned one from ChatSessions.last_sequence in
+        bucketed mode, since buckets are addressed by sequence.
+        """
+        if not messages:
+            return
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not resolved_app_id:
+            raise ValueError("app_id is required")
+        now = datetime.now(UTC)
+        if not self.uses_bucketed_transcripts:
+            coll = await self._coll()
+            await coll.update_one(
+                {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
+                {"$push": {"messages": {"$each": messages}}, "$set": {"last_updated_at": now}},
+            )
+            return
+
+        unsequenced = [m for m in messages if not isinstance(m.get("sequence"), int)]
+        if unsequenced:
+            first_seq = await self._reserve_sequences(chat_id, str(resolved_app_id), len(unsequenced))
+            if first_seq is None:
+                logger.warning(f"Transcript append for {chat_id} skipped: chat session not found")
+                return
+            for offset, m in enumerate(unsequenced):
+                m["sequence"] = first_seq + offset
+
+        by_bucket: Dict[int, List[Dict[str, Any]]] = {}
+        for m in messages:
+            by_bucket.setdefault(message_bucket_index(m["sequence"], self.bucket_size), []).append(m)
+
+        operations = []
+        for bucket, bucket_msgs in sorted(by_bucket.items()):
+            set_on_insert = dual_write_app_scope(
+                {
+                    "chat_id": chat_id,
+                    "bucket": bucket,
+                    "seq_start": bucket * self.bucket_size + 1,
+                    "seq_end": (bucket + 1) * self.bucket_size,
+                    "created_at": now,
+                },
+                str(resolved_app_id),
+            )
+            operations.append(UpdateOne(
+                {"_id": message_bucket_id(chat_id, bucket)},
+                {
+                    # $sort keeps the bucket ordered by sequence even when concurrent
+                    # writers land out of order.
+                    "$push": {"messages": {"$each": bucket_msgs, "$sort": {"sequence": 1}}},
+                    "$inc": {"count": len(bucket_msgs)},
+                    "$set": {"last_updated_at": now},
+                    "$setOnInsert": set_on_insert,
+                },
+                upsert=True,
+            ))
+        # A batch spanning a bucket boundary still costs a single round trip.
+        bucket_coll = await self._message_bucket_coll()
+        await bucket_coll.bulk_write(operations, ordered=True)
+
+    async def append_sequenced_messages(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        messages: List[Dict[str, Any]],
+    ) -> List[int]:
+        """Reserve sequences for ``messages`` and append them, returning the sequences.
+
+        Embedded mode does both in ONE round trip: an update pipeline bumps
+        last_sequence by len(messages) and concatenates the messages (each with
+        its computed sequence) onto ChatSessions.messages atomically. Bucketed
+        mode reserves the whole range with one $inc and then upserts the
+        affected buckets. Each message dict is updated in place with its
+        ``sequence``. Returns [] when the chat session does not exist, or when
+        this node's run lease was taken over (fencing token is stale).
+
+        In bucketed mode a batch whose messages all carry a sequence already
+        (reserved by an earlier attempt whose bucket write failed) is appended
+        under those sequences instead of reserving new ones, so a retry leaves
+        no gap.
+        """
+        if not messages:
+            return []
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not resolved_app_id:
+            raise ValueError("app_id is required")
+        count = len(messages)
+        fence = fence_filter(chat_id)
+        if self.uses_bucketed_transcripts:
+            reserved = [m.get("sequence") for m in messages]
+            if all(isinstance(seq, int) for seq in reserved):
+                await self.append_chat_messages(chat_id=chat_id, app_id=str(resolved_app_id), messages=messages)
+                return reserved
+            first_seq = await self._reserve_sequences(chat_id, str(resolved_app_id), count, fence=fence)
+            if first_seq is None:
+                if fence:
+                    logger.warning(f"Transcript append for {chat_id} rejected: run lease fenced or chat missing")
+                return []
+            for offset, m in enumerate(messages):
+                m["sequence"] = first_seq + offset
+            await self.append_chat_messages(chat_id=chat_id, app_id=str(resolved_app_id), messages=messages)
+            return [first_seq + offset for offset in range(count)]
+
+        coll = await self._coll()
+        base_seq = {"$ifNull": ["$last_sequence", 0]}
+        # $literal keeps user content such as "$foo" from being read as a field path.
+        new_entries = [
+            {"$mergeObjects": [{"$literal": {k: v for k, v in m.items() if k != "sequence"}}, {"sequence": {"$add": [base_seq, offset + 1]}}]}
+            for offset, m in enumerate(messages)
+        ]
+        bump = await coll.find_one_and_update(
+            {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id)), **fence},
+            [{"$set": {
+                "last_sequence": {"$add": [base_seq, count]},
+                "last_updated_at": datetime.now(UTC),
+                "messages": {"$concatArrays": [{"$ifNull": ["$messages", []]}, new_entries]},
+            }}],
+            projection={"last_sequence": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not bump:
+            if fence:
+                logger.warning(f"Transcript append for {chat_id} rejected: run lease fenced or chat missing")
+            return []
+        last_seq = int(bump.get("last_sequence", count))
+        sequences = [last_seq - count + 1 + offset for offset in range(count)]
+        for m, seq in zip(messages, sequences):
+            m["sequence"] = seq
+        return sequences
+
+    async def _chat_workflow_name(self, chat_id: str, app_id: str) -> Optional[str]:
+        """Cached workflow_name lookup (fixed for the lifetime of a chat)."""
+        if chat_id in self._workflow_name_cache:
+            self._workflow_name_cache.move_to_end(chat_id)
+            return self._workflow_name_cache[chat_id]
+        coll = await self._coll()
+        doc = await coll.find_one({"_id": chat_id, **build_app_scope_filter(app_id)}, {"workflow_name": 1})
+        wf_name = doc.get("workflow_name") if doc else None
+        if doc:
+            self._workflow_name_cache[chat_id] = wf_name
+            while len(self._workflow_name_cache) > self._WORKFLOW_NAME_CACHE_MAX:
+                self._workflow_name_cache.popitem(last=False)
+        return wf_name
+
+    async def _reserve_sequences(
+        self, chat_id: str, app_id: str, count: int, *, fence: Optional[Dict[str, Any]] = None
+    ) -> Optional[int]:
+        """Atomically reserve ``count`` sequences and return the first one.
+
+        Returns None when the chat session does not exist or (with a ``fence``
+        filter) no longer matches it, so no bucket is written for it.
+        """
+        coll = await self._coll()
+        bump = await coll.find_one_and_update(
+            {"_id": chat_id, **build_app_scope_filter(app_id), **(fence or {})},
+            {"$inc": {"last_sequence": int(count)}, "$set": {"last_updated_at": datetime.now(UTC)}},
+            projection={"last_sequence": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not bump:
+            return None
+        last_seq = int(bump.get("last_sequence", count))
+        return last_seq - int(count) + 1
+
+    async def _load_bucketed_messages(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        after_sequence: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Read messages with sequence > after_sequence from ChatMessageBuckets.
+
+        Only buckets whose range can contain such sequences are fetched (served by
+        the (chat_id, seq_start) index). ``limit`` caps the result to the oldest
+        ``limit`` matching messages.
+        """
+        bucket_coll = await self._message_bucket_coll()
+        after_sequence = max(0, int(after_sequence))
+        cursor = bucket_coll.find(
+            {
+                "chat_id": chat_id,
+                **build_app_scope_filter(app_id),
+                "seq_start": {"$gt": after_sequence - self.bucket_size},
+            },
+            {"messages": 1},
+        ).sort("seq_start", 1)
+        result: List[Dict[str, Any]] = []
+        async for bucket_doc in cursor:
+            for m in bucket_doc.get("messages") or []:
+                if isinstance(m, dict) and int(m.get("sequence", 0) or 0) > after_sequence:
+                    result.append(m)
+            if limit is not None and len(result) >= limit:
+                return result[:limit]
+        return result
+
+    async def _load_recent_bucketed_messages(self, *, chat_id: str, app_id: str, count: int) -> List[Dict[str, Any]]:
+        """Return the last ``count`` messages (oldest first) from the newest buckets."""
+        bucket_coll = await self._message_bucket_coll()
+        buckets_needed = max(1, -(-int(count) // self.bucket_size)) + 1
+        docs = (
+            await bucket_coll.find({"chat_id": chat_id, **build_app_scope_filter(app_id)}, {"messages": 1})
+            .sort("seq_start", -1)
+            .limit(buckets_needed)
+            .to_list(length=buckets_needed)
+        )
+        recent: List[Dict[str, Any]] = []
+        for bucket_doc in reversed(docs):
+            recent.extend(m for m in (bucket_doc.get("messages") or []) if isinstance(m, dict))
+        return recent[-int(count):] if count > 0 else []
+
+    async def load_transcript_window(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        start_index: int = 0,
+    ) -> Optional[Dict[str, Any]]:
+        """Return ``{"status", "total_messages", "messages"}`` from a zero-based index.
+
+        Used by resume flows that address messages positionally. Embedded mode
+        slices ChatSessions.messages server-side; bucketed mode treats the index
+        as ``sequence - 1`` and reads only the buckets at or after it. Returns
+        None when the chat does not exist.
+        """
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not resolved_app_id:
+            raise ValueError("app_id is required")
+        start_index = max(0, int(start_index))
+        await self.flush_pending_events(chat_id)
+        coll = await self._coll()
+        scope = {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))}
+        if not self.uses_bucketed_transcripts:
+            docs = await coll.aggregate([
+                {"$match": scope},
+                {"$project": {
+                    "status": 1,
+                    "total_messages": {"$size": {"$ifNull": ["$messages", []]}},
+                    "messages": {"$slice": [{"$ifNull": ["$messages", []]}, start_index, 2**31 - 1]},
+                }},
+            ]).to_list(length=1)
+            if not docs:
+                return None
+            doc = docs[0]
+            return {
+                "status": doc.get("status", -1),
+                "total_messages": int(doc.get("total_messages", 0) or 0),
+                "messages": doc.get("messages") or [],
+            }
+
+        doc = await coll.find_one(scope, {"status": 1, "last_sequence": 1})
+        if not doc:
+            return None
+        messages = await self._load_bucketed_messages(
+            chat_id=chat_id, app_id=str(resolved_app_id), after_sequence=start_index
+        )
+        return {
+            "status": doc.get("status", -1),
+            "total_messages": int(doc.get("last_sequence", 0) or 0),
+            "messages": messages,
+        }
+
+    async def load_transcript_page(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        limit: int,
+        start_index: Optional[int] = None,
+        before_index: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return one page of messages addressed by zero-based index.
+
+        Forward pages (``start_index``) cover ``[start_index, start_index + limit)``;
+        backward pages cover the ``limit`` messages before ``before_index`` (the
+        newest page when both are None). The result carries ``status``,
+        ``total_messages``, ``start_index`` and ``messages``. Only the page is read:
+        embedded mode slices server-side, bucketed mode reads the covering buckets.
+        Returns None when the chat does not exist.
+        """
+        resolved_app_id = coalesce_app_id(app_id=app_id)
+        if not resolved_app_id:
+            raise ValueError("app_id is required")
+        limit = max(1, int(limit))
+        await self.flush_pending_events(chat_id)
+        coll = await self._coll()
+        scope = {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))}
+
+        if not self.uses_bucketed_transcripts:
+            total_expr: Dict[str, Any] = {"$size": {"$ifNull": ["$messages", []]}}
+            if start_index is not None:
+                start = max(0, int(start_index))
+                bounds = {"start": {"$min": [start, "$total"]}, "end": {"$min": [start + limit, "$total"]}}
+            else:
+                end_expr: Any = "$total" if before_index is None else {"$min": [max(0, int(before_index)), "$total"]}
+                bounds = {"end": end_expr, "start": {"$max": [0, {"$subtract": [end_expr, limit]}]}}
+            docs = await coll.aggregate([
+                {"$match": scope},
+                {"$project": {"status": 1, "messages": 1, "total": total_expr}},
+                {"$addFields": bounds},
+                {"$project": {
+                    "status": 1,
+                    "total": 1,
+                    "start": 1,
+                    "end": 1,
+                    # $slice needs a positive count; empty pages are trimmed below.
+                    "messages": {"$slice": [
+                        {"$ifNull": ["$messages", []]},
+                        "$start",
+                        {"$max": [1, {"$subtract": ["$end", "$start"]}]},
+                    ]},
+                }},
+            ]).to_list(length=1)
+            if not docs:
+                return None
+            doc = docs[0]
+            start, end = int(doc.get("start", 0) or 0), int(doc.get("end", 0) or 0)
+            return {
+                "status": doc.get("status", -1),
+                "total_messages": int(doc.get("total", 0) or 0),
+                "start_index": start,
+                "messages": (doc.get("messages") or [])[: max(0, end - start)],
+            }
+
+        doc = await coll.find_one(scope, {"status": 1, "last_sequence": 1})
+        if not doc:
+            return None
+        total = int(doc.get("last_sequence", 0) or 0)
+        if start_index is not None:
+            start = min(max(0, int(start_index)), total)
+            end = min(start + limit, total)
+        else:
+            end = total if before_index is None else min(max(0, int(before_index)), total)
+            start = max(0, end - limit)
+        messages: List[Dict[str, Any]] = []
+        if end > start:
+            messages = await self._load_bucketed_messages(
+                chat_id=chat_id, app_id=str(resolved_app_id), after_sequence=start, limit=end - start
+            )
+        return {"status": doc.get("status", -1), "total_messages": total, "start_index": start, "messages": messages}
+
     # Events ------------------------------------------------------------
     async def save_event(self, event: BaseEvent, chat_id: str, app_id: Optional[str] = None) -> None:
         resolved_app_id = coalesce_app_id(app_id=app_id)
@@ -905,19 +1436,10 @@ class AG2PersistenceManager:
                 return
             # After the isinstance guard, we can safely treat event as TextEvent for type checkers
             text_event = cast(TextEvent, event)
-            coll = await self._coll()
-            # Atomically bump per-session sequence counter and read new value
             try:
-                bump = await coll.find_one_and_update(
-                    {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
-                    {"$inc": {"last_sequence": 1}, "$set": {"last_updated_at": datetime.now(UTC)}},
-                    return_document=ReturnDocument.AFTER,
-                )
-                seq = int(bump.get("last_sequence", 1)) if bump else 1
-                wf_name = bump.get("workflow_name") if bump else None
+                wf_name = await self._chat_workflow_name(chat_id, str(resolved_app_id))
             except Exception as e:
-                logger.warning(f"Failed to update sequence counter for {chat_id}: {e}")
-                seq = 1
+                logger.warning(f"Failed to resolve workflow for {chat_id}: {e}")
                 wf_name = None
             event_id = getattr(text_event, "id", None) or getattr(text_event, "event_id", None) or getattr(text_event, "event_uuid", None) or str(uuid4())
             sender_obj = getattr(text_event, "sender", None)
@@ -1017,7 +1539,6 @@ class AG2PersistenceManager:
                 "timestamp": evt_ts,
                 "event_type": "message.created",
                 "event_id": event_id,
-                "sequence": seq,
             }
             if role == "assistant":
                 msg["agent_name"] = raw_name
@@ -1043,90 +1564,60 @@ class AG2PersistenceManager:
                         logger.warning(f"[SAVE_EVENT] ✗ Failed to parse JSON for {raw_name}, content_preview: {content_str[:200] if content_str else '(empty)'}")
             except Exception as so_err:  # pragma: no cover
                 logger.debug(f"[SAVE_EVENT] Structured output parse skipped agent={raw_name}: {so_err}")
-            await coll.update_one(
-                {"_id": chat_id, **build_app_scope_filter(str(resolved_app_id))},
-                {"$push": {"messages": msg}, "$set": {"last_updated_at": datetime.now(UTC)}},
-            )
-            
-            # Log agent conversation to dedicated file with pretty formatting
-            try:
-                import logging as _logging
-                import json as _json
-                agent_conv_logger = _logging.getLogger("mozaiks.workflow.agent_messages")
-                agent_name = msg.get("agent_name", "unknown")
-                
-                # Try to parse and pretty-print JSON content
-                display_content = content_str
-                is_json = False
-                if content_str.strip().startswith('{') or content_str.strip().startswith('['):
-                    try:
-                        parsed = _json.loads(content_str)
-                        # Pretty print with indentation
-                        display_content = _json.dumps(parsed, indent=2, ensure_ascii=False)
-                        is_json = True
-                    except Exception:
-                        # Not valid JSON, use as-is
-                        pass
-                
-                # Optional truncation (controlled via env) and text wrapping
-                max_len = _AGENT_CONV_JSON_MAX_LEN if is_json else _AGENT_CONV_TEXT_MAX_LEN
-                truncated_suffix = ""
-                if max_len is not None and len(display_content) > max_len:
-                    display_content = display_content[:max_len]
-                    truncated_suffix = "\n... (truncated)"
-
-                if not is_json and display_content:
-                    wrapped_lines: list[str] = []
-                    split_lines = display_content.splitlines() or [display_content]
-                    for raw_line in split_lines:
-                        if not raw_line.strip():
-                            wrapped_lines.append("")
-                            continue
-                        wrapped_lines.extend(
-                            textwrap.wrap(
-                                raw_line,
-                                width=100,
-                                break_long_words=False,
-                                break_on_hyphens=False,
-                            )
-                        )
-                    display_content = "\n".join(wrapped_lines)
-
-                if truncated_suffix:
-                    display_content = f"{display_content}{truncated_suffix}"
-
-                # Add visual separator and metadata block for readability
-                separator = "=" * 80
-                meta_lines = [
-                    f"agent: {agent_name}",
-                    f"chat_id: {chat_id}",
-                    f"app_id: {resolved_app_id}",
-                    f"app_id: {resolved_app_id}",
-                    f"sequence: {seq}",
-                    f"event_id: {event_id}",
-                ]
-                body = display_content if display_content else "(empty)"
-                log_message = (
-                    f"\n{separator}\n"
-                    + "\n".join(meta_lines)
-                    + f"\n{separator}\n{body}\n"
+            if self.write_behind:
+                # Sequence is assigned when the per-chat worker flushes the batch.
+                await get_transcript_write_behind().enqueue(
+                    chat_id=chat_id,
+                    app_id=str(resolved_app_id),
+                    message=msg,
+                    flush_fn=self._flush_transcript_batch,
+                    on_flushed=self._log_flushed_agent_messages,
                 )
-                
-                agent_conv_logger.info(
-                    log_message,
-                    extra={
-                        "chat_id": chat_id,
-                        "app_id": resolved_app_id,
-                        "sequence": seq,
-                        "event_id": event_id,
-                    }
-                )
-            except Exception as log_err:  # pragma: no cover
-                logger.debug(f"Failed to log agent conversation: {log_err}")
-                
+                return
+            # Sequence reservation + append in a single round trip (embedded mode)
+            sequences = await self.append_sequenced_messages(chat_id=chat_id, app_id=str(resolved_app_id), messages=[msg])
+            if not sequences:
+                logger.warning(f"Failed to persist event for {chat_id}: chat session not found")
+                return
+            self._log_agent_message(msg, chat_id=chat_id, app_id=str(resolved_app_id))
         except Exception as e:  # pragma: no cover
             logger.error(f"Failed to save event for {chat_id}: {e}")
 
+    async def _flush_transcript_batch(self, chat_id: str, app_id: str, messages: List[Dict[str, Any]]) -> List[int]:
+        """Write-behind flush target: one sequenced append for the whole batch."""
+        return await self.append_sequenced_messages(chat_id=chat_id, app_id=app_id, messages=messages)
+
+    def _log_flushed_agent_messages(self, chat_id: str, app_id: str, messages: List[Dict[str, Any]]) -> None:
+        for msg in messages:
+            self._log_agent_message(msg, chat_id=chat_id, app_id=app_id)
+
+    async def flush_pending_events(self, chat_id: str) -> None:
+        """Persist any write-behind messages still queued for ``chat_id``."""
+        if self.write_behind:
+            await get_transcript_write_behind().flush(chat_id)
+
+    def _log_agent_message(self, msg: Dict[str, Any], *, chat_id: str, app_id: str) -> None:
+        """Log a persisted transcript message to the agent conversation log.
+
+        Only the raw fields are handed over; pretty-printing, truncation and
+        wrapping are done by the log handler's formatter (off the event loop
+        when logging runs in queue mode).
+        """
+        try:
+            _agent_conv_logger.info(
+                "agent_message",
+                extra={
+                    "agent_name": msg.get("agent_name", "unknown"),
+                    "agent_content": str(msg.get("content") or ""),
+                    "chat_id": chat_id,
+                    "app_id": app_id,
+                    "sequence": msg.get("sequence"),
+                    "event_id": msg.get("event_id"),
+                },
+            )
+        except Exception as log_err:  # pragma: no cover
+            logger.debug(f"Failed to log agent conversation: {log_err}")
+
     async def save_usage_summary_event(
         self,
         *,
@@ -1172,6 +1663,59 @@ class AG2PersistenceManager:
             logger.error(f"Failed to process UsageSummaryEvent for {chat_id}: {e}")
 
     # Usage summary ----------------------------------------------------
+    async def _seed_session_stats(
+        self,
+        *,
+        summary_id: str,
+        chat_id: str,
+        app_id: str,
+        workflow_name: str,
+        user_id: str,
+        now: datetime,
+    ) -> bool:
+        """Create the zeroed WorkflowSessionStats entry for a chat; True if it was new."""
+        session_stats = await self._session_stats_coll()
+        res = await session_stats.update_one(
+            {"_id": f"{summary_id}:{chat_id}"},
+            {"$setOnInsert": {
+                **self._session_stats_identity(summary_id, chat_id, app_id, workflow_name, user_id, now),
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+                "cost_total_usd": 0.0,
+                "duration_sec": 0.0,
+            }},
+            upsert=True,
+        )
+        return res.upserted_id is not None
+
+    @staticmethod
+    def _session_stats_identity(
+        summary_id: str, chat_id: str, app_id: str, workflow_name: str, user_id: str, now: datetime
+    ) -> Dict[str, Any]:
+        return dual_write_app_scope(
+            {
+                "summary_id": summary_id,
+                "chat_id": chat_id,
+                "workflow_name": workflow_name,
+                "user_id": user_id,
+                "created_at": now,
+            },
+            app_id,
+        )
+
+    @staticmethod
+    def _event_ts_delta(event_ts: datetime, previous: Any) -> float:
+        """Seconds between two usage events (0 when unknown or out of order)."""
+        if not isinstance(previous, datetime):
+            return 0.0
+        # Mongo can return naive datetimes when tz_aware=False; treat as UTC.
+        if previous.tzinfo is None:
+            previous = previous.replace(tzinfo=UTC)
+        if event_ts.tzinfo is None:
+            event_ts = event_ts.replace(tzinfo=UTC)
+        return max(0.0, (event_ts - previous).total_seconds())
+
     async def update_session_metrics(
         self,
         chat_id: str,
@@ -1187,78 +1731,101 @@ class AG2PersistenceManager:
         duration_sec: float = 0.0,
         session_type: str = "workflow",
     ) -> None:
-        """Update live unified rollup document with per-chat + per-agent metrics and usage aggregation.
-
-        Replaces per-chat metrics document updates. We directly mutate the
-        rollup doc (mon_{app_id}_{workflow_name}) so UI / analytics can read
-        a single authoritative structure during execution.
+        """Apply one usage delta to the live rollup in a constant number of round trips.
+
+        1. WorkflowSessionStats entry for the chat: $inc chat + agent counters and
+           return the previous document (tells us whether the chat / agent is new
+           and the previous event timestamp).
+        2. mon_{app_id}_{workflow_name}: $inc running totals (and ``n`` for new
+           chats / agents). Averages are derived from totals at read time
+           (see models.WorkflowSummaryDoc), so nothing is re-read or re-summed.
+        3. ChatSessions: $inc the flattened usage_* counters.
+
+        When ``duration_sec`` is not provided the duration delta is the gap since
+        the chat's (or agent's) previous usage event, which costs one extra update.
         """
         resolved_app_id = coalesce_app_id(app_id=app_id)
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
             stats_coll = await self._workflow_stats_coll()
+            session_stats = await self._session_stats_coll()
             summary_id = f"mon_{resolved_app_id}_{workflow_name}"
+            entry_id = f"{summary_id}:{chat_id}"
             total_tokens = prompt_tokens + completion_tokens
             now = datetime.now(UTC)
             if event_ts is None:
                 event_ts = now
-            # Ensure base summary & chat session containers exist
-            await stats_coll.update_one(
-                {"_id": summary_id},
-                {"$setOnInsert": {
-                    "_id": summary_id,
-                    "app_id": resolved_app_id,
-                    "workflow_name": workflow_name,
-                    "last_updated_at": now,
-                    "overall_avg": {
-                        "avg_duration_sec": 0.0,
-                        "avg_prompt_tokens": 0,
-                        "avg_completion_tokens": 0,
-                        "avg_total_tokens": 0,
-                        "avg_cost_total_usd": 0.0,
-                    },
-                    "chat_sessions": {},
-                    "agents": {}
-                }}, upsert=True
+            explicit_duration = max(0.0, float(duration_sec or 0.0))
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": total_tokens,
+                "cost_total_usd": cost_usd,
+            }
+            agent_prefix = f"agents.{agent_name}." if agent_name else None
+
+            entry_inc: Dict[str, Any] = dict(usage)
+            # $max keeps last_event_ts monotonic if deltas arrive out of order.
+            entry_max: Dict[str, Any] = {"last_event_ts": event_ts}
+            projection: Dict[str, Any] = {"last_event_ts": 1}
+            if explicit_duration:
+                entry_inc["duration_sec"] = explicit_duration
+            if agent_prefix:
+                entry_inc.update({agent_prefix + k: v for k, v in usage.items()})
+                if explicit_duration:
+                    entry_inc[agent_prefix + "duration_sec"] = explicit_duration
+                entry_max[agent_prefix + "last_event_ts"] = event_ts
+                projection[agent_prefix + "last_event_ts"] = 1
+            before = await session_stats.find_one_and_update(
+                {"_id": entry_id},
+                {
+                    "$inc": entry_inc,
+                    "$max": entry_max,
+                    "$set": {"last_updated_at": now},
+                    "$setOnInsert": self._session_stats_identity(
+                        summary_id, chat_id, str(resolved_app_id), workflow_name, user_id, now
+                    ),
+                },
+                projection=projection,
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
             )
-            # Seed chat session metrics if absent
+            prev_agent = ((before or {}).get("agents") or {}).get(agent_name) if agent_name else None
+
+            chat_duration = explicit_duration
+            agent_duration = explicit_duration
+            if not explicit_duration:
+                chat_duration = self._event_ts_delta(event_ts, (before or {}).get("last_event_ts"))
+                agent_duration = self._event_ts_delta(event_ts, (prev_agent or {}).get("last_event_ts"))
+                duration_inc: Dict[str, Any] = {}
+                if chat_duration:
+                    duration_inc["duration_sec"] = chat_duration
+                if agent_prefix and agent_duration:
+                    duration_inc[agent_prefix + "duration_sec"] = agent_duration
+                if duration_inc:
+                    await session_stats.update_one({"_id": entry_id}, {"$inc": duration_inc})
+
+            rollup_inc: Dict[str, Any] = {f"totals.{k}": v for k, v in usage.items()}
+            if chat_duration:
+                rollup_inc["totals.duration_sec"] = chat_duration
+            if before is None:
+                rollup_inc["totals.n"] = 1
+            if agent_name:
+                rollup_inc.update({f"agents.{agent_name}.totals.{k}": v for k, v in usage.items()})
+                if agent_duration:
+                    rollup_inc[f"agents.{agent_name}.totals.duration_sec"] = agent_duration
+                if not prev_agent:
+                    rollup_inc[f"agents.{agent_name}.totals.n"] = 1
             await stats_coll.update_one(
-                {"_id": summary_id, f"chat_sessions.{chat_id}": {"$exists": False}},
-                {"$set": {f"chat_sessions.{chat_id}": {
-                    "duration_sec": 0.0,
-                    "prompt_tokens": 0,
-                    "completion_tokens": 0,
-                    "total_tokens": 0,
-                    "cost_total_usd": 0.0,
-                    # Track per-chat last event time to accumulate duration between usage deltas
-                    "last_event_ts": event_ts
-                }}, "$setOnInsert": {"last_updated_at": now}}
+                {"_id": summary_id},
+                {
+                    "$inc": rollup_inc,
+                    "$set": {"last_updated_at": now},
+                    "$setOnInsert": {"app_id": resolved_app_id, "workflow_name": workflow_name},
+                },
+                upsert=True,
             )
-            # Increment per-chat metrics
-            inc_ops = {
-                f"chat_sessions.{chat_id}.prompt_tokens": prompt_tokens,
-                f"chat_sessions.{chat_id}.completion_tokens": completion_tokens,
-                f"chat_sessions.{chat_id}.total_tokens": total_tokens,
-                f"chat_sessions.{chat_id}.cost_total_usd": cost_usd,
-            }
-            # Compute chat-level duration delta, prefer provided duration_sec
-            chat_duration_delta = max(0.0, duration_sec)
-            if chat_duration_delta <= 0:
-                try:
-                    prev_ts_doc = await stats_coll.find_one({"_id": summary_id}, {f"chat_sessions.{chat_id}.last_event_ts": 1})
-                    prev_session = None
-                    if prev_ts_doc:
-                        prev_cs_map = prev_ts_doc.get("chat_sessions") or {}
-                        prev_session = prev_cs_map.get(chat_id) or {}
-                    prev_ts_val = prev_session.get("last_event_ts") if prev_session else None  # type: ignore
-                    if isinstance(prev_ts_val, datetime):
-                        chat_duration_delta = max(0.0, (event_ts - prev_ts_val).total_seconds())  # type: ignore
-                except Exception:
-                    chat_duration_delta = 0.0
-            if chat_duration_delta > 0:
-                inc_ops[f"chat_sessions.{chat_id}.duration_sec"] = chat_duration_delta
-            await stats_coll.update_one({"_id": summary_id}, {"$inc": inc_ops, "$set": {"last_updated_at": now, f"chat_sessions.{chat_id}.last_event_ts": event_ts}})
 
             # Also reflect usage counters directly inside ChatSessions doc so rollup recompute stays consistent
             chat_coll = await (self._general_coll() if session_type == "general" else self._coll())
@@ -1271,102 +1838,6 @@ class AG2PersistenceManager:
                     "usage_total_cost_final": cost_usd,
                 }, "$set": {"last_updated_at": now, "app_id": resolved_app_id}}
             )
-
-            # Per-agent session metrics (with duration accumulation based on event timestamp)
-            if agent_name:
-                # Seed agent container & agent.session container if absent
-                await stats_coll.update_one(
-                    {"_id": summary_id, f"agents.{agent_name}": {"$exists": False}},
-                    {"$set": {f"agents.{agent_name}": {
-                        "avg": {
-                            "avg_duration_sec": 0.0,
-                            "avg_prompt_tokens": 0,
-                            "avg_completion_tokens": 0,
-                            "avg_total_tokens": 0,
-                            "avg_cost_total_usd": 0.0,
-                        },
-                        "sessions": {}
-                    }}}
-                )
-                await stats_coll.update_one(
-                    {"_id": summary_id, f"agents.{agent_name}.sessions.{chat_id}": {"$exists": False}},
-                    {"$set": {f"agents.{agent_name}.sessions.{chat_id}": {
-                        "duration_sec": 0.0,
-                        "prompt_tokens": 0,
-                        "completion_tokens": 0,
-                        "total_tokens": 0,
-                        "cost_total_usd": 0.0
-                    }}}
-                )
-                agent_inc = {
-                    f"agents.{agent_name}.sessions.{chat_id}.prompt_tokens": prompt_tokens,
-                    f"agents.{agent_name}.sessions.{chat_id}.completion_tokens": completion_tokens,
-                    f"agents.{agent_name}.sessions.{chat_id}.total_tokens": total_tokens,
-                    f"agents.{agent_name}.sessions.{chat_id}.cost_total_usd": cost_usd,
-                }
-                # Compute duration delta using last_event_ts (stored per agent session)
-                duration_delta = max(0.0, duration_sec)
-                if duration_delta <= 0:
-                    try:
-                        prev_ts_doc = await stats_coll.find_one({"_id": summary_id}, {f"agents.{agent_name}.sessions.{chat_id}.last_event_ts": 1})
-                        prev_session = None
-                        if prev_ts_doc:
-                            prev_agents = prev_ts_doc.get("agents") or {}
-                            prev_agent = prev_agents.get(agent_name) or {}
-                            prev_sessions = prev_agent.get("sessions") or {}
-                            prev_session = prev_sessions.get(chat_id) or {}
-                        prev_ts_val = prev_session.get("last_event_ts") if prev_session else None  # type: ignore
-                        if isinstance(prev_ts_val, datetime):
-                            duration_delta = max(0.0, (event_ts - prev_ts_val).total_seconds())  # type: ignore
-                        else:
-                            duration_delta = 0.0
-                    except Exception:
-                        duration_delta = 0.0
-                if duration_delta > 0:
-                    agent_inc[f"agents.{agent_name}.sessions.{chat_id}.duration_sec"] = duration_delta
-                # Apply increments and set last_event_ts
-                await stats_coll.update_one({"_id": summary_id}, {"$inc": agent_inc, "$set": {f"agents.{agent_name}.sessions.{chat_id}.last_event_ts": event_ts}})
-
-            # Recompute averages (simple read & aggregate) -- small doc so acceptable.
-            doc = await stats_coll.find_one({"_id": summary_id}, {"chat_sessions": 1, "agents": 1})
-            if doc and isinstance(doc.get("chat_sessions"), dict):
-                cs = doc["chat_sessions"]
-                n = len(cs) if cs else 0
-                if n:
-                    total_prompt = sum(int(v.get("prompt_tokens", 0)) for v in cs.values())
-                    total_completion = sum(int(v.get("completion_tokens", 0)) for v in cs.values())
-                    total_total = sum(int(v.get("total_tokens", 0)) for v in cs.values())
-                    total_cost = sum(float(v.get("cost_total_usd", 0.0)) for v in cs.values())
-                    total_duration = sum(float(v.get("duration_sec", 0.0)) for v in cs.values())
-                    await stats_coll.update_one(
-                        {"_id": summary_id},
-                        {"$set": {
-                            "overall_avg.avg_prompt_tokens": int(total_prompt / n),
-                            "overall_avg.avg_completion_tokens": int(total_completion / n),
-                            "overall_avg.avg_total_tokens": int(total_total / n),
-                            "overall_avg.avg_cost_total_usd": (total_cost / n),
-                            "overall_avg.avg_duration_sec": (total_duration / n),
-                        }}
-                    )
-            if agent_name:
-                doc = await stats_coll.find_one({"_id": summary_id}, {f"agents.{agent_name}": 1})
-                ag = doc.get("agents", {}).get(agent_name) if doc else None
-                if ag and isinstance(ag.get("sessions"), dict):
-                    sess_map = ag["sessions"]
-                    an = len(sess_map)
-                    if an:
-                        ap = sum(int(v.get("prompt_tokens", 0)) for v in sess_map.values())
-                        ac = sum(int(v.get("completion_tokens", 0)) for v in sess_map.values())
-                        at = sum(int(v.get("total_tokens", 0)) for v in sess_map.values())
-                        acost = sum(float(v.get("cost_total_usd", 0.0)) for v in sess_map.values())
-                        adur = sum(float(v.get("duration_sec", 0.0)) for v in sess_map.values())
-                        await stats_coll.update_one({"_id": summary_id}, {"$set": {
-                            f"agents.{agent_name}.avg.avg_prompt_tokens": int(ap / an),
-                            f"agents.{agent_name}.avg.avg_completion_tokens": int(ac / an),
-                            f"agents.{agent_name}.avg.avg_total_tokens": int(at / an),
-                            f"agents.{agent_name}.avg.avg_cost_total_usd": (acost / an),
-                            f"agents.{agent_name}.avg.avg_duration_sec": (adur / an),
-                        }})
         except Exception as e:  # pragma: no cover
             logger.error(f"Failed to update session metrics for {chat_id}: {e}")
 
@@ -1613,6 +2084,14 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
+            # The "most recent agent message" may still be queued.
+            await self.flush_pending_events(chat_id)
+            if self.uses_bucketed_transcripts:
+                await self._attach_bucketed_ui_tool_metadata(
+                    chat_id=chat_id, app_id=str(resolved_app_id), event_id=event_id, metadata=metadata
+                )
+                return
+
             coll = await self._coll()
             
             # Find the chat document first
@@ -1667,6 +2146,39 @@ class AG2PersistenceManager:
         except Exception as e:
             logger.error(f"[UI_TOOL_METADATA] Failed to attach metadata for {chat_id}: {e}", exc_info=True)
 
+    async def _attach_bucketed_ui_tool_metadata(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        event_id: str,
+        metadata: Dict[str, Any],
+    ) -> None:
+        """Bucketed-mode variant: walk buckets newest-first to find the last assistant message."""
+        bucket_coll = await self._message_bucket_coll()
+        cursor = bucket_coll.find(
+            {"chat_id": chat_id, **build_app_scope_filter(app_id)},
+            {"messages.role": 1},
+        ).sort("seq_start", -1)
+        async for bucket_doc in cursor:
+            messages = bucket_doc.get("messages") or []
+            for idx in range(len(messages) - 1, -1, -1):
+                msg = messages[idx]
+                if isinstance(msg, dict) and msg.get("role") == "assistant":
+                    result = await bucket_coll.update_one(
+                        {"_id": bucket_doc["_id"]},
+                        {"$set": {f"messages.{idx}.metadata": {"ui_tool": metadata}}},
+                    )
+                    if result.modified_count > 0:
+                        logger.info(
+                            f"[UI_TOOL_METADATA] Attached ui_tool metadata to {bucket_doc['_id']} message[{idx}] "
+                            f"(tool={metadata.get('ui_tool_id')}, event={event_id})"
+                        )
+                    else:
+                        logger.warning(f"[UI_TOOL_METADATA] Failed to update message in {chat_id}")
+                    return
+        logger.warning(f"[UI_TOOL_METADATA] No assistant message found in {chat_id}")
+
     async def update_ui_tool_completion(
         self,
         *,
@@ -1693,12 +2205,17 @@ class AG2PersistenceManager:
         if not resolved_app_id:
             raise ValueError("app_id is required")
         try:
-            coll = await self._coll()
+            if self.uses_bucketed_transcripts:
+                coll = await self._message_bucket_coll()
+                target = {"chat_id": chat_id}
+            else:
+                coll = await self._coll()
+                target = {"_id": chat_id}
             
             # Find the message with matching ui_tool.event_id
             result = await coll.update_one(
                 {
-                    "_id": chat_id,
+                    **target,
                     **build_app_scope_filter(str(resolved_app_id)),
                     "messages.metadata.ui_tool.event_id": event_id
                 },
@@ -0,0 +1,281 @@
+# ==============================================================================
+# FILE: run_lease.py
+# DESCRIPTION: Per-chat run-ownership leases with fencing tokens
+# ==============================================================================
+
+"""Run-ownership leases so only one node orchestrates a chat at a time.
+
+With several workers a chat can be started twice (websocket auto-start plus a
+``start_chat`` replay, or a reconnect landing on another node). Each
+orchestration run first acquires the chat's lease document in
+``ChatRunLeases``:
+
+- Acquire succeeds when the lease is free, expired, or already held by this
+  node id; every acquisition increments ``token`` (the fencing token).
+- The holder renews ``expires_at`` every ``ttl / 3``. A node that dies stops
+  renewing, so after ``MOZAIKS_RUN_LEASE_TTL_SEC`` the chat can be resumed
+  anywhere.
+- A holder that fails to renew (lease expired and taken over) cancels its run.
+- The token is stamped on ``ChatSessions.lease_token`` (``$max``) and transcript
+  appends only match while ``lease_token <= token``, so a stale holder that wakes
+  up after a takeover cannot write into the transcript. After a lost run ends its
+  token keeps fencing straggler writes (e.g. a write-behind flush) for one more
+  TTL, then it is forgotten.
+
+Leases are enabled by ``MOZAIKS_RUN_LEASES`` (``true`` / ``false`` / ``auto``;
+``auto`` follows ``MOZAIKS_BACKPLANE=mongo``). Disabled, runs behave as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from logs.logging_config import get_workflow_logger
+
+logger = get_workflow_logger("run_lease")
+
+_DB_NAME = "MozaiksAI"
+_LEASES_COLLECTION = "ChatRunLeases"
+_SESSIONS_COLLECTION = "ChatSessions"
+
+
+def run_leases_enabled() -> bool:
+    """Whether orchestration runs must hold the chat's lease."""
+    mode = (os.getenv("MOZAIKS_RUN_LEASES") or "auto").strip().lower()
+    if mode == "auto":
+        return (os.getenv("MOZAIKS_BACKPLANE") or "memory").strip().lower() == "mongo"
+    return mode in ("1", "true", "yes", "y", "on")
+
+
+def _lease_ttl_sec() -> float:
+    try:
+        return max(3.0, float(os.getenv("MOZAIKS_RUN_LEASE_TTL_SEC", "30")))
+    except ValueError:
+        return 30.0
+
+
+@dataclass
+class RunLease:
+    chat_id: str
+    node_id: str
+    token: int
+    expires_at: float  # time.monotonic() deadline as last confirmed by Mongo
+    lost: bool = False
+
+
+class RunLeaseManager:
+    """Acquire / renew / release chat leases and expose fencing tokens for writers."""
+
+    def __init__(self, client: Any = None, node_id: Optional[str] = None, ttl_sec: Optional[float] = None) -> None:
+        self._client = client
+        self._node_id = node_id
+        self.ttl_sec = ttl_sec if ttl_sec is not None else _lease_ttl_sec()
+        self._held: Dict[str, RunLease] = {}
+        # chat_id -> (token, monotonic expiry) of leases lost to another node: late
+        # writes from the cancelled run stay fenced until the expiry, then it is dropped.
+        self._lost_tokens: Dict[str, Tuple[int, float]] = {}
+        self._indexes_ready = False
+        self.acquired = 0
+        self.refused = 0
+        self.lost = 0
+
+    @property
+    def node_id(self) -> str:
+        if self._node_id is None:
+            # Same identity the transport backplane uses for socket ownership.
+            from mozaiksai.core.transport.backplane import get_backplane
+
+            self._node_id = get_backplane().node_id
+        return self._node_id
+
+    def _db(self):
+        if self._client is None:
+            from mozaiksai.core.core_config import get_mongo_client
+
+            self._client = get_mongo_client()
+        return self._client[_DB_NAME]
+
+    def fence_token(self, chat_id: str) -> Optional[int]:
+        """Token to fence this node's writes for ``chat_id`` with, else None."""
+        lease = self._held.get(chat_id)
+        if lease is not None:
+            return lease.token
+        lost = self._lost_tokens.get(chat_id)
+        if lost is None:
+            return None
+        if lost[1] <= time.monotonic():
+            del self._lost_tokens[chat_id]
+            return None
+        return lost[0]
+
+    def _prune_lost_tokens(self) -> None:
+        now = time.monotonic()
+        for chat_id in [cid for cid, (_, expires) in self._lost_tokens.items() if expires <= now]:
+            del self._lost_tokens[chat_id]
+
+    async def acquire(self, chat_id: str) -> Optional[RunLease]:
+        """Take the lease (new token) or return None if another run holds it."""
+        if chat_id in self._held:
+            self.refused += 1
+            return None
+        leases = self._db()[_LEASES_COLLECTION]
+        if not self._indexes_ready:
+            try:
+                await leases.create_index("node_id")
+            except Exception as e:
+                logger.debug(f"[RUN_LEASE] Index creation failed: {e}")
+            self._indexes_ready = True
+        now = datetime.now(timezone.utc)
+        try:
+            doc = await leases.find_one_and_update(
+                {"_id": chat_id, "$or": [{"expires_at": {"$lte": now}}, {"node_id": self.node_id}]},
+                {
+                    "$set": {"node_id": self.node_id, "acquired_at": now, "expires_at": now + timedelta(seconds=self.ttl_sec)},
+                    "$inc": {"token": 1},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            doc = None  # live lease held by another node (upsert collided with its _id)
+        if not doc:
+            self.refused += 1
+            return None
+        lease = RunLease(chat_id=chat_id, node_id=self.node_id, token=int(doc["token"]), expires_at=time.monotonic() + self.ttl_sec)
+        self._held[chat_id] = lease
+        self._lost_tokens.pop(chat_id, None)
+        self._prune_lost_tokens()
+        self.acquired += 1
+        try:
+            await self._db()[_SESSIONS_COLLECTION].update_one({"_id": chat_id}, {"$max": {"lease_token": lease.token}})
+        except Exception as e:
+            logger.warning(f"[RUN_LEASE] Failed to stamp fencing token on {chat_id}: {e}")
+        logger.info(f"[RUN_LEASE] Acquired {chat_id} token={lease.token} node={self.node_id}")
+        return lease
+
+    async def renew(self, lease: RunLease) -> bool:
+        """Extend the lease; False once it is definitely lost."""
+        now = datetime.now(timezone.utc)
+        try:
+            result = await self._db()[_LEASES_COLLECTION].update_one(
+                {"_id": lease.chat_id, "node_id": lease.node_id, "token": lease.token},
+                {"$set": {"expires_at": now + timedelta(seconds=self.ttl_sec)}},
+            )
+        except Exception as e:
+            # Transient errors are tolerated until the last confirmed expiry passes.
+            logger.warning(f"[RUN_LEASE] Renew failed for {lease.chat_id}: {e}")
+            return time.monotonic() < lease.expires_at
+        if result.matched_count == 0:
+            return False
+        lease.expires_at = time.monotonic() + self.ttl_sec
+        return True
+
+    async def release(self, lease: RunLease) -> None:
+        """Expire the lease now (the token stays so the next holder gets a larger one)."""
+        if self._held.get(lease.chat_id) is lease:
+            del self._held[lease.chat_id]
+        self._prune_lost_tokens()
+        if lease.lost:
+            # The run has ended; fence its stragglers for one TTL only.
+            self._lost_tokens[lease.chat_id] = (lease.token, time.monotonic() + self.ttl_sec)
+            return
+        try:
+            await self._db()[_LEASES_COLLECTION].update_one(
+                {"_id": lease.chat_id, "node_id": lease.node_id, "token": lease.token},
+                {"$set": {"expires_at": datetime.now(timezone.utc)}},
+            )
+        except Exception as e:
+            logger.warning(f"[RUN_LEASE] Release failed for {lease.chat_id} (expires on its own): {e}")
+
+    async def holder_of(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Current lease document if it has not expired."""
+        doc = await self._db()[_LEASES_COLLECTION].find_one({"_id": chat_id})
+        if not doc:
+            return None
+        expires_at = doc.get("expires_at")
+        if isinstance(expires_at, datetime) and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if not isinstance(expires_at, datetime) or expires_at <= datetime.now(timezone.utc):
+            return None
+        return doc
+
+    @asynccontextmanager
+    async def hold(self, chat_id: str) -> AsyncIterator[Optional[RunLease]]:
+        """Hold the chat's lease for the body, renewing it in the background.
+
+        Yields None when another run holds it. If the lease is lost mid-run the
+        task that entered the block is cancelled.
+        """
+        lease = await self.acquire(chat_id)
+        if lease is None:
+            yield None
+            return
+        renewer = asyncio.create_task(self._renew_loop(lease, asyncio.current_task()))
+        try:
+            yield lease
+        finally:
+            renewer.cancel()
+            await self.release(lease)
+
+    async def _renew_loop(self, lease: RunLease, owner: Optional[asyncio.Task]) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_sec / 3)
+            if await self.renew(lease):
+                continue
+            lease.lost = True
+            self.lost += 1
+            logger.error(f"[RUN_LEASE] Lost lease for {lease.chat_id} (token={lease.token}); cancelling run")
+            if owner is not None and not owner.done():
+                owner.cancel()
+            return
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": run_leases_enabled(),
+            "node_id": self._node_id,
+            "ttl_sec": self.ttl_sec,
+            "held": {cid: lease.token for cid, lease in self._held.items()},
+            "fenced_lost": len(self._lost_tokens),
+            "acquired": self.acquired,
+            "refused": self.refused,
+            "lost": self.lost,
+        }
+
+
+_run_lease_manager: Optional[RunLeaseManager] = None
+
+
+def get_run_lease_manager() -> RunLeaseManager:
+    """Process-wide lease manager."""
+    global _run_lease_manager
+    if _run_lease_manager is None:
+        _run_lease_manager = RunLeaseManager()
+    return _run_lease_manager
+
+
+def fence_filter(chat_id: str) -> Dict[str, Any]:
+    """Extra ChatSessions filter for transcript writes ({} when no lease is held)."""
+    if _run_lease_manager is None:
+        return {}
+    token = _run_lease_manager.fence_token(chat_id)
+    if token is None:
+        return {}
+    return {"lease_token": {"$not": {"$gt": token}}}
+
+
+__all__ = [
+    "RunLease",
+    "RunLeaseManager",
+    "fence_filter",
+    "get_run_lease_manager",
+    "run_leases_enabled",
+]
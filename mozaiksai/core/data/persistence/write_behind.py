@@ -0,0 +1,259 @@
+# ==============================================================================
+# FILE: write_behind.py
+# DESCRIPTION: Opt-in write-behind queue for chat transcript persistence
+# ==============================================================================
+
+"""Write-behind batching for transcript messages.
+
+When ``TRANSCRIPT_WRITE_BEHIND`` is enabled, ``AG2PersistenceManager.save_event``
+hands the built message to this queue instead of awaiting Mongo inline, so a
+slow database no longer stalls the AG2 event stream.
+
+Each chat gets its own bounded ``asyncio.Queue`` drained by a single worker task.
+The worker coalesces pending messages into one batch (up to
+``TRANSCRIPT_WRITE_BEHIND_BATCH_SIZE`` messages, or whatever arrived within
+``TRANSCRIPT_WRITE_BEHIND_FLUSH_MS``) and persists it with one
+``append_sequenced_messages`` call. Because sequences are reserved at flush time
+by the single per-chat worker, in queue order, transcript ordering by sequence
+is preserved. When a chat has ``TRANSCRIPT_WRITE_BEHIND_MAX_PENDING`` messages
+waiting, producers block (backpressure) rather than dropping messages.
+
+Callers that need the transcript to be durable (completion, resume, user input
+sequencing, shutdown) call ``flush(chat_id)`` / ``flush_all()``.
+
+The append is not idempotent, so a failed batch is only retried for errors that
+guarantee the server applied nothing (no server selected, write refused by a
+non-primary). A timeout or dropped connection may hide a write that landed, and
+retrying it would duplicate the batch; such batches are counted as failed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import NotPrimaryError, ServerSelectionTimeoutError
+
+from logs.logging_config import get_workflow_logger
+
+logger = get_workflow_logger("transcript_write_behind")
+
+# (chat_id, app_id, messages) -> assigned sequences ([] when the chat is missing)
+FlushFunc = Callable[[str, str, List[Dict[str, Any]]], Awaitable[List[int]]]
+# (chat_id, app_id, messages) -> None, invoked after a successful flush
+FlushedCallback = Callable[[str, str, List[Dict[str, Any]]], None]
+# Raised before the server applied anything, so the batch can be sent again.
+_RETRYABLE_FLUSH_ERRORS = (ServerSelectionTimeoutError, NotPrimaryError)
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return str(val).strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    raw_value = os.getenv(name)
+    if raw_value is None:
+        return default
+    try:
+        parsed = int(raw_value.strip())
+    except ValueError:
+        logger.warning("Invalid %s value '%s'; using default %s", name, raw_value, default)
+        return default
+    return parsed if parsed > 0 else default
+
+
+def write_behind_enabled() -> bool:
+    """Whether transcript writes go through the write-behind queue."""
+    return _env_bool("TRANSCRIPT_WRITE_BEHIND", False)
+
+
+@dataclass
+class _ChatQueue:
+    chat_id: str
+    app_id: str
+    flush_fn: FlushFunc
+    on_flushed: Optional[FlushedCallback]
+    queue: "asyncio.Queue[Tuple[float, Dict[str, Any]]]"
+    kick: asyncio.Event = field(default_factory=asyncio.Event)
+    worker: Optional["asyncio.Task[None]"] = None
+    flush_waiters: int = 0
+
+
+class TranscriptWriteBehind:
+    """Per-chat write-behind queues with size/time based batch flushing."""
+
+    _FLUSH_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        *,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        self.batch_size = batch_size or _env_int("TRANSCRIPT_WRITE_BEHIND_BATCH_SIZE", 50)
+        self.flush_interval = (flush_interval_ms or _env_int("TRANSCRIPT_WRITE_BEHIND_FLUSH_MS", 250)) / 1000.0
+        self.max_pending = max_pending or _env_int("TRANSCRIPT_WRITE_BEHIND_MAX_PENDING", 1000)
+        self._chats: Dict[str, _ChatQueue] = {}
+        self._metrics: Dict[str, Any] = {
+            "enqueued": 0,
+            "flushed_messages": 0,
+            "flushed_batches": 0,
+            "failed_batches": 0,
+            "dropped_messages": 0,
+            "last_flush_ms": None,
+            "last_flush_lag_ms": None,
+            "max_flush_lag_ms": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    async def enqueue(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        message: Dict[str, Any],
+        flush_fn: FlushFunc,
+        on_flushed: Optional[FlushedCallback] = None,
+    ) -> None:
+        """Queue ``message`` for ``chat_id``; blocks only when the chat is at max_pending."""
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = _ChatQueue(
+                chat_id=chat_id,
+                app_id=app_id,
+                flush_fn=flush_fn,
+                on_flushed=on_flushed,
+                queue=asyncio.Queue(maxsize=self.max_pending),
+            )
+            self._chats[chat_id] = state
+        await state.queue.put((time.monotonic(), message))
+        self._metrics["enqueued"] += 1
+        if state.queue.qsize() >= self.batch_size:
+            state.kick.set()
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.create_task(self._run(state), name=f"transcript_write_behind:{chat_id}")
+
+    async def flush(self, chat_id: str) -> None:
+        """Wait until every message queued for ``chat_id`` so far is persisted."""
+        state = self._chats.get(chat_id)
+        if state is None:
+            return
+        state.flush_waiters += 1
+        state.kick.set()
+        try:
+            await state.queue.join()
+        finally:
+            state.flush_waiters -= 1
+        # Drop idle chats so finished runs do not accumulate queues.
+        if state.queue.empty() and state.flush_waiters == 0 and self._chats.get(chat_id) is state:
+            self._chats.pop(chat_id, None)
+
+    async def flush_all(self) -> None:
+        """Flush every chat (used on shutdown)."""
+        chat_ids = list(self._chats.keys())
+        if chat_ids:
+            await asyncio.gather(*(self.flush(cid) for cid in chat_ids), return_exceptions=True)
+
+    def pending(self, chat_id: str) -> int:
+        state = self._chats.get(chat_id)
+        return state.queue.qsize() if state else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth and flush lag metrics for the /metrics endpoints."""
+        per_chat = {cid: st.queue.qsize() for cid, st in self._chats.items() if st.queue.qsize()}
+        return {
+            "enabled": write_behind_enabled(),
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "max_pending": self.max_pending,
+            "pending_total": sum(per_chat.values()),
+            "pending_by_chat": per_chat,
+            **self._metrics,
+        }
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    async def _run(self, state: _ChatQueue) -> None:
+        while not state.queue.empty():
+            if state.flush_waiters == 0 and state.queue.qsize() < self.batch_size:
+                try:
+                    await asyncio.wait_for(state.kick.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            state.kick.clear()
+
+            batch: List[Tuple[float, Dict[str, Any]]] = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(state.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            if not batch:
+                continue
+            try:
+                await self._flush_batch(state, batch)
+            finally:
+                for _ in batch:
+                    state.queue.task_done()
+
+    async def _flush_batch(self, state: _ChatQueue, batch: List[Tuple[float, Dict[str, Any]]]) -> None:
+        messages = [msg for _, msg in batch]
+        started = time.monotonic()
+        for attempt in range(1, self._FLUSH_ATTEMPTS + 1):
+            try:
+                sequences = await state.flush_fn(state.chat_id, state.app_id, messages)
+                break
+            except Exception as e:
+                if attempt == self._FLUSH_ATTEMPTS or not isinstance(e, _RETRYABLE_FLUSH_ERRORS):
+                    self._metrics["failed_batches"] += 1
+                    self._metrics["dropped_messages"] += len(messages)
+                    logger.error(
+                        f"Write-behind flush failed for {state.chat_id} after {attempt} attempt(s) "
+                        f"({len(messages)} messages not confirmed): {e}"
+                    )
+                    return
+                await asyncio.sleep(0.05 * (2 ** (attempt - 1)))
+        now = time.monotonic()
+        if not sequences:
+            self._metrics["dropped_messages"] += len(messages)
+            logger.warning(f"Write-behind flush for {state.chat_id} found no chat session; {len(messages)} messages dropped")
+            return
+        lag_ms = (now - batch[0][0]) * 1000
+        self._metrics["flushed_messages"] += len(messages)
+        self._metrics["flushed_batches"] += 1
+        self._metrics["last_flush_ms"] = round((now - started) * 1000, 2)
+        self._metrics["last_flush_lag_ms"] = round(lag_ms, 2)
+        self._metrics["max_flush_lag_ms"] = max(self._metrics["max_flush_lag_ms"], round(lag_ms, 2))
+        if state.on_flushed:
+            try:
+                state.on_flushed(state.chat_id, state.app_id, messages)
+            except Exception as cb_err:  # pragma: no cover
+                logger.debug(f"Write-behind flushed callback failed for {state.chat_id}: {cb_err}")
+
+
+_write_behind: Optional[TranscriptWriteBehind] = None
+
+
+def get_transcript_write_behind() -> TranscriptWriteBehind:
+    """Process-wide write-behind queue (shared by every AG2PersistenceManager)."""
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = TranscriptWriteBehind()
+    return _write_behind
+
+
+__all__ = [
+    "TranscriptWriteBehind",
+    "get_transcript_write_behind",
+    "write_behind_enabled",
+]
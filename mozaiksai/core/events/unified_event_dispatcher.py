@@ -29,10 +29,13 @@ from mozaiksai.core.events.auto_tool_handler import AutoToolEventHandler
 from mozaiksai.core.events.usage_ingest import get_usage_ingest_client
 from mozaiksai.core.workflow.pack.workflow_pack_coordinator import WorkflowPackCoordinator
 from mozaiksai.core.workflow.pack.journey_orchestrator import JourneyOrchestrator
+from mozaiksai.core.workflow.pack import gating as pack_gating
 from logs.logging_config import get_core_logger, get_workflow_logger
+from mozaiksai.core.observability.event_trace import get_event_trace
 from mozaiksai.core.events.event_serialization import serialize_event_content
 
 logger = get_core_logger("unified_event_dispatcher")
+_trace = get_event_trace("dispatcher")
 wf_logger = get_workflow_logger("event_dispatcher")
 
 try:  # workflow config (optional in some minimal test contexts)
@@ -165,6 +168,8 @@ class UnifiedEventDispatcher:
         self._setup_default_handlers()
         self.register_handler("chat.structured_output_ready", self._auto_tool_handler.handle_structured_output_ready)
         self.register_handler("chat.structured_output_ready", self._pack_coordinator.handle_structured_output_ready)
+        # Synchronous, registered first: gating caches are stale before coordinators re-check prereqs.
+        self.register_handler("chat.run_complete", pack_gating.handle_run_complete)
         self.register_handler("chat.run_complete", self._pack_coordinator.handle_run_complete)
         # Journey auto-advance (pack v2)
         self.register_handler("chat.run_complete", self._journey_orchestrator.handle_run_complete)
@@ -271,6 +276,62 @@ class UnifiedEventDispatcher:
         event = UIToolEvent(ui_tool_id=ui_tool_id, payload=payload, workflow_name=workflow_name, display=display, chat_id=chat_id)
         return await self.dispatch(event)
 
+    def apply_text_event_policy(self, event_dict: Dict[str, Any], workflow_name: str) -> bool:
+        """Apply workflow suppression rules and agent flags to a text/print event dict.
+
+        Returns True when the event is hidden (``_mozaiks_hide`` set); otherwise the
+        ``is_structured_capable`` / ``is_visual`` / ``is_tool_agent`` flags are set.
+        Shared by live envelopes and batched replay (``chat.replay_batch``).
+        """
+        agent_name = event_dict.get('agent') or event_dict.get('sender')
+        content = event_dict.get('content', '')
+
+        # SUPPRESSION CHECKS (must happen BEFORE other flags)
+        # Check 0: System resume signals (always suppress)
+        if isinstance(content, str) and '[SYSTEM_RESUME_SIGNAL]' in content:
+            event_dict['_mozaiks_hide'] = True
+            _trace.count("suppressed_resume_signal")
+            logger.debug("🚫 [SYSTEM_SIGNAL] Suppressing internal resume signal from %s", agent_name)
+            return True
+
+        # Compiled once per workflow load; every check below is an O(1) lookup.
+        policy = None
+        try:
+            policy = workflow_manager.get_event_policy(workflow_name)  # type: ignore
+        except Exception as e:
+            logger.warning(f"⚠️ [EVENT_POLICY] Failed to load event policy for {workflow_name}: {e}", exc_info=True)
+
+        if policy is not None and agent_name and isinstance(content, str):
+            # Check 1: UI_HIDDEN triggers (exact match suppression)
+            if policy.is_hidden_trigger(agent_name, content):
+                event_dict['_mozaiks_hide'] = True
+                _trace.count("suppressed_ui_hidden")
+                logger.debug("🚫 [UI_HIDDEN] Suppressing hidden trigger: agent=%s", agent_name)
+                return True
+
+            # Check 2: AUTO_TOOL agent message deduplication
+            # Auto-tool agents emit text (with agent_message) then tool_call (with same agent_message)
+            # Suppress the text message to avoid duplication in UI
+            if agent_name in policy.auto_tool_agents:
+                event_dict['_mozaiks_hide'] = True
+                _trace.count("suppressed_auto_tool")
+                logger.debug("🚫 [AUTO_TOOL_DEDUP] Suppressing text from auto_tool agent %s", agent_name)
+                return True
+
+        # Now check other agent flags
+        structured_flag = False
+        visual_flag = False
+        tool_agent_flag = False
+        if policy is not None and agent_name:
+            structured_flag = agent_name in policy.structured_agents
+            visual_flag = agent_name in policy.visual_agents
+            tool_agent_flag = agent_name in policy.tool_agents
+
+        event_dict['is_structured_capable'] = structured_flag
+        event_dict['is_visual'] = visual_flag
+        event_dict['is_tool_agent'] = tool_agent_flag
+        return False
+
     def build_outbound_event_envelope(
         self,
         *,
@@ -295,91 +356,18 @@ class UnifiedEventDispatcher:
         kind = str(event_dict.get('kind', 'unknown'))
         base_kind = kind.split('.', 1)[1] if kind.startswith('chat.') else kind
         
-        # DEBUG: Log what we're checking
-        logger.info(f"🔍 [UI_HIDDEN_DEBUG] base_kind={base_kind}, workflow_manager={'present' if workflow_manager else 'MISSING'}, workflow_name={workflow_name}")
+        _trace.count("envelopes")
+        if _trace.sampled():
+            _trace.emit("envelope", kind=kind, chat_id=chat_id, workflow=workflow_name)
         
-        # SUPPRESSION CHECKS (must happen BEFORE other flags)
         if base_kind in ('text', 'print') and workflow_manager and workflow_name:
-            agent_name = event_dict.get('agent') or event_dict.get('sender')
-            content = event_dict.get('content', '')
-            
-            logger.info(f"🔍 [UI_HIDDEN_DEBUG] Checking message: agent={agent_name}, content='{content[:50] if content else 'EMPTY'}...'")
-            
-            # Check 0: System resume signals (always suppress)
-            if isinstance(content, str) and '[SYSTEM_RESUME_SIGNAL]' in content:
-                event_dict['_mozaiks_hide'] = True
-                logger.info(f"🚫 [SYSTEM_SIGNAL] Suppressing internal resume signal from {agent_name}")
+            if self.apply_text_event_policy(event_dict, workflow_name):
                 return {
                     "type": f"chat.{base_kind}",
                     "data": event_dict,
                     "chat_id": chat_id,
                     "timestamp": timestamp
                 }
-            
-            if agent_name and isinstance(content, str):
-                # Check 1: UI_HIDDEN triggers (exact match suppression)
-                try:
-                    hidden_triggers = workflow_manager.get_ui_hidden_triggers(workflow_name)  # type: ignore
-                    logger.info(f"🔍 [UI_HIDDEN_DEBUG] Got hidden triggers: {hidden_triggers}")
-                    
-                    if agent_name in hidden_triggers and content.strip() in hidden_triggers[agent_name]:
-                        event_dict['_mozaiks_hide'] = True
-                        logger.info(f"🚫 [UI_HIDDEN] Suppressing hidden trigger: agent={agent_name}, content='{content.strip()}'")
-                        return {
-                            "type": f"chat.{base_kind}",
-                            "data": event_dict,
-                            "chat_id": chat_id,
-                            "timestamp": timestamp
-                        }
-                except Exception as e:
-                    logger.warning(f"⚠️ [UI_HIDDEN] Failed to check hidden triggers: {e}", exc_info=True)
-                
-                # Check 2: AUTO_TOOL agent message deduplication
-                # Auto-tool agents emit text (with agent_message) then tool_call (with same agent_message)
-                # Suppress the text message to avoid duplication in UI
-                logger.info(f"🔍 [AUTO_TOOL_DEBUG] About to check auto_tool agents for agent={agent_name}, workflow_name={workflow_name}")
-                try:
-                    auto_tool_agents = workflow_manager.get_auto_tool_agents(workflow_name)  # type: ignore
-                    logger.info(f"🔍 [AUTO_TOOL_DEBUG] Got auto_tool agents: {auto_tool_agents}, checking if {agent_name} in set")
-                    if agent_name in auto_tool_agents:
-                        event_dict['_mozaiks_hide'] = True
-                        logger.info(f"� [AUTO_TOOL_DEDUP] Suppressing text from auto_tool agent {agent_name}: '{content[:100]}'")
-                        return {
-                            "type": f"chat.{base_kind}",
-                            "data": event_dict,
-                            "chat_id": chat_id,
-                            "timestamp": timestamp
-                        }
-                except Exception as e:
-                    logger.warning(f"⚠️ [AUTO_TOOL_DEDUP] Failed to check auto_tool agents: {e}", exc_info=True)
-            
-            # Now check other agent flags
-            structured_flag = False
-            visual_flag = False
-            tool_agent_flag = False
-            if agent_name:
-                try:
-                    cfg = workflow_manager.get_agent_structured_outputs_config(workflow_name)  # type: ignore
-                    structured_flag = cfg.get(agent_name, False)
-                except Exception:
-                    pass
-                try:
-                    visual_agents = workflow_manager.get_visual_agents(workflow_name)  # type: ignore
-                    visual_flag = agent_name in visual_agents
-                except Exception:
-                    pass
-                try:
-                    ui_tools = workflow_manager.get_ui_tools(workflow_name)  # type: ignore
-                    tool_agent_flag = any(
-                        tool.get('agent') == agent_name or tool.get('caller') == agent_name
-                        for tool in ui_tools.values()
-                    )
-                except Exception:
-                    pass
-            
-            event_dict['is_structured_capable'] = structured_flag
-            event_dict['is_visual'] = visual_flag
-            event_dict['is_tool_agent'] = tool_agent_flag
             if get_sequence_cb and chat_id:
                 try:
                     event_dict['sequence'] = get_sequence_cb(chat_id)
@@ -10,7 +10,7 @@ from __future__ import annotations
 import os
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple, Literal, cast
+from typing import Any, Dict, List, Optional, Tuple, Literal, cast
 
 from autogen import runtime_logging
 from autogen.logger.base_logger import BaseLogger
@@ -23,18 +23,21 @@ log = get_observability_logger("ag2.runtime")
 
 
 class AG2RuntimeLoggingController:
-    """Lightweight wrapper around autogen.runtime_logging with Mozaiks integrations."""
+    """Lightweight wrapper around autogen.runtime_logging with Mozaiks integrations.
+
+    autogen.runtime_logging is process-global, so a single logging session is
+    shared by every concurrent workflow: it starts with the first run and stops
+    after the last one. Per-chat attribution is handled by RealtimeTokenLogger runs.
+    """
 
     def __init__(self) -> None:
         self._session_id: Optional[str] = None
-        self._chat_id: Optional[str] = None
-        self._workflow_name: Optional[str] = None
-        self._app_id: Optional[str] = None
-        self._user_id: Optional[str] = None
         self._delegate: Optional[BaseLogger] = None
         self._realtime_logger = get_realtime_token_logger()
         self._log_file_path: Optional[Path] = None
         self._active = False
+        # chat_id -> ContextVar token returned by RealtimeTokenLogger.begin_run
+        self._runs: Dict[str, Any] = {}
 
     # ------------------------------------------------------------------
     # Public API
@@ -47,6 +50,10 @@ class AG2RuntimeLoggingController:
     def log_file_path(self) -> Optional[Path]:
         return self._log_file_path
 
+    @property
+    def active_chats(self) -> List[str]:
+        return list(self._runs.keys())
+
     def should_enable(self) -> bool:
         mode = os.getenv("AG2_RUNTIME_LOGGING", "file").strip().lower()
         return mode not in {"", "off", "false", "0", "disabled", "none"}
@@ -62,43 +69,20 @@ class AG2RuntimeLoggingController:
             log.debug("AG2 runtime logging disabled via env")
             return False
 
-        if self._active:
-            log.debug("Active AG2 runtime session detected; restarting")
-            self.stop_session()
+        if chat_id in self._runs:
+            log.debug("Active AG2 runtime run detected for %s; restarting", chat_id)
+            self.stop_session(chat_id)
 
-        logger_type, config = self._resolve_logger_selection()
-        delegate = self._build_delegate(logger_type, config)
+        if not self._active and not self._start_runtime_logging():
+            return False
 
-        self._realtime_logger.configure(
+        self._runs[chat_id] = self._realtime_logger.begin_run(
             chat_id=chat_id,
             workflow_name=workflow_name,
             app_id=app_id,
             user_id=user_id,
-            delegate=delegate,
         )
         self._realtime_logger.set_active_agent(workflow_name)
-        if user_id:
-            self._realtime_logger.set_user(user_id)
-
-        try:
-            session_id = runtime_logging.start(logger=self._realtime_logger)
-        except Exception as err:  # pragma: no cover - defensive
-            log.error("Failed to start autogen runtime logging", exc_info=err)
-            return False
-
-        self._session_id = session_id
-        self._chat_id = chat_id
-        self._workflow_name = workflow_name
-        self._app_id = app_id
-        self._user_id = user_id
-        self._delegate = delegate
-        self._active = True
-
-        if logger_type == "sqlite":
-            db_path = Path(config.get("dbname", "logs.db")).resolve()
-            self._log_file_path = db_path
-        else:
-            self._log_file_path = config.get("__resolved_path")
 
         log.info(
             "ag2_runtime_logging_started",
@@ -106,38 +90,40 @@ class AG2RuntimeLoggingController:
                 "chat_id": chat_id,
                 "workflow_name": workflow_name,
                 "app_id": app_id,
-                "logger_type": logger_type,
-                "session_id": session_id,
+                "session_id": self._session_id,
+                "active_runs": len(self._runs),
             },
         )
         return True
 
-    def stop_session(self) -> bool:
-        if not self._active:
+    def stop_session(self, chat_id: Optional[str] = None) -> bool:
+        if chat_id is None:
+            # Legacy single-run callers: only unambiguous when one run is active
+            if len(self._runs) != 1:
+                return False
+            chat_id = next(iter(self._runs))
+        if chat_id not in self._runs:
             return False
 
-        try:
-            runtime_logging.stop()
-        except Exception as err:  # pragma: no cover - defensive
-            log.warning("Failed to stop autogen runtime logging", exc_info=err)
-        finally:
-            log.info(
-                "ag2_runtime_logging_stopped",
-                extra={
-                    "chat_id": self._chat_id,
-                    "workflow_name": self._workflow_name,
-                    "session_id": self._session_id,
-                },
-            )
-            self._reset_state()
+        token = self._runs.pop(chat_id)
+        self._realtime_logger.end_run(chat_id, token)
+        log.info(
+            "ag2_runtime_logging_stopped",
+            extra={
+                "chat_id": chat_id,
+                "session_id": self._session_id,
+                "active_runs": len(self._runs),
+            },
+        )
+        if not self._runs:
+            self._stop_runtime_logging()
         return True
 
-    def set_active_agent(self, agent_name: Optional[str]) -> None:
-        self._realtime_logger.set_active_agent(agent_name)
+    def set_active_agent(self, agent_name: Optional[str], chat_id: Optional[str] = None) -> None:
+        self._realtime_logger.set_active_agent(agent_name, chat_id=chat_id)
 
-    def set_user(self, user_id: Optional[str]) -> None:
-        self._user_id = user_id
-        self._realtime_logger.set_user(user_id)
+    def set_user(self, user_id: Optional[str], chat_id: Optional[str] = None) -> None:
+        self._realtime_logger.set_user(user_id, chat_id=chat_id)
 
     @contextmanager
     def session_context(
@@ -152,11 +138,43 @@ class AG2RuntimeLoggingController:
             yield self
         finally:
             if started:
-                self.stop_session()
+                self.stop_session(chat_id)
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
+    def _start_runtime_logging(self) -> bool:
+        logger_type, config = self._resolve_logger_selection()
+        delegate = self._build_delegate(logger_type, config)
+        self._realtime_logger.set_delegate(delegate)
+
+        try:
+            session_id = runtime_logging.start(logger=self._realtime_logger)
+        except Exception as err:  # pragma: no cover - defensive
+            log.error("Failed to start autogen runtime logging", exc_info=err)
+            return False
+
+        self._session_id = session_id
+        self._delegate = delegate
+        self._active = True
+
+        if logger_type == "sqlite":
+            db_path = Path(config.get("dbname", "logs.db")).resolve()
+            self._log_file_path = db_path
+        else:
+            self._log_file_path = config.get("__resolved_path")
+        log.debug("ag2_runtime_session_started", extra={"logger_type": logger_type, "session_id": session_id})
+        return True
+
+    def _stop_runtime_logging(self) -> None:
+        try:
+            runtime_logging.stop()
+        except Exception as err:  # pragma: no cover - defensive
+            log.warning("Failed to stop autogen runtime logging", exc_info=err)
+        finally:
+            log.debug("ag2_runtime_session_stopped", extra={"session_id": self._session_id})
+            self._reset_state()
+
     def _resolve_logger_selection(self) -> Tuple[str, Dict[str, Any]]:
         requested = os.getenv("AG2_RUNTIME_LOGGER_TYPE", "").strip().lower()
         if requested not in {"file", "sqlite"}:
@@ -186,10 +204,6 @@ class AG2RuntimeLoggingController:
 
     def _reset_state(self) -> None:
         self._session_id = None
-        self._chat_id = None
-        self._workflow_name = None
-        self._app_id = None
-        self._user_id = None
         self._delegate = None
         self._log_file_path = None
         self._active = False
@@ -215,8 +229,8 @@ def start_ag2_logging(
     return get_ag2_runtime_logger().start_session(chat_id, workflow_name, app_id, user_id)
 
 
-def stop_ag2_logging() -> bool:
-    return get_ag2_runtime_logger().stop_session()
+def stop_ag2_logging(chat_id: Optional[str] = None) -> bool:
+    return get_ag2_runtime_logger().stop_session(chat_id)
 
 
 @contextmanager
@@ -0,0 +1,74 @@
+"""
+Sampled per-event trace channel for the outbound event hot path.
+
+The transport and dispatcher handle hundreds of events per second per node, so
+per-event diagnostics do not go to the regular INFO logs. Instead:
+
+- Every interesting step bumps an in-memory counter (``count``), exposed via
+  ``/metrics/events/trace``.
+- A sampled fraction of events (``EVENT_TRACE_SAMPLE_RATE``, default 0 = off)
+  emits one structured record on the ``core.trace.<channel>`` logger. Callers
+  guard with ``if trace.sampled():`` so no message/extra is built otherwise.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from logs.logging_config import get_core_logger
+
+
+def _sample_rate_from_env() -> float:
+    try:
+        rate = float(os.getenv("EVENT_TRACE_SAMPLE_RATE", "0") or 0)
+    except ValueError:
+        return 0.0
+    return min(1.0, max(0.0, rate))
+
+
+class EventTrace:
+    """Counters plus a sampled structured logger for one hot-path channel."""
+
+    def __init__(self, channel: str, sample_rate: Optional[float] = None) -> None:
+        self.channel = channel
+        self.sample_rate = _sample_rate_from_env() if sample_rate is None else sample_rate
+        self.logger = get_core_logger(f"trace.{channel}")
+        self._counters: Counter[str] = Counter()
+
+    def count(self, key: str, n: int = 1) -> None:
+        self._counters[key] += n
+
+    def sampled(self) -> bool:
+        """Whether the current event should emit a trace record."""
+        rate = self.sample_rate
+        if rate <= 0.0 or not self.logger.isEnabledFor(logging.INFO):
+            return False
+        return rate >= 1.0 or random.random() < rate
+
+    def emit(self, stage: str, **fields: Any) -> None:
+        """Write one structured trace record (call only when ``sampled()`` is true)."""
+        self.logger.info("event_trace %s", stage, extra={"trace_channel": self.channel, "trace_stage": stage, **fields})
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"sample_rate": self.sample_rate, "counters": dict(self._counters)}
+
+
+_traces: Dict[str, EventTrace] = {}
+
+
+def get_event_trace(channel: str) -> EventTrace:
+    trace = _traces.get(channel)
+    if trace is None:
+        trace = _traces[channel] = EventTrace(channel)
+    return trace
+
+
+def snapshot_event_traces() -> Dict[str, Any]:
+    return {channel: trace.snapshot() for channel, trace in _traces.items()}
+
+
+__all__ = ["EventTrace", "get_event_trace", "snapshot_event_traces"]
@@ -5,6 +5,7 @@ Maintains minimal in-memory metrics and updates session duration / a few flatten
 """
 
 import asyncio
+import os
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List, Union
@@ -17,9 +18,20 @@ logger = get_workflow_logger("performance_manager")
 perf_logger = get_workflow_logger("performance")
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default)).strip()))
+    except ValueError:
+        return default
+
+
 @dataclass
 class PerformanceConfig:
-    flush_interval_sec: int = 0
+    # Periodic flush interval for buffered metrics (0 = write through immediately).
+    # Drives both the per-chat duration flush and RealtimeTokenLogger usage buffering.
+    flush_interval_sec: int = field(default_factory=lambda: _env_int("PERF_FLUSH_INTERVAL_SEC", 0))
+    # Buffered usage for one (app, workflow, chat, agent) is flushed early after this many LLM calls.
+    usage_flush_max_events: int = field(default_factory=lambda: _env_int("PERF_USAGE_FLUSH_MAX_EVENTS", 20))
     enabled: bool = True
 
 @dataclass
@@ -37,6 +49,8 @@ class ChatPerfState:
     total_prompt_tokens: int = 0
     total_completion_tokens: int = 0
     total_cost: float = 0.0
+    # Chat start-up stage -> wall time in ms (stages may overlap when run concurrently)
+    startup_stages_ms: Dict[str, float] = field(default_factory=dict)
 
 class PerformanceManager:
     def __init__(self, config: Optional[PerformanceConfig] = None):
@@ -80,6 +94,7 @@ class PerformanceManager:
                 "prompt_tokens": st.total_prompt_tokens,
                 "completion_tokens": st.total_completion_tokens,
                 "cost": st.total_cost,
+                "startup_stages_ms": dict(st.startup_stages_ms),
             }
 
     async def snapshot_all(self) -> List[Dict[str, Any]]:
@@ -259,6 +274,15 @@ class PerformanceManager:
             duration_sec=float(duration_sec),
         )
 
+    async def record_startup_stage(self, chat_id: str, stage: str, duration_ms: float):
+        """Record the wall time of one chat start-up stage (resume, context, agents, ...)."""
+        async with self._lock:
+            st = self._states.get(chat_id)
+            if not st:
+                return
+            st.startup_stages_ms[stage] = round(float(duration_ms), 3)
+        perf_logger.debug("startup_stage", chat_id=chat_id, stage=stage, duration_ms=float(duration_ms))
+
     async def record_tool_call(self, chat_id: str, tool_name: str, success: bool):
         """Increment tool call counters.
 
@@ -319,14 +343,8 @@ class PerformanceManager:
         # Final flush to persist computed duration_sec
         await self.flush(chat_id)
 
-        # Best-effort workflow summary refresh (does not block)
-        if status_enum == WorkflowStatus.COMPLETED:
-            try:  # pragma: no cover
-                from mozaiksai.core.data.models import refresh_workflow_rollup_by_id
-                summary_id = f"mon_{st.app_id}_{st.workflow_name}"
-                asyncio.create_task(refresh_workflow_rollup_by_id(summary_id))
-            except Exception:
-                pass
+        # The mon_ rollup is maintained incrementally (update_session_metrics /
+        # mark_chat_completed); no full recompute on completion.
 
     async def flush(self, chat_id: str):
         async with self._lock:
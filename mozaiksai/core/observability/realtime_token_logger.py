@@ -16,86 +16,188 @@ Robust loop handling:
     from non-async contexts (e.g., autogen logger threads) can schedule work
     safely via call_soon_threadsafe.
 - Falls back to a background thread with asyncio.run if no loop is available.
+
+Run attribution:
+- One logger instance serves every chat in the process (AG2 runtime logging is
+    process-global), so chat/app/workflow/user/agent context lives in a per-run
+    _RunContext rather than on the logger. begin_run() binds it to the calling
+    asyncio task via a ContextVar; LLM calls made outside that context (worker
+    threads) are attributed through the agent objects registered by
+    log_new_agent. Parallel workflows therefore meter into their own chat.
+
+Usage aggregation:
+- Usage deltas are accumulated in memory per (app_id, workflow, chat_id, agent)
+    and written through update_session_metrics / emit_usage_delta in one call
+    per key when PerformanceConfig.flush_interval_sec elapses, when a key
+    reaches usage_flush_max_events calls, or when flush_usage() is awaited
+    (run completion, shutdown). flush_interval_sec = 0 keeps the previous
+    write-per-call behaviour.
 """
 
 import asyncio
 import json
 import threading
 import uuid
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from collections.abc import Coroutine
 import sqlite3
 
 from autogen.logger.base_logger import BaseLogger
 from logs.logging_config import get_workflow_logger
 from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
+from mozaiksai.core.observability.performance_manager import PerformanceConfig
 from mozaiksai.core.tokens.manager import TokenManager
 
 import logging
 logger = logging.getLogger("core.observability.realtime_token_logger")
 
 
+# (app_id, workflow_name, chat_id, agent_name)
+UsageKey = Tuple[str, str, str, str]
+
+
+@dataclass
+class _PendingUsage:
+    """Usage accumulated in memory for one UsageKey between flushes."""
+    user_id: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    duration_sec: float = 0.0
+    events: int = 0
+    event_ts: Optional[datetime] = None
+    model_name: Optional[str] = None
+    invocation_ids: List[str] = field(default_factory=list)
+    cached: bool = True
+
+
+def _zero_totals() -> Dict[str, float]:
+    return {"prompt_tokens": 0.0, "completion_tokens": 0.0, "total_cost": 0.0}
+
+
+@dataclass
+class _RunContext:
+    """Attribution context for one workflow run (one chat)."""
+    chat_id: str
+    workflow_name: Optional[str] = None
+    app_id: Optional[str] = None
+    user_id: Optional[str] = None
+    current_agent: Optional[str] = None
+    totals: Dict[str, float] = field(default_factory=_zero_totals)
+    agent_ids: Set[int] = field(default_factory=set)
+
+
+_current_run: ContextVar[Optional[_RunContext]] = ContextVar("realtime_token_run", default=None)
+
+
 class RealtimeTokenLogger(BaseLogger):
     """Composite logger used as the single runtime_logging delegate."""
 
-    def __init__(self) -> None:
+    def __init__(self, config: Optional[PerformanceConfig] = None) -> None:
         super().__init__()
         self._delegate: Optional[BaseLogger] = None
         self._session_id: Optional[str] = None
-        self._chat_id: Optional[str] = None
-        self._app_id: Optional[str] = None
-        self._workflow_name: Optional[str] = None
-        self._user_id: Optional[str] = None
-        self._current_agent: Optional[str] = None
-        self._session_totals: Dict[str, float] = {}
+        # Active runs by chat_id, plus id(agent) -> run for calls made outside the run's context
+        self._runs_lock = threading.Lock()
+        self._runs: Dict[str, _RunContext] = {}
+        self._agent_runs: Dict[int, _RunContext] = {}
         self._persistence = AG2PersistenceManager()
-        self._reset_totals()
         # Store the event loop that was active when the session started
         self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._config = config or PerformanceConfig()
+        # log_chat_completion may be called from autogen worker threads
+        self._pending_lock = threading.Lock()
+        self._pending: Dict[UsageKey, _PendingUsage] = {}
+        self._flush_tasks: Set["asyncio.Future[Any]"] = set()
+        self._periodic_task: Optional[asyncio.Task] = None
 
     # ------------------------------------------------------------------
     # Configuration helpers
     # ------------------------------------------------------------------
-    def configure(
+    def set_delegate(self, delegate: Optional[BaseLogger]) -> None:
+        """Set the downstream file/sqlite logger shared by every run."""
+        self._delegate = delegate
+
+    def begin_run(
         self,
         *,
         chat_id: str,
         workflow_name: str,
         app_id: Optional[str],
         user_id: Optional[str],
-        delegate: Optional[BaseLogger],
-    ) -> None:
-        """Set session metadata and optional downstream delegate."""
-        self._chat_id = chat_id
-        self._workflow_name = workflow_name
-        self._app_id = app_id
-        self._user_id = user_id
-        self._delegate = delegate
-        self._reset_totals()
+    ) -> "Token[Optional[_RunContext]]":
+        """Register a run and bind it to the current context; returns the ContextVar token."""
+        run = _RunContext(chat_id=chat_id, workflow_name=workflow_name, app_id=app_id, user_id=user_id)
+        with self._runs_lock:
+            previous = self._runs.get(chat_id)
+            if previous is not None:
+                self._forget_agents(previous)
+            self._runs[chat_id] = run
         logger.debug(
-            "realtime_logger_configured",
-            extra={
-                "chat_id": chat_id,
-                "workflow": workflow_name,
-                "app": app_id,
-                "user": user_id,
-                "delegate": delegate.__class__.__name__ if delegate else None,
-            }
+            "realtime_logger_run_started",
+            extra={"chat_id": chat_id, "workflow": workflow_name, "app": app_id, "user": user_id},
         )
+        return _current_run.set(run)
+
+    def end_run(self, chat_id: str, token: "Optional[Token[Optional[_RunContext]]]" = None) -> None:
+        """Unregister a run and schedule a flush of its buffered usage."""
+        with self._runs_lock:
+            run = self._runs.pop(chat_id, None)
+            if run is not None:
+                self._forget_agents(run)
+        if token is not None:
+            try:
+                _current_run.reset(token)
+            except ValueError:
+                # Token created in another context (e.g. stop from a different task)
+                pass
+        if run is not None:
+            self._flush_session_totals(run)
+            self._schedule_async_task(self.flush_usage(chat_id=chat_id))
+
+    def active_runs(self) -> List[str]:
+        with self._runs_lock:
+            return list(self._runs.keys())
+
+    def set_active_agent(self, agent_name: Optional[str], *, chat_id: Optional[str] = None) -> None:
+        run = self._lookup_run(chat_id)
+        if run is not None:
+            run.current_agent = agent_name
+
+    def set_user(self, user_id: Optional[str], *, chat_id: Optional[str] = None) -> None:
+        run = self._lookup_run(chat_id)
+        if run is not None:
+            run.user_id = user_id
+
+    def _lookup_run(self, chat_id: Optional[str]) -> Optional[_RunContext]:
+        if chat_id:
+            with self._runs_lock:
+                return self._runs.get(chat_id)
+        return _current_run.get()
+
+    def _resolve_run(self, source: Any) -> Optional[_RunContext]:
+        """Find the run an AG2 callback belongs to: context first, then the emitting agent."""
+        run = _current_run.get()
+        if run is not None:
+            return run
+        with self._runs_lock:
+            if source is not None and not isinstance(source, str):
+                run = self._agent_runs.get(id(source))
+                if run is not None:
+                    return run
+            # Unambiguous only when a single run is active
+            if len(self._runs) == 1:
+                return next(iter(self._runs.values()))
+        return None
 
-    def set_active_agent(self, agent_name: Optional[str]) -> None:
-        self._current_agent = agent_name
-
-    def set_user(self, user_id: Optional[str]) -> None:
-        self._user_id = user_id
-
-    def _reset_totals(self) -> None:
-        self._session_totals = {
-            "prompt_tokens": 0.0,
-            "completion_tokens": 0.0,
-            "total_cost": 0.0,
-        }
+    def _forget_agents(self, run: _RunContext) -> None:
+        for agent_id in run.agent_ids:
+            if self._agent_runs.get(agent_id) is run:
+                self._agent_runs.pop(agent_id, None)
+        run.agent_ids.clear()
 
     # ------------------------------------------------------------------
     # BaseLogger overrides
@@ -108,14 +210,14 @@ class RealtimeTokenLogger(BaseLogger):
                 logger.warning(f"Delegate logger failed to start: {err}")
                 self._session_id = None
         if not self._session_id:
-            token = self._chat_id or uuid.uuid4().hex
-            self._session_id = f"realtime_token_session_{token}"
+            self._session_id = f"realtime_token_session_{uuid.uuid4().hex}"
         # Capture the running loop for later thread-safe scheduling
         try:
             self._loop = asyncio.get_running_loop()
         except RuntimeError:
             self._loop = None
-        logger.debug("realtime_logger_started", extra={"session_id": self._session_id, "chat_id": self._chat_id})
+        self._ensure_periodic_flush()
+        logger.debug("realtime_logger_started", extra={"session_id": self._session_id})
         return self._session_id
 
     def stop(self) -> None:
@@ -123,7 +225,13 @@ class RealtimeTokenLogger(BaseLogger):
             if self._delegate:
                 self._delegate.stop()
         finally:
-            self._flush_session_totals()
+            with self._runs_lock:
+                runs = list(self._runs.values())
+            for run in runs:
+                self._flush_session_totals(run)
+            # Logging stopped: persist whatever is still buffered.
+            self._schedule_async_task(self.flush_usage())
+            self._session_id = None
             logger.debug("realtime_logger_stopped", extra={"session_id": self._session_id})
 
     def log_chat_completion(
@@ -154,14 +262,15 @@ class RealtimeTokenLogger(BaseLogger):
             except Exception as err:  # pragma: no cover
                 logger.debug(f"Delegate log_chat_completion failed: {err}")
 
-        if not self._chat_id:
+        run = self._resolve_run(source)
+        if run is None:
             logger.debug("No chat context for realtime logging; skipping usage delta")
             return
 
         agent_from_source = self._extract_agent_name_from_source(source)
         if agent_from_source:
-            self._current_agent = agent_from_source
-        agent_label = self._current_agent or agent_from_source or "unknown"
+            run.current_agent = agent_from_source
+        agent_label = run.current_agent or agent_from_source or "unknown"
 
         request_dict = self._maybe_mapping(request)
         response_dict = self._maybe_mapping(response)
@@ -179,9 +288,9 @@ class RealtimeTokenLogger(BaseLogger):
             total_tokens = 0
             cost_value = 0.0
 
-        self._session_totals["prompt_tokens"] += prompt_tokens
-        self._session_totals["completion_tokens"] += completion_tokens
-        self._session_totals["total_cost"] += cost_value
+        run.totals["prompt_tokens"] += prompt_tokens
+        run.totals["completion_tokens"] += completion_tokens
+        run.totals["total_cost"] += cost_value
 
         # Prefer precise duration and end timestamp from sqlite if available
         duration_sec, event_ts = self._duration_and_event_ts(invocation_id, start_time)
@@ -190,7 +299,7 @@ class RealtimeTokenLogger(BaseLogger):
             logger.info(
                 "realtime_usage_delta",
                 extra={
-                    "chat_id": self._chat_id,
+                    "chat_id": run.chat_id,
                     "agent": agent_label,
                     "prompt_tokens": prompt_tokens,
                     "completion_tokens": completion_tokens,
@@ -202,21 +311,25 @@ class RealtimeTokenLogger(BaseLogger):
                 },
             )
 
-        self._schedule_async_task(
-            self._record_agent_metrics(
-                invocation_id=str(invocation_id) if invocation_id else None,
-                agent_name=agent_label,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                cost=cost_value,
-                duration_sec=duration_sec,
-                model_name=model_name,
-                event_ts=event_ts,
-                cached=cached_flag,
-            )
+        self._buffer_usage(
+            run,
+            invocation_id=str(invocation_id) if invocation_id else None,
+            agent_name=agent_label,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=cost_value,
+            duration_sec=duration_sec,
+            model_name=model_name,
+            event_ts=event_ts,
+            cached=cached_flag,
         )
 
     def log_new_agent(self, agent: Any, init_args: Dict[str, Any]) -> None:
+        run = _current_run.get()
+        if run is not None:
+            with self._runs_lock:
+                self._agent_runs[id(agent)] = run
+                run.agent_ids.add(id(agent))
         if self._delegate:
             try:
                 self._delegate.log_new_agent(agent, init_args)
@@ -347,8 +460,12 @@ class RealtimeTokenLogger(BaseLogger):
 
         threading.Thread(target=_runner, name="rt_tokens_fallback", daemon=True).start()
 
-    async def _record_agent_metrics(
+    # ------------------------------------------------------------------
+    # Usage aggregation
+    # ------------------------------------------------------------------
+    def _buffer_usage(
         self,
+        run: _RunContext,
         *,
         invocation_id: Optional[str],
         agent_name: str,
@@ -360,13 +477,139 @@ class RealtimeTokenLogger(BaseLogger):
         event_ts: datetime,
         cached: bool,
     ) -> None:
+        key: UsageKey = (
+            run.app_id or "unknown",
+            run.workflow_name or "unknown",
+            run.chat_id,
+            agent_name or "unknown",
+        )
+        ready: Optional[_PendingUsage] = None
+        with self._pending_lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingUsage(user_id=run.user_id or "unknown")
+            pending.prompt_tokens += prompt_tokens
+            pending.completion_tokens += completion_tokens
+            pending.cost += cost
+            pending.duration_sec += duration_sec
+            pending.events += 1
+            pending.event_ts = event_ts
+            pending.model_name = model_name or pending.model_name
+            if invocation_id:
+                pending.invocation_ids.append(invocation_id)
+            pending.cached = pending.cached and cached
+            if self._config.flush_interval_sec <= 0 or pending.events >= max(1, self._config.usage_flush_max_events):
+                ready = self._pending.pop(key)
+        if ready is not None:
+            self._schedule_flush([(key, ready)])
+
+    async def flush_usage(self, chat_id: Optional[str] = None) -> None:
+        """Persist buffered usage (for one chat, or everything) and wait for in-flight flushes."""
+        with self._pending_lock:
+            keys = [k for k in self._pending if chat_id is None or k[2] == chat_id]
+            entries = [(k, self._pending.pop(k)) for k in keys]
+        loop = asyncio.get_running_loop()
+        in_flight = [t for t in self._flush_tasks if not t.done() and t.get_loop() is loop]
+        if entries:
+            in_flight.append(self._start_flush(entries))
+        if in_flight:
+            # asyncio.wait never cancels the flushes, even if this waiter is cancelled.
+            await asyncio.wait(in_flight)
+
+    def _schedule_flush(self, entries: List[Tuple[UsageKey, _PendingUsage]]) -> None:
+        """Start a tracked flush on the captured loop (callable from worker threads)."""
+        loop = self._loop
+        if loop and loop.is_running():
+            try:
+                loop.call_soon_threadsafe(self._start_flush, entries)
+                return
+            except Exception:
+                pass
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop available: fire-and-forget on a short-lived thread (not awaitable).
+            self._schedule_async_task(self._flush_entries(entries))
+            return
+        self._start_flush(entries)
+
+    def _start_flush(self, entries: List[Tuple[UsageKey, _PendingUsage]]) -> "asyncio.Task[None]":
+        """Create a flush task owned by this logger; only these are awaited by flush_usage."""
+        task = asyncio.get_running_loop().create_task(self._flush_entries(entries))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._on_flush_done)
+        return task
+
+    def _on_flush_done(self, task: "asyncio.Task[None]") -> None:
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Usage flush failed: {task.exception()}")
+
+    def pending_usage_events(self) -> int:
+        with self._pending_lock:
+            return sum(p.events for p in self._pending.values())
+
+    def _ensure_periodic_flush(self) -> None:
+        interval = self._config.flush_interval_sec
+        loop = self._loop
+        if interval <= 0 or loop is None or not loop.is_running():
+            return
+        if self._periodic_task is not None and not self._periodic_task.done():
+            return
+        self._periodic_task = loop.create_task(self._periodic_usage_flush(interval))
+
+    async def _periodic_usage_flush(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush_usage()
+            except Exception as err:  # pragma: no cover
+                logger.warning(f"Periodic usage flush failed: {err}")
+
+    async def _flush_entries(self, entries: List[Tuple[UsageKey, _PendingUsage]]) -> None:
+        for (app_id, workflow_name, chat_id, agent_name), pending in entries:
+            await self._record_agent_metrics(
+                chat_id=chat_id,
+                app_id=app_id,
+                user_id=pending.user_id,
+                workflow_name=workflow_name,
+                invocation_ids=pending.invocation_ids,
+                event_count=pending.events,
+                agent_name=agent_name,
+                prompt_tokens=pending.prompt_tokens,
+                completion_tokens=pending.completion_tokens,
+                cost=pending.cost,
+                duration_sec=pending.duration_sec,
+                model_name=pending.model_name,
+                event_ts=pending.event_ts or datetime.now(timezone.utc),
+                cached=pending.cached,
+            )
+
+    async def _record_agent_metrics(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        user_id: str,
+        workflow_name: str,
+        invocation_ids: List[str],
+        event_count: int,
+        agent_name: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost: float,
+        duration_sec: float,
+        model_name: Optional[str],
+        event_ts: datetime,
+        cached: bool,
+    ) -> None:
 
         try:
             await self._persistence.update_session_metrics(
-                chat_id=self._chat_id or "unknown",
-                app_id=self._app_id or "unknown",
-                user_id=self._user_id or "unknown",
-                workflow_name=self._workflow_name or "unknown",
+                chat_id=chat_id,
+                app_id=app_id,
+                user_id=user_id,
+                workflow_name=workflow_name,
                 prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
                 cost_usd=cost,
@@ -380,12 +623,13 @@ class RealtimeTokenLogger(BaseLogger):
 
         # Emit factual usage delta event (no pricing/gating/enforcement).
         try:
-            if (prompt_tokens or completion_tokens) and self._chat_id and self._app_id and self._user_id and self._workflow_name:
+            known = all(v and v != "unknown" for v in (chat_id, app_id, user_id, workflow_name))
+            if (prompt_tokens or completion_tokens) and known:
                 await TokenManager.emit_usage_delta(
-                    chat_id=self._chat_id,
-                    app_id=self._app_id,
-                    user_id=self._user_id,
-                    workflow_name=self._workflow_name,
+                    chat_id=chat_id,
+                    app_id=app_id,
+                    user_id=user_id,
+                    workflow_name=workflow_name,
                     agent_name=agent_name or None,
                     model_name=model_name,
                     prompt_tokens=prompt_tokens,
@@ -393,7 +637,9 @@ class RealtimeTokenLogger(BaseLogger):
                     total_tokens=(prompt_tokens + completion_tokens),
                     cached=cached,
                     duration_sec=duration_sec,
-                    invocation_id=invocation_id,
+                    invocation_id=invocation_ids[-1] if invocation_ids else None,
+                    invocation_ids=list(invocation_ids),
+                    event_count=event_count,
                     event_ts=event_ts,
                 )
         except Exception:
@@ -470,16 +716,16 @@ class RealtimeTokenLogger(BaseLogger):
                         return value.strip()
         return None
 
-    def _flush_session_totals(self) -> None:
-        if not self._chat_id or self._session_totals["total_cost"] <= 0:
+    def _flush_session_totals(self, run: _RunContext) -> None:
+        if run.totals["total_cost"] <= 0:
             return
         logger.info(
             "realtime_session_totals",
             extra={
-                "chat_id": self._chat_id,
-                "prompt_tokens": int(self._session_totals["prompt_tokens"]),
-                "completion_tokens": int(self._session_totals["completion_tokens"]),
-                "total_cost": float(self._session_totals["total_cost"]),
+                "chat_id": run.chat_id,
+                "prompt_tokens": int(run.totals["prompt_tokens"]),
+                "completion_tokens": int(run.totals["completion_tokens"]),
+                "total_cost": float(run.totals["total_cost"]),
             },
         )
 
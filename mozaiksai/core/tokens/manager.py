@@ -6,7 +6,7 @@ from __future__ import annotations
 import os
 import uuid
 from datetime import UTC, datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from mozaiksai.core.events.unified_event_dispatcher import get_event_dispatcher
 from logs.logging_config import get_workflow_logger
@@ -55,6 +55,8 @@ class TokenManager:
         cached: bool = False,
         duration_sec: float = 0.0,
         invocation_id: Optional[str] = None,
+        invocation_ids: Optional[List[str]] = None,
+        event_count: int = 1,
         event_ts: Optional[datetime] = None,
     ) -> None:
         # Advisory measurement only. Do not add enforcement or billing logic here.
@@ -92,6 +94,9 @@ class TokenManager:
             "cached": bool(cached),
             "duration_sec": float(duration_sec or 0.0),
             "invocation_id": invocation_id or None,
+            # One delta may aggregate several LLM calls; keep each call's identity.
+            "invocation_ids": list(invocation_ids) if invocation_ids is not None else ([invocation_id] if invocation_id else []),
+            "event_count": max(1, int(event_count or 1)),
         }
 
         try:
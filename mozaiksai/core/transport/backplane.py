@@ -0,0 +1,297 @@
+# ==============================================================================
+# FILE: core/transport/backplane.py
+# DESCRIPTION: Cross-node pub/sub backplane for SimpleTransport routing
+# ==============================================================================
+
+# === MOZAIKS-CORE-HEADER ===
+
+"""Ownership registry + point-to-point messaging between transport nodes.
+
+``SimpleTransport`` keeps websockets, pending UI tool futures and AG2 input
+callbacks in process memory. With more than one worker/node the websocket, the
+AG2 run and the HTTP request that answers a prompt can land on different
+processes. The backplane lets each node *claim* the keys it holds locally and
+*send* a message to whichever node owns a key:
+
+- ``socket:{chat_id}``   - node holding the chat's websocket
+- ``ui_tool:{event_id}`` - node awaiting a UI tool response
+- ``input:{request_id}`` - node holding an AG2 input callback
+
+Implementations (``MOZAIKS_BACKPLANE``):
+
+- ``memory`` (default): single process. ``distributed`` is False, so the
+  transport never consults it and behaves exactly as before. Instances created
+  with a shared ``InMemoryHub`` simulate several nodes (tests).
+- ``mongo``: owners live in ``TransportOwners``; messages are inserted into
+  ``TransportMessages`` (TTL-expired) and delivered through a change stream
+  filtered on the target node. Change streams require a replica set.
+
+Delivery is best-effort: a message sent to a node that died is dropped, and the
+client recovers through the normal ``client.resume`` path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from logs.logging_config import get_core_logger
+
+logger = get_core_logger("transport.backplane")
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_OWNERS_COLLECTION = "TransportOwners"
+_MESSAGES_COLLECTION = "TransportMessages"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _default_node_id() -> str:
+    configured = (os.getenv("MOZAIKS_NODE_ID") or "").strip()
+    if configured:
+        return configured
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Backplane(ABC):
+    """Key ownership + node-addressed messages. Handlers only ever run on the target node."""
+
+    def __init__(self, node_id: Optional[str] = None) -> None:
+        self.node_id = node_id or _default_node_id()
+        self._handler: Optional[MessageHandler] = None
+        self.sent = 0
+        self.received = 0
+
+    @property
+    @abstractmethod
+    def distributed(self) -> bool:
+        """True when other nodes may own keys (routing must be consulted)."""
+
+    async def start(self, handler: MessageHandler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    @abstractmethod
+    async def claim(self, key: str) -> None:
+        """Record this node as the owner of ``key`` (last claim wins)."""
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """Drop ownership of ``key`` if this node still holds it."""
+
+    @abstractmethod
+    async def owner_of(self, key: str) -> Optional[str]:
+        """Node id currently owning ``key``, or None."""
+
+    @abstractmethod
+    async def send(self, node_id: str, message: Dict[str, Any]) -> None:
+        """Deliver ``message`` (JSON-serializable dict) to ``node_id``'s handler."""
+
+    async def _dispatch(self, message: Dict[str, Any]) -> None:
+        handler = self._handler
+        if handler is None:
+            return
+        self.received += 1
+        try:
+            await handler(message)
+        except Exception as e:
+            logger.error(f"[BACKPLANE] Handler failed for op={message.get('op')}: {e}", exc_info=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "node_id": self.node_id,
+            "distributed": self.distributed,
+            "sent": self.sent,
+            "received": self.received,
+        }
+
+
+class InMemoryHub:
+    """Shared owner table and node registry for in-process backplanes."""
+
+    def __init__(self) -> None:
+        self.owners: Dict[str, str] = {}
+        self.nodes: Dict[str, "InMemoryBackplane"] = {}
+
+
+class InMemoryBackplane(Backplane):
+    """Process-local backplane. Nodes sharing a hub can address each other."""
+
+    def __init__(self, node_id: Optional[str] = None, hub: Optional[InMemoryHub] = None) -> None:
+        super().__init__(node_id)
+        self.hub = hub or InMemoryHub()
+
+    @property
+    def distributed(self) -> bool:
+        return len(self.hub.nodes) > 1
+
+    async def start(self, handler: MessageHandler) -> None:
+        await super().start(handler)
+        self.hub.nodes[self.node_id] = self
+
+    async def stop(self) -> None:
+        self.hub.nodes.pop(self.node_id, None)
+        for key in [k for k, owner in self.hub.owners.items() if owner == self.node_id]:
+            del self.hub.owners[key]
+        await super().stop()
+
+    async def claim(self, key: str) -> None:
+        self.hub.owners[key] = self.node_id
+
+    async def release(self, key: str) -> None:
+        if self.hub.owners.get(key) == self.node_id:
+            del self.hub.owners[key]
+
+    async def owner_of(self, key: str) -> Optional[str]:
+        return self.hub.owners.get(key)
+
+    async def send(self, node_id: str, message: Dict[str, Any]) -> None:
+        target = self.hub.nodes.get(node_id)
+        if target is None:
+            logger.warning(f"[BACKPLANE] Dropping op={message.get('op')} for unknown node {node_id}")
+            return
+        self.sent += 1
+        # Round-trip through JSON so in-memory delivery has the same contract as Mongo.
+        await target._dispatch(json.loads(json.dumps(message, default=str)))
+
+
+class MongoChangeStreamBackplane(Backplane):
+    """Owners and messages in MongoDB; delivery via a change stream per node."""
+
+    def __init__(self, client: Any = None, node_id: Optional[str] = None, db_name: str = "MozaiksAI") -> None:
+        super().__init__(node_id)
+        self._client = client
+        self._db_name = db_name
+        self._owner_cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._owner_cache_ttl = max(0.0, _env_float("MOZAIKS_BACKPLANE_OWNER_CACHE_SEC", 2.0))
+        self._message_ttl = int(max(60.0, _env_float("MOZAIKS_BACKPLANE_MESSAGE_TTL_SEC", 300.0)))
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def distributed(self) -> bool:
+        return True
+
+    def _db(self):
+        if self._client is None:
+            from mozaiksai.core.core_config import get_mongo_client
+
+            self._client = get_mongo_client()
+        return self._client[self._db_name]
+
+    async def start(self, handler: MessageHandler) -> None:
+        await super().start(handler)
+        messages = self._db()[_MESSAGES_COLLECTION]
+        try:
+            await messages.create_index("created_at", expireAfterSeconds=self._message_ttl)
+            await self._db()[_OWNERS_COLLECTION].create_index("node_id")
+        except Exception as e:
+            logger.warning(f"[BACKPLANE] Index creation failed: {e}")
+        self._watch_task = asyncio.create_task(self._watch_loop())
+        logger.info(f"[BACKPLANE] Mongo change-stream backplane started (node={self.node_id})")
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._watch_task = None
+        try:
+            await self._db()[_OWNERS_COLLECTION].delete_many({"node_id": self.node_id})
+        except Exception as e:
+            logger.debug(f"[BACKPLANE] Owner cleanup failed: {e}")
+        await super().stop()
+
+    async def claim(self, key: str) -> None:
+        await self._db()[_OWNERS_COLLECTION].update_one(
+            {"_id": key},
+            {"$set": {"node_id": self.node_id, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        self._owner_cache[key] = (self.node_id, time.monotonic())
+
+    async def release(self, key: str) -> None:
+        self._owner_cache.pop(key, None)
+        await self._db()[_OWNERS_COLLECTION].delete_one({"_id": key, "node_id": self.node_id})
+
+    async def owner_of(self, key: str) -> Optional[str]:
+        cached = self._owner_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self._owner_cache_ttl:
+            return cached[0]
+        doc = await self._db()[_OWNERS_COLLECTION].find_one({"_id": key}, {"node_id": 1})
+        owner = doc.get("node_id") if doc else None
+        self._owner_cache[key] = (owner, time.monotonic())
+        return owner
+
+    async def send(self, node_id: str, message: Dict[str, Any]) -> None:
+        await self._db()[_MESSAGES_COLLECTION].insert_one({
+            "target": node_id,
+            "source": self.node_id,
+            "body": json.dumps(message, default=str),
+            "created_at": datetime.now(timezone.utc),
+        })
+        self.sent += 1
+
+    async def _watch_loop(self) -> None:
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.target": self.node_id}}]
+        delay = 1.0
+        while True:
+            try:
+                async with self._db()[_MESSAGES_COLLECTION].watch(pipeline) as stream:
+                    delay = 1.0
+                    async for change in stream:
+                        doc = change.get("fullDocument") or {}
+                        try:
+                            message = json.loads(doc.get("body") or "{}")
+                        except ValueError:
+                            continue
+                        await self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[BACKPLANE] Change stream interrupted ({e}); retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+_backplane: Optional[Backplane] = None
+
+
+def get_backplane() -> Backplane:
+    """Process-wide backplane selected by ``MOZAIKS_BACKPLANE`` (memory | mongo)."""
+    global _backplane
+    if _backplane is None:
+        backend = (os.getenv("MOZAIKS_BACKPLANE") or "memory").strip().lower()
+        if backend == "mongo":
+            _backplane = MongoChangeStreamBackplane()
+        else:
+            if backend != "memory":
+                logger.warning(f"[BACKPLANE] Unknown MOZAIKS_BACKPLANE={backend!r}; using memory")
+            _backplane = InMemoryBackplane()
+    return _backplane
+
+
+__all__ = [
+    "Backplane",
+    "InMemoryBackplane",
+    "InMemoryHub",
+    "MongoChangeStreamBackplane",
+    "get_backplane",
+]
@@ -0,0 +1,125 @@
+# ==============================================================================
+# FILE: outbound_queue.py
+# DESCRIPTION: Bounded per-connection outbound queue with coalescing rules
+# ==============================================================================
+
+# === MOZAIKS-CORE-HEADER ===
+
+"""Per-connection outbound queue used by SimpleTransport (H1 backpressure).
+
+All operations the send path needs are O(1) on a ``collections.deque``:
+
+- ``push`` appends; a ``chat.usage_delta`` directly behind another one for the
+  same agent/model is merged into it (token counts and duration summed) instead
+  of taking a slot.
+- When the queue is full the oldest *droppable* message is evicted. Messages
+  the user must act on (``chat.input_request``, ``chat.tool_call``) and history
+  pages (``chat.replay_batch``) are never dropped; if only those remain the
+  queue is allowed to exceed its bound.
+- ``push_front`` puts an unsent message back at the head for retry.
+
+Drop / coalesce counts are kept per queue and surfaced via ``snapshot()``.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional
+
+PROTECTED_TYPES = frozenset({"chat.input_request", "chat.tool_call", "chat.replay_batch"})
+COALESCE_TYPES = frozenset({"chat.usage_delta"})
+_SUMMED_USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens", "duration_sec")
+
+
+def _message_type(message: Any) -> Optional[str]:
+    if isinstance(message, dict):
+        msg_type = message.get("type")
+        return msg_type if isinstance(msg_type, str) else None
+    return None
+
+
+class OutboundQueue:
+    """Bounded FIFO of outbound envelopes for one websocket connection."""
+
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen = max(1, int(maxlen))
+        self._items: Deque[Any] = deque()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped: Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def push(self, message: Any) -> None:
+        self.enqueued += 1
+        if self._items and self._try_coalesce(message):
+            self.coalesced += 1
+            return
+        if len(self._items) >= self.maxlen:
+            self._evict_oldest_droppable()
+        self._items.append(message)
+
+    def push_front(self, message: Any) -> None:
+        """Return an unsent message to the head of the queue (retry path)."""
+        self._items.appendleft(message)
+
+    def pop(self) -> Any:
+        return self._items.popleft()
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._items),
+            "maxlen": self.maxlen,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": sum(self.dropped.values()),
+            "dropped_by_type": dict(self.dropped),
+        }
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _try_coalesce(self, message: Any) -> bool:
+        msg_type = _message_type(message)
+        if msg_type not in COALESCE_TYPES:
+            return False
+        tail = self._items[-1]
+        if _message_type(tail) != msg_type:
+            return False
+        new_data, old_data = message.get("data"), tail.get("data")
+        if not isinstance(new_data, dict) or not isinstance(old_data, dict):
+            return False
+        if (new_data.get("agent_name"), new_data.get("model_name")) != (old_data.get("agent_name"), old_data.get("model_name")):
+            return False
+        merged = dict(new_data)
+        for field in _SUMMED_USAGE_FIELDS:
+            try:
+                merged[field] = (old_data.get(field) or 0) + (new_data.get(field) or 0)
+            except TypeError:
+                return False
+        merged["coalesced_events"] = int(old_data.get("coalesced_events") or 1) + 1
+        self._items[-1] = {**message, "data": merged}
+        return True
+
+    def _evict_oldest_droppable(self) -> None:
+        # The head is almost always droppable; protected messages skipped over
+        # are rotated back in their original order.
+        skipped: list[Any] = []
+        while self._items:
+            head = self._items.popleft()
+            if _message_type(head) in PROTECTED_TYPES:
+                skipped.append(head)
+                continue
+            self.dropped[_message_type(head) or "unknown"] += 1
+            break
+        self._items.extendleft(reversed(skipped))
+
+
+__all__ = ["OutboundQueue", "PROTECTED_TYPES", "COALESCE_TYPES"]
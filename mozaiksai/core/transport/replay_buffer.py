@@ -0,0 +1,141 @@
+# ==============================================================================
+# FILE: replay_buffer.py
+# DESCRIPTION: Per-chat ring buffer of recent outbound envelopes for fast resume
+# ==============================================================================
+
+# === MOZAIKS-CORE-HEADER ===
+
+"""Recent live envelopes per chat, used to serve ``client.resume`` from memory.
+
+Most reconnects are short network blips: the client only missed the last few
+envelopes, which the transport still has. ``SimpleTransport`` records every live
+``chat.text`` envelope here under its *transcript* sequence (persisted message
+index + 1, the ``sequence`` stored on the ChatSessions message), and a resume
+whose cursor falls inside a chat's window is answered without touching MongoDB.
+Hidden messages are persisted but never sent; they are recorded as placeholders
+(``envelope=None``) so the window stays contiguous, and are never replayed.
+
+Bounds:
+
+- ``per_chat`` envelopes per chat (oldest evicted first).
+- ``max_bytes`` across all chats. Size is an estimate (content length plus a
+  fixed overhead, no extra serialization); when over budget the oldest envelope
+  of the least recently active chat is evicted.
+
+Each chat tracks ``floor``: every sequence above it is still buffered (a window
+only ever holds consecutive sequences). A cursor is covered when
+``floor <= after_seq <= newest``; anything else falls back to the persisted
+transcript.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+_ENVELOPE_OVERHEAD_BYTES = 256
+
+
+def _estimate_size(envelope: Optional[Dict[str, Any]]) -> int:
+    if envelope is None:
+        return 0
+    data = envelope.get("data")
+    content = data.get("content") if isinstance(data, dict) else None
+    return _ENVELOPE_OVERHEAD_BYTES + (len(content) if isinstance(content, str) else len(str(content or "")))
+
+
+@dataclass
+class _ChatWindow:
+    floor: int
+    entries: Deque[Tuple[int, Optional[Dict[str, Any]], int]] = field(default_factory=deque)
+
+    @property
+    def newest(self) -> int:
+        return self.entries[-1][0] if self.entries else self.floor
+
+
+class ReplayBuffer:
+    """Bounded per-chat windows of ``(sequence, envelope)`` with a global byte budget."""
+
+    def __init__(self, per_chat: int, max_bytes: int) -> None:
+        self.per_chat = max(0, int(per_chat))
+        self.max_bytes = max(0, int(max_bytes))
+        self._chats: "OrderedDict[str, _ChatWindow]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_chat > 0 and self.max_bytes > 0
+
+    def record(self, chat_id: str, sequence: int, envelope: Optional[Dict[str, Any]]) -> None:
+        """Buffer ``envelope`` at ``sequence`` (None marks a hidden message that is never replayed)."""
+        if not self.enabled:
+            return
+        window = self._chats.get(chat_id)
+        if window is None or sequence != window.newest + 1:
+            # New chat, or a transcript position this node never saw: start a fresh window.
+            if window is not None:
+                self._discard(chat_id)
+            window = _ChatWindow(floor=sequence - 1)
+            self._chats[chat_id] = window
+        self._chats.move_to_end(chat_id)
+        size = _estimate_size(envelope)
+        window.entries.append((sequence, envelope, size))
+        self.total_bytes += size
+        while len(window.entries) > self.per_chat:
+            self._evict_oldest(window)
+        while self.total_bytes > self.max_bytes and self._chats:
+            oldest_chat_id, oldest = next(iter(self._chats.items()))
+            self._evict_oldest(oldest)
+            if not oldest.entries:
+                del self._chats[oldest_chat_id]
+
+    def since(self, chat_id: str, after_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Envelopes with sequence > ``after_seq`` (oldest first), or None if not covered."""
+        window = self._chats.get(chat_id)
+        if window is None or not window.entries or not (window.floor <= after_seq <= window.newest):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [envelope for seq, envelope, _ in window.entries if seq > after_seq and envelope is not None]
+
+    def newest(self, chat_id: str) -> Optional[int]:
+        """Highest buffered sequence for ``chat_id``, or None."""
+        window = self._chats.get(chat_id)
+        return window.newest if window is not None and window.entries else None
+
+    def drop(self, chat_id: str) -> None:
+        if chat_id in self._chats:
+            self._discard(chat_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "chats": len(self._chats),
+            "envelopes": sum(len(w.entries) for w in self._chats.values()),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "per_chat": self.per_chat,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _evict_oldest(self, window: _ChatWindow) -> None:
+        seq, _, size = window.entries.popleft()
+        window.floor = seq
+        self.total_bytes -= size
+        self.evicted += 1
+
+    def _discard(self, chat_id: str) -> None:
+        window = self._chats.pop(chat_id)
+        self.total_bytes -= sum(size for _, _, size in window.entries)
+
+
+__all__ = ["ReplayBuffer"]
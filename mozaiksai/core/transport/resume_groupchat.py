@@ -7,6 +7,7 @@
 
 from __future__ import annotations
 
+import os
 from datetime import datetime, timezone
 from typing import Any, Awaitable, Callable, Dict, List, Optional
 
@@ -15,6 +16,14 @@ from logs.logging_config import get_core_logger
 SendEventFunc = Callable[[Dict[str, Any], Optional[str]], Awaitable[None]]
 
 
+def get_replay_page_size() -> int:
+    """Messages per ``chat.replay_batch`` page (``0`` = legacy one ``chat.text`` per message)."""
+    try:
+        return max(0, int(os.getenv("RESUME_REPLAY_PAGE_SIZE", "100")))
+    except ValueError:
+        return 100
+
+
 class GroupChatResumer:
     """Encapsulates AG2-aligned resume flows for websocket transports."""
 
@@ -35,7 +44,12 @@ class GroupChatResumer:
             self.logger.debug("[AUTO_RESUME] Missing app_id for %s; skipping", chat_id)
             return None
 
-        doc = await self._fetch_chat_doc(chat_id, app_id, projection={"status": 1, "messages": 1})
+        page_size = get_replay_page_size()
+        if page_size:
+            # Only the newest page is read; older history is paged on demand (client.replay_page).
+            doc = await self._fetch_transcript_page(chat_id, app_id, limit=page_size)
+        else:
+            doc = await self._fetch_transcript_window(chat_id, app_id, start_index=0)
         if not doc:
             self.logger.debug("[AUTO_RESUME] No persisted chat found for %s", chat_id)
             return None
@@ -58,9 +72,41 @@ class GroupChatResumer:
             self.logger.debug("[AUTO_RESUME] No messages to replay for %s", chat_id)
             return None
 
+        if page_size:
+            start_index = int(doc.get("start_index", 0) or 0)
+            total_messages = int(doc.get("total_messages", len(messages)) or 0)
+            await send_event(
+                self._build_batch_event(
+                    chat_id=chat_id,
+                    messages=messages,
+                    start_index=start_index,
+                    total_messages=total_messages,
+                    direction="latest",
+                    startup_mode=startup_mode,
+                ),
+                chat_id,
+            )
+            last_index = start_index + len(messages) - 1
+            await send_event(
+                self._build_boundary_event(
+                    chat_id=chat_id,
+                    total_messages=total_messages,
+                    replayed=len(messages),
+                    last_index=last_index,
+                    mode="auto",
+                    chat_status="in_progress",
+                    start_index=start_index,
+                    events_slice=messages[-1:],
+                    context={"reason": "on_connect"},
+                ),
+                chat_id,
+            )
+            return last_index
+
         last_index = await self._replay_messages(
             chat_id=chat_id,
             messages=messages,
+            total_messages=int(doc.get("total_messages", len(messages)) or 0),
             send_event=send_event,
             mode="auto",
             chat_status="in_progress",
@@ -82,24 +128,30 @@ class GroupChatResumer:
         if not app_id:
             raise RuntimeError("Missing app_id for resume flow")
 
-        doc = await self._fetch_chat_doc(chat_id, app_id, projection={"status": 1, "messages": 1})
-        messages: List[Dict[str, Any]] = doc.get("messages", []) or []
-        status = doc.get("status", "unknown")
-
         if last_client_index < -1:
             last_client_index = -1
         start_index = last_client_index + 1
 
-        if start_index >= len(messages):
+        page_size = get_replay_page_size()
+        # Only the unseen tail (index >= start_index) is read from persistence.
+        if page_size:
+            doc = await self._fetch_transcript_page(chat_id, app_id, limit=page_size, start_index=start_index)
+        else:
+            doc = await self._fetch_transcript_window(chat_id, app_id, start_index=start_index)
+        messages: List[Dict[str, Any]] = doc.get("messages", []) or []
+        total_messages = int(doc.get("total_messages", 0) or 0)
+        status = doc.get("status", "unknown")
+
+        if not messages:
             summary = {
                 "replayed_messages": 0,
                 "last_message_index": last_client_index,
-                "total_messages": len(messages),
+                "total_messages": total_messages,
             }
             await send_event(
                 self._build_boundary_event(
                     chat_id=chat_id,
-                    total_messages=len(messages),
+                    total_messages=total_messages,
                     replayed=0,
                     last_index=last_client_index,
                     mode="client",
@@ -112,9 +164,24 @@ class GroupChatResumer:
             )
             return summary
 
+        context = {"reason": "client_resume", "last_client_index": last_client_index}
+        if page_size:
+            return await self._replay_tail_in_pages(
+                chat_id=chat_id,
+                app_id=app_id,
+                first_page=messages,
+                start_index=start_index,
+                total_messages=total_messages,
+                chat_status=status,
+                page_size=page_size,
+                send_event=send_event,
+                context=context,
+            )
+
         last_index = await self._replay_messages(
             chat_id=chat_id,
             messages=messages,
+            total_messages=total_messages,
             send_event=send_event,
             mode="client",
             chat_status=status,
@@ -123,19 +190,146 @@ class GroupChatResumer:
             startup_mode=None,  # Client resume doesn't need filtering (they already saw it)
         )
         return {
-            "replayed_messages": len(messages[start_index:]) if last_index is not None else 0,
+            "replayed_messages": len(messages) if last_index is not None else 0,
             "last_message_index": last_index if last_index is not None else last_client_index,
-            "total_messages": len(messages),
+            "total_messages": total_messages,
         }
 
+    async def handle_replay_page_request(
+        self,
+        *,
+        chat_id: str,
+        app_id: Optional[str],
+        before_index: int,
+        send_event: SendEventFunc,
+        limit: Optional[int] = None,
+        startup_mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Send the page of history just before ``before_index`` (client.replay_page)."""
+        if not app_id:
+            raise RuntimeError("Missing app_id for replay page")
+        page_size = max(1, int(limit or get_replay_page_size() or 100))
+        doc = await self._fetch_transcript_page(
+            chat_id, app_id, limit=page_size, before_index=max(0, int(before_index))
+        )
+        messages: List[Dict[str, Any]] = doc.get("messages", []) or []
+        start_index = int(doc.get("start_index", 0) or 0)
+        total_messages = int(doc.get("total_messages", 0) or 0)
+        await send_event(
+            self._build_batch_event(
+                chat_id=chat_id,
+                messages=messages,
+                start_index=start_index,
+                total_messages=total_messages,
+                direction="older",
+                startup_mode=startup_mode,
+            ),
+            chat_id,
+        )
+        return {"start_index": start_index, "returned_messages": len(messages), "total_messages": total_messages}
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
+    async def _replay_tail_in_pages(
+        self,
+        *,
+        chat_id: str,
+        app_id: str,
+        first_page: List[Dict[str, Any]],
+        start_index: int,
+        total_messages: int,
+        chat_status: Any,
+        page_size: int,
+        send_event: SendEventFunc,
+        context: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Replay ``[start_index, total)`` as forward ``replay_batch`` pages, then the boundary."""
+        page, page_start, replayed = first_page, start_index, 0
+        last_page = first_page
+        while page:
+            last_page = page
+            await send_event(
+                self._build_batch_event(
+                    chat_id=chat_id,
+                    messages=page,
+                    start_index=page_start,
+                    total_messages=total_messages,
+                    direction="forward",
+                    startup_mode=None,
+                ),
+                chat_id,
+            )
+            replayed += len(page)
+            page_start += len(page)
+            if page_start >= total_messages:
+                break
+            doc = await self._fetch_transcript_page(chat_id, app_id, limit=page_size, start_index=page_start)
+            page = doc.get("messages", []) or []
+            total_messages = max(total_messages, int(doc.get("total_messages", 0) or 0))
+
+        last_index = start_index + replayed - 1
+        await send_event(
+            self._build_boundary_event(
+                chat_id=chat_id,
+                total_messages=total_messages,
+                replayed=replayed,
+                last_index=last_index,
+                mode="client",
+                chat_status=chat_status,
+                start_index=start_index,
+                events_slice=last_page[-1:],
+                context=context,
+            ),
+            chat_id,
+        )
+        return {
+            "replayed_messages": replayed,
+            "last_message_index": last_index,
+            "total_messages": total_messages,
+        }
+
+    def _build_batch_event(
+        self,
+        *,
+        chat_id: str,
+        messages: List[Dict[str, Any]],
+        start_index: int,
+        total_messages: int,
+        direction: str,
+        startup_mode: Optional[str],
+    ) -> Dict[str, Any]:
+        """One ``replay_batch`` event carrying a page of text events (oldest first)."""
+        events = [
+            self._build_text_event(message=message, index=start_index + offset, chat_id=chat_id)
+            for offset, message in enumerate(messages)
+            if not self._is_hidden_seed(message, startup_mode)
+        ]
+        return {
+            "kind": "replay_batch",
+            "chat_id": chat_id,
+            "direction": direction,
+            "start_index": start_index,
+            "last_index": start_index + len(messages) - 1,
+            "total_messages": total_messages,
+            "has_more_before": start_index > 0,
+            "messages": events,
+        }
+
+    def _is_hidden_seed(self, message: Dict[str, Any], startup_mode: Optional[str]) -> bool:
+        """The hidden user-proxy kickstart (initial_message) is never replayed in AgentDriven mode."""
+        if startup_mode != "AgentDriven":
+            return False
+        metadata = message.get("metadata", {})
+        metadata_seed_kind = metadata.get("_mozaiks_seed_kind") if isinstance(metadata, dict) else None
+        return message.get("_mozaiks_seed_kind") == "initial_message" or metadata_seed_kind == "initial_message"
+
     async def _replay_messages(
         self,
         *,
         chat_id: str,
         messages: List[Dict[str, Any]],
+        total_messages: int,
         send_event: SendEventFunc,
         mode: str,
         chat_status: str,
@@ -143,12 +337,13 @@ class GroupChatResumer:
         context: Optional[Dict[str, Any]],
         startup_mode: Optional[str] = None,
     ) -> Optional[int]:
-        slice_messages = messages[start_index:]
+        """Replay ``messages`` (the persisted window beginning at ``start_index``)."""
+        slice_messages = messages
         if not slice_messages:
             await send_event(
                 self._build_boundary_event(
                     chat_id=chat_id,
-                    total_messages=len(messages),
+                    total_messages=total_messages,
                     replayed=0,
                     last_index=start_index - 1,
                     mode=mode,
@@ -167,19 +362,12 @@ class GroupChatResumer:
             
             # Filter out initial_message from UserProxy in AgentDriven mode during reconnect
             # This prevents the hidden kickstart message from appearing in the UI on resume
-            should_skip = False
-            if startup_mode == "AgentDriven":
-                # Check if this is the initial_message seed (hidden user proxy kickstart)
-                seed_kind = message.get("_mozaiks_seed_kind")
-                metadata = message.get("metadata", {})
-                metadata_seed_kind = metadata.get("_mozaiks_seed_kind") if isinstance(metadata, dict) else None
-                
-                if seed_kind == "initial_message" or metadata_seed_kind == "initial_message":
-                    self.logger.debug(
-                        "[AUTO_RESUME] Skipping initial_message for AgentDriven workflow (index=%d, chat_id=%s)",
-                        absolute_index, chat_id
-                    )
-                    should_skip = True
+            should_skip = self._is_hidden_seed(message, startup_mode)
+            if should_skip:
+                self.logger.debug(
+                    "[AUTO_RESUME] Skipping initial_message for AgentDriven workflow (index=%d, chat_id=%s)",
+                    absolute_index, chat_id
+                )
             
             if not should_skip:
                 await send_event(
@@ -191,7 +379,7 @@ class GroupChatResumer:
         await send_event(
             self._build_boundary_event(
                 chat_id=chat_id,
-                total_messages=len(messages),
+                total_messages=total_messages,
                 replayed=len(slice_messages),
                 last_index=last_index,
                 mode=mode,
@@ -294,18 +482,40 @@ class GroupChatResumer:
             "metadata": message.get("metadata"),
         }
 
-    async def _fetch_chat_doc(
+    async def _fetch_transcript_window(
+        self,
+        chat_id: str,
+        app_id: str,
+        *,
+        start_index: int,
+    ) -> Dict[str, Any]:
+        try:
+            pm = await self._ensure_persistence_manager()
+            return await pm.load_transcript_window(chat_id=chat_id, app_id=app_id, start_index=start_index) or {}
+        except Exception as exc:
+            self.logger.warning("Failed to fetch transcript window for %s: %s", chat_id, exc)
+            return {}
+
+    async def _fetch_transcript_page(
         self,
         chat_id: str,
         app_id: str,
-        projection: Optional[Dict[str, int]] = None,
+        *,
+        limit: int,
+        start_index: Optional[int] = None,
+        before_index: Optional[int] = None,
     ) -> Dict[str, Any]:
         try:
             pm = await self._ensure_persistence_manager()
-            coll = await pm._coll()
-            return await coll.find_one({"_id": chat_id, "app_id": app_id}, projection) or {}
+            return await pm.load_transcript_page(
+                chat_id=chat_id,
+                app_id=app_id,
+                limit=limit,
+                start_index=start_index,
+                before_index=before_index,
+            ) or {}
         except Exception as exc:
-            self.logger.warning("Failed to fetch chat doc for %s: %s", chat_id, exc)
+            self.logger.warning("Failed to fetch transcript page for %s: %s", chat_id, exc)
             return {}
 
     async def _ensure_persistence_manager(self):
@@ -316,5 +526,5 @@ class GroupChatResumer:
         return self._persistence_manager
 
 
-__all__ = ["GroupChatResumer"]
+__all__ = ["GroupChatResumer", "get_replay_page_size"]
 
@@ -4,21 +4,16 @@
 # ==============================================================================
 import logging
 import asyncio
+import importlib
 import re
 import json
 import uuid
 import traceback
 import os
-import importlib
+import time
 from typing import Dict, Any, Optional, Union, Tuple, List
 from fastapi import WebSocket
 from datetime import datetime, timezone
-try:  # pymongo optional in some test environments
-    from pymongo import ReturnDocument  # type: ignore
-except Exception:  # pragma: no cover
-    class ReturnDocument:  # minimal fallback so attribute exists
-        AFTER = 1
-
 # AG2 imports for event type checking
 from autogen.events import BaseEvent
 
@@ -27,6 +22,11 @@ from mozaiksai.core.workflow.workflow_manager import workflow_manager
 
 # Enhanced logging setup
 from logs.logging_config import get_core_logger
+from mozaiksai.core.observability.event_trace import get_event_trace
+from mozaiksai.core.transport.outbound_queue import OutboundQueue
+from mozaiksai.core.transport.replay_buffer import ReplayBuffer
+from mozaiksai.core.transport.backplane import get_backplane
+from mozaiksai.core.transport.timer_wheel import TimerHandle, get_timer_wheel
 
 # Session manager for multi-workflow navigation
 from mozaiksai.core.workflow import session_manager
@@ -37,6 +37,19 @@ from mozaiksai.core.runtime.extensions import get_workflow_lifecycle_hooks
 
 # Get our enhanced loggers
 logger = get_core_logger("simple_transport")
+_trace = get_event_trace("transport")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default)).strip()))
+    except ValueError:
+        return default
+
+
+def _expire_ui_tool_future(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_exception(asyncio.TimeoutError("UI tool response timed out"))
 
 
 def _load_general_agent_service():
@@ -144,15 +157,39 @@ class SimpleTransport:
         self._sequence_counters: Dict[str, int] = {}          # T3
 
         # H1-H2: Hardening features
-        self._message_queues: Dict[str, List[Dict[str, Any]]] = {}  # H1
-        self._heartbeat_tasks: Dict[str, asyncio.Task] = {}         # H2
-        self._max_queue_size = 100
+        self._message_queues: Dict[str, OutboundQueue] = {}  # H1
+        self._writer_tasks: Dict[str, asyncio.Task] = {}     # H1: sole sender per connection
+        self._writer_wakeups: Dict[str, asyncio.Event] = {}
+        self._writer_retry_delay = 0.5
+        # Heartbeats, idle checks, writer retries and UI tool timeouts share one timer wheel
+        # (one driver task total instead of a sleeping task per connection).
+        self._timers = get_timer_wheel()
+        self._heartbeat_timers: Dict[str, TimerHandle] = {}         # H2
+        self._max_queue_size = _env_int("MOZAIKS_WS_QUEUE_MAX", 100)
+        # Slow consumer detection: flag at high-water, clear at half of it,
+        # optionally close the socket after staying above it this long (0 = never).
+        self._queue_high_water = min(self._max_queue_size, _env_int("MOZAIKS_WS_QUEUE_HIGH_WATER", 80))
+        self._slow_consumer_disconnect_sec = _env_int("MOZAIKS_WS_SLOW_CONSUMER_DISCONNECT_SEC", 0)
         self._heartbeat_interval = 120
+        self._idle_timeout_sec = _env_int("MOZAIKS_WS_IDLE_TIMEOUT_SEC", 0)
+        # Recent live chat.text envelopes per chat, keyed by transcript sequence, so short
+        # reconnects resume from memory (survives _cleanup_connection; dropped on run
+        # completion; bounded per chat and by a global byte budget).
+        self._replay_buffer = ReplayBuffer(
+            per_chat=_env_int("MOZAIKS_WS_REPLAY_BUFFER_SIZE", 200),
+            max_bytes=_env_int("MOZAIKS_WS_REPLAY_BUFFER_BYTES", 16 * 1024 * 1024),
+        )
+        # Transcript index the next live chat.text will be persisted at, once known
+        # (a user message's persisted index or a persisted resume's total).
+        self._replay_next_index: Dict[str, int] = {}
 
         # H4: Pre-connection buffering (delivery reliability)
         self._pre_connection_buffers: Dict[str, List[Dict[str, Any]]] = {}
         self._max_pre_connection_buffer = 200
-        self._scheduled_flush_tasks: Dict[str, asyncio.Task] = {}
+
+        # Cross-node routing (sockets, UI tool futures and input callbacks are owned
+        # by the node that holds them; a no-op with the single-process default).
+        self._backplane = get_backplane()
 
         # UI tool response correlation
         self.pending_ui_tool_responses: Dict[str, asyncio.Future] = {}
@@ -205,11 +242,13 @@ class SimpleTransport:
     # USER INPUT COLLECTION (Production-Ready)
     # ==================================================================================
     
-    async def submit_user_input(self, input_request_id: str, user_input: str) -> bool:
+    async def submit_user_input(self, input_request_id: str, user_input: str, *, route: bool = True) -> bool:
         """
         Submit user input response for a pending input request.
         
         This method is called by the API endpoint when the frontend submits user input.
+        If the callback lives on another node it is forwarded there (``route=False``
+        for messages that already came in over the backplane).
         """
         logger.info(f"🔍 [INPUT_SUBMIT] Looking for request_id={input_request_id} in {len(self._input_request_registries)} chat registries")
         for cid, reg in self._input_request_registries.items():
@@ -240,6 +279,7 @@ class SimpleTransport:
                         del reg[input_request_id]
                     except Exception:
                         pass
+                    await self._backplane_release(f"input:{input_request_id}")
                 break
         if handled:
             # Emit chat.input_ack for B9/B10 protocol compliance
@@ -253,6 +293,13 @@ class SimpleTransport:
                 except Exception as e:
                     logger.warning(f"Failed to emit input_ack: {e}")
             return True
+
+        if route and await self._route_to_owner(
+            f"input:{input_request_id}",
+            {"op": "user_input", "request_id": input_request_id, "user_input": user_input},
+        ):
+            logger.info(f"📡 [INPUT] Forwarded request {input_request_id} to owning node")
+            return True
         
         logger.error(f"❌ [INPUT] No active request found for {input_request_id}")
         return False
@@ -263,7 +310,12 @@ class SimpleTransport:
     def register_orchestration_input_registry(self, chat_id: str, registry: Dict[str, Any]) -> None:
         self._input_request_registries[chat_id] = registry
 
-    def register_input_request(self, chat_id: str, request_id: str, respond_cb: Any) -> str:
+    async def register_input_request(self, chat_id: str, request_id: str, respond_cb: Any) -> str:
+        """Register an AG2 input callback; with a distributed backplane also claim it.
+
+        The claim is awaited so it is recorded before the input request is emitted
+        to the client, and an answer landing on another node can always be routed here.
+        """
         normalized_id = str(request_id) if request_id is not None else ""
         if not normalized_id or normalized_id.lower() == "none":
             normalized_id = uuid.uuid4().hex
@@ -271,9 +323,75 @@ class SimpleTransport:
         if chat_id not in self._input_request_registries:
             self._input_request_registries[chat_id] = {}
         self._input_request_registries[chat_id][normalized_id] = respond_cb
+        await self._backplane_claim(f"input:{normalized_id}")
         logger.debug(f"Registered input request {normalized_id} for chat {chat_id}")
         return normalized_id
 
+    # ------------------------------------------------------------------
+    # Cross-node backplane
+    # ------------------------------------------------------------------
+    async def start_backplane(self) -> None:
+        await self._backplane.start(self._handle_backplane_message)
+        logger.info(
+            f"📡 Transport backplane started: {type(self._backplane).__name__} (node={self._backplane.node_id})"
+        )
+
+    async def stop_backplane(self) -> None:
+        await self._backplane.stop()
+
+    def get_backplane_stats(self) -> Dict[str, Any]:
+        """Backplane backend, node id and message counters (for /metrics)."""
+        return self._backplane.snapshot()
+
+    async def _backplane_claim(self, key: str) -> None:
+        if not self._backplane.distributed:
+            return
+        try:
+            await self._backplane.claim(key)
+        except Exception as e:
+            logger.warning(f"[BACKPLANE] Failed to claim {key}: {e}")
+
+    async def _backplane_release(self, key: str) -> None:
+        if not self._backplane.distributed:
+            return
+        try:
+            await self._backplane.release(key)
+        except Exception as e:
+            logger.debug(f"[BACKPLANE] Failed to release {key}: {e}")
+
+    async def _route_to_owner(self, key: str, message: Dict[str, Any]) -> bool:
+        """Send ``message`` to the node owning ``key``; False if it is local or unowned."""
+        if not self._backplane.distributed:
+            return False
+        try:
+            owner = await self._backplane.owner_of(key)
+            if not owner or owner == self._backplane.node_id:
+                return False
+            await self._backplane.send(owner, message)
+            return True
+        except Exception as e:
+            logger.warning(f"[BACKPLANE] Routing {key} failed: {e}")
+            return False
+
+    async def _handle_backplane_message(self, message: Dict[str, Any]) -> None:
+        """Apply a message from another node locally (never re-routed, so no loops)."""
+        op = message.get("op")
+        if op == "envelope":
+            chat_id = message.get("chat_id")
+            envelope = message.get("envelope")
+            if chat_id and isinstance(envelope, dict):
+                await self._broadcast_to_websockets(envelope, str(chat_id), route=False)
+        elif op == "ui_tool_response":
+            await self.submit_ui_tool_response(
+                str(message.get("event_id")), message.get("response_data") or {}, route=False
+            )
+        elif op == "user_input":
+            await self.submit_user_input(
+                str(message.get("request_id")), str(message.get("user_input") or ""), route=False
+            )
+        else:
+            logger.debug(f"[BACKPLANE] Ignoring unknown op {op!r}")
+
     def _build_resume_signal(self, chat_id: str, request_id: str) -> str:
         """Produce a non-empty fallback message when resuming pending input requests.
 
@@ -378,31 +496,33 @@ class SimpleTransport:
         if not content:
             return
         index: Optional[int] = None
+        persisted = False
         try:
             from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
             pm = getattr(self, '_persistence_manager', None)
             if not pm:
                 pm = AG2PersistenceManager()
                 self._persistence_manager = pm
-            coll = await pm._coll()  # type: ignore[attr-defined]
             now_dt = datetime.now(timezone.utc)
-            bump = await coll.find_one_and_update(
-                {"_id": chat_id},
-                {"$inc": {"last_sequence": 1}, "$set": {"last_updated_at": now_dt}},
-                return_document=ReturnDocument.AFTER,
-            )
-            seq = int(bump.get('last_sequence', 1)) if bump else 1
-            index = seq - 1  # zero-based index for UI
+            app_id = (self.connections.get(chat_id) or {}).get('app_id')
+            if not app_id:
+                coll = await pm._coll()  # type: ignore[attr-defined]
+                scope_doc = await coll.find_one({"_id": chat_id}, {"app_id": 1})
+                app_id = scope_doc.get('app_id') if scope_doc else None
             msg_doc = {
                 'role': 'user',
                 'name': 'user',
                 'content': content,
                 'timestamp': now_dt,
                 'event_type': 'message.created',
-                'sequence': seq,
                 'source': source,
             }
-            await coll.update_one({"_id": chat_id}, {"$push": {"messages": msg_doc}})
+            # Queued agent messages precede this input; persist them first so sequences stay ordered.
+            await pm.flush_pending_events(chat_id)
+            sequences = await pm.append_sequenced_messages(chat_id=chat_id, app_id=str(app_id), messages=[msg_doc]) if app_id else []
+            persisted = bool(sequences)
+            seq = sequences[0] if sequences else 1
+            index = seq - 1  # zero-based index for UI
         except Exception as e:
             # Persistence failure should not block UI emission; fall back to in-memory sequence
             logger.error(f"Failed to persist user message for {chat_id}: {e}")
@@ -417,6 +537,10 @@ class SimpleTransport:
             await self.send_event_to_ui({'kind': 'text', 'agent': 'user', 'content': content, 'index': index}, chat_id)
         except Exception as emit_err:
             logger.error(f"Failed to emit user message event for {chat_id}: {emit_err}")
+        if not persisted:
+            # The emitted index is a guess, so buffered transcript positions are no longer known.
+            self._replay_buffer.drop(chat_id)
+            self._replay_next_index.pop(chat_id, None)
 
     async def process_component_action(self, *, chat_id: str, app_id: str, component_id: str, action_type: str, action_data: dict) -> Dict[str, Any]:
         """Apply a component action to context variables and emit acknowledgement.
@@ -441,7 +565,6 @@ class SimpleTransport:
                     from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
                     pm = getattr(self, '_persistence_manager', None) or AG2PersistenceManager()
                     self._persistence_manager = pm
-                    coll = await pm._coll()  # type: ignore[attr-defined]
                     now = datetime.now(timezone.utc)
                     snapshot_doc = {
                         'role': 'system',
@@ -450,9 +573,17 @@ class SimpleTransport:
                         'timestamp': now,
                         'event_type': 'context.updated',
                     }
-                    await coll.update_one({"_id": chat_id, "app_id": app_id}, {"$push": {"messages": snapshot_doc}, "$set": {"last_updated_at": now}})
+                    # Queued agent messages precede the snapshot; persist them first so sequences stay ordered.
+                    await pm.flush_pending_events(chat_id)
+                    sequences = await pm.append_sequenced_messages(chat_id=chat_id, app_id=app_id, messages=[snapshot_doc])
+                    if sequences:
+                        # Persisted but never sent as chat.text: it still takes a transcript position.
+                        self.reserve_replay_slot(chat_id, index=sequences[0] - 1)
                 except Exception as pe:
                     logger.debug(f"Context snapshot persistence failed: {pe}")
+                    # The snapshot may or may not have been written; buffered positions are no longer known.
+                    self._replay_buffer.drop(chat_id)
+                    self._replay_next_index.pop(chat_id, None)
             # Emit acknowledgement event
             await self.send_event_to_ui({
                 'kind': 'component_action_ack',
@@ -479,26 +610,35 @@ class SimpleTransport:
             # Allow callers to provide a fully-formed transport envelope (e.g., ack.ui_tool_response)
             # without forcing another serialization pass through the dispatcher.
             if isinstance(event, dict) and 'type' in event and 'data' in event and 'kind' not in event:
-                logger.info(
+                _trace.count("prebuilt_envelopes")
+                logger.debug(
                     "🔁 [TRANSPORT] Forwarding pre-built envelope without re-serialization: %s",
                     event.get('type')
                 )
                 await self._broadcast_to_websockets(event, chat_id)
                 return
 
+            if isinstance(event, dict) and event.get('kind') == 'replay_batch':
+                _trace.count("replay_batches")
+                await self._broadcast_to_websockets(self._build_replay_batch_envelope(event, chat_id), chat_id)
+                return
+
             from mozaiksai.core.events.unified_event_dispatcher import get_event_dispatcher  # local import to avoid cycle
             dispatcher = get_event_dispatcher()
             workflow_name = None
             if chat_id and chat_id in self.connections:
                 workflow_name = self.connections[chat_id].get('workflow_name')
 
-            # DEBUG: Log what we're processing
-            event_type = type(event).__name__ if hasattr(event, '__class__') else 'dict'
-            if isinstance(event, dict):
-                event_kind = event.get('kind', 'unknown')
-                logger.info(f"🔍 [TRANSPORT] Processing event: type={event_type}, kind={event_kind}, chat_id={chat_id}, dict_keys={list(event.keys()) if isinstance(event, dict) else 'N/A'}")
-            else:
-                logger.info(f"🔍 [TRANSPORT] Processing event: type={event_type}, chat_id={chat_id}")
+            event_type = type(event).__name__
+            _trace.count("events_in")
+            if _trace.sampled():
+                _trace.emit(
+                    "received",
+                    event_type=event_type,
+                    event_kind=event.get('kind') if isinstance(event, dict) else None,
+                    chat_id=chat_id,
+                    dict_keys=list(event.keys()) if isinstance(event, dict) else None,
+                )
 
             envelope = dispatcher.build_outbound_event_envelope(
                 raw_event=event,
@@ -507,10 +647,9 @@ class SimpleTransport:
                 workflow_name=workflow_name,
             )
             if not envelope:
-                logger.warning(f"❌ [TRANSPORT] No envelope created for event type={event_type}")
+                _trace.count("no_envelope")
+                logger.warning("❌ [TRANSPORT] No envelope created for event type=%s", event_type)
                 return
-            
-            logger.info(f"✅ [TRANSPORT] Envelope created successfully: type={envelope.get('type')}, has_data={bool(envelope.get('data'))}")
 
             envelope_type = envelope.get('type') if isinstance(envelope, dict) else None
 
@@ -523,16 +662,7 @@ class SimpleTransport:
                 data_payload = envelope.get("data")
                 if not isinstance(data_payload, dict):
                     return False
-                original_content = data_payload.get("content")
-                if isinstance(original_content, str):
-                    sanitized, redacted, truncated = self._sanitize_trace_content(original_content)
-                    data_payload["content"] = sanitized
-                    data_payload["trace_original_len"] = len(original_content)
-                    data_payload["trace_redacted"] = redacted
-                    data_payload["trace_truncated"] = truncated
-                data_payload["ui_visibility"] = "trace"
-                data_payload["trace_reason"] = "visual_agents_gate"
-                data_payload["trace_agent"] = agent
+                self._mark_as_trace(data_payload, agent=agent)
                 return True
             
             # Determine if this is a UI tool event (requires user interaction)
@@ -551,9 +681,9 @@ class SimpleTransport:
             )
             
             if is_ui_tool_event:
-                logger.info(f"🎯 [TRANSPORT] UI tool event detected - bypassing agent visibility filter (component={envelope.get('data', {}).get('component_type')})")
+                logger.debug("🎯 [TRANSPORT] UI tool event detected - bypassing agent visibility filter (component=%s)", data_payload.get('component_type'))
             elif is_input_request_event:
-                logger.info("🎯 [TRANSPORT] Input request event detected - bypassing agent visibility filter")
+                logger.debug("🎯 [TRANSPORT] Input request event detected - bypassing agent visibility filter")
 
             # Additional filtering (agent visibility) only for BaseEvent path where needed
             agent_name = None
@@ -561,9 +691,13 @@ class SimpleTransport:
                 agent_name = event.sender.name  # type: ignore
             if not skip_visibility_filter and agent_name and not self.should_show_to_user(agent_name, chat_id):
                 if _downgrade_to_trace(agent=str(agent_name)):
-                    logger.info(f"[TRANSPORT] Downgraded non-visual message from '{agent_name}' to trace for chat {chat_id}")
+                    _trace.count("downgraded_to_trace")
+                    logger.debug("[TRANSPORT] Downgraded non-visual message from '%s' to trace for chat %s", agent_name, chat_id)
                 else:
-                    logger.info(f"🚫 [TRANSPORT] Filtered out AG2 event from agent '{agent_name}' for chat {chat_id} (should_show_to_user=False)")
+                    _trace.count("filtered_agent")
+                    logger.debug("🚫 [TRANSPORT] Filtered out AG2 event from agent '%s' for chat %s (should_show_to_user=False)", agent_name, chat_id)
+                    if chat_id:
+                        self._record_replay(chat_id, envelope, hidden=True)
                     return
 
             # Apply visibility filtering for dict events (post-envelope) as well
@@ -575,9 +709,13 @@ class SimpleTransport:
                         agent_name = event.get('agent') or event.get('agent_name')
                 if not skip_visibility_filter and agent_name and not self.should_show_to_user(agent_name, chat_id):
                     if _downgrade_to_trace(agent=str(agent_name)):
-                        logger.info(f"[TRANSPORT] Downgraded non-visual message from '{agent_name}' to trace for chat {chat_id}")
+                        _trace.count("downgraded_to_trace")
+                        logger.debug("[TRANSPORT] Downgraded non-visual message from '%s' to trace for chat %s", agent_name, chat_id)
                     else:
-                        logger.info(f"🚫 [TRANSPORT] Filtered out event from agent '{agent_name}' for chat {chat_id} (visual_agents gate, should_show_to_user=False)")
+                        _trace.count("filtered_agent")
+                        logger.debug("🚫 [TRANSPORT] Filtered out event from agent '%s' for chat %s (visual_agents gate, should_show_to_user=False)", agent_name, chat_id)
+                        if chat_id:
+                            self._record_replay(chat_id, envelope, hidden=True)
                         return
                 
             # Record performance metrics for tool calls (best-effort)
@@ -599,10 +737,17 @@ class SimpleTransport:
             if envelope and isinstance(envelope, dict):
                 data_payload = envelope.get('data')
                 if isinstance(data_payload, dict) and data_payload.get('_mozaiks_hide'):
-                    logger.info(f"🚫 [TRANSPORT] Suppressing hidden message (derived context trigger) for chat {chat_id}: {data_payload.get('content', 'no content')[:100]}")
+                    if chat_id:
+                        self._record_replay(chat_id, envelope, hidden=True)
+                    _trace.count("suppressed_hidden")
+                    logger.debug("🚫 [TRANSPORT] Suppressing hidden message (derived context trigger) for chat %s", chat_id)
                     return
 
-            logger.info(f"📤 [TRANSPORT] Sending envelope: type={envelope.get('type')}, chat_id={chat_id}")
+            _trace.count("envelopes_sent")
+            if _trace.sampled():
+                _trace.emit("send", envelope_type=envelope_type, chat_id=chat_id, agent=agent_name)
+            if chat_id:
+                self._record_replay(chat_id, envelope)
             await self._broadcast_to_websockets(envelope, chat_id)
 
             # Runtime hook: surface run completion to the unified dispatcher so
@@ -610,6 +755,10 @@ class SimpleTransport:
             try:
                 envelope_type = envelope.get('type') if isinstance(envelope, dict) else None
                 if envelope_type == 'chat.run_complete':
+                    if chat_id:
+                        # No more live messages; a later resume reads the persisted transcript.
+                        self._replay_buffer.drop(chat_id)
+                        self._replay_next_index.pop(chat_id, None)
                     data_payload = envelope.get('data') if isinstance(envelope, dict) else None
                     if isinstance(data_payload, dict):
                         dispatch_payload = dict(data_payload)
@@ -633,7 +782,60 @@ class SimpleTransport:
     def _extract_clean_content(self, message: Union[str, Dict[str, Any], Any]) -> str:
         """Instance wrapper around the module-level cleaner."""
         return _extract_clean_content(message)
-    async def _broadcast_to_websockets(self, event_data: Dict[str, Any], target_chat_id: Optional[str] = None) -> None:
+
+    def _mark_as_trace(self, data_payload: Dict[str, Any], *, agent: str) -> None:
+        """Downgrade a text payload from a non-visual agent to a sanitized trace entry."""
+        original_content = data_payload.get("content")
+        if isinstance(original_content, str):
+            sanitized, redacted, truncated = self._sanitize_trace_content(original_content)
+            data_payload["content"] = sanitized
+            data_payload["trace_original_len"] = len(original_content)
+            data_payload["trace_redacted"] = redacted
+            data_payload["trace_truncated"] = truncated
+        data_payload["ui_visibility"] = "trace"
+        data_payload["trace_reason"] = "visual_agents_gate"
+        data_payload["trace_agent"] = agent
+
+    def _build_replay_batch_envelope(self, event: Dict[str, Any], chat_id: Optional[str]) -> Dict[str, Any]:
+        """Build one ``chat.replay_batch`` envelope from a resumer ``replay_batch`` event.
+
+        Each message gets the same treatment a replayed ``chat.text`` would (event
+        policy suppression, visual_agents trace downgrade), but visibility is
+        resolved once per agent and no per-message envelope or trace is emitted.
+        """
+        from mozaiksai.core.events.unified_event_dispatcher import get_event_dispatcher  # local import to avoid cycle
+
+        dispatcher = get_event_dispatcher()
+        workflow_name = self.connections.get(chat_id, {}).get("workflow_name") if chat_id else None
+        visibility: Dict[str, bool] = {}
+        raw_messages = event.get("messages") or []
+        messages: List[Dict[str, Any]] = []
+        for item in raw_messages:
+            if not isinstance(item, dict):
+                continue
+            if workflow_name and dispatcher.apply_text_event_policy(item, workflow_name):
+                continue
+            agent_name = item.get("agent") or item.get("agent_name")
+            if agent_name:
+                if agent_name not in visibility:
+                    visibility[agent_name] = self.should_show_to_user(agent_name, chat_id)
+                if not visibility[agent_name]:
+                    self._mark_as_trace(item, agent=str(agent_name))
+            messages.append(item)
+
+        data = {k: v for k, v in event.items() if k not in ("kind", "messages")}
+        data["messages"] = messages
+        data["suppressed"] = len(raw_messages) - len(messages)
+        return {
+            "type": "chat.replay_batch",
+            "data": data,
+            "chat_id": chat_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+    async def _broadcast_to_websockets(
+        self, event_data: Dict[str, Any], target_chat_id: Optional[str] = None, *, route: bool = True
+    ) -> None:
         """Broadcast event data to relevant WebSocket connections."""
         active_connections = list(self.connections.items())
         
@@ -644,6 +846,12 @@ class SimpleTransport:
                 # H1: Use message queuing with backpressure control
                 await self._queue_message_with_backpressure(target_chat_id, event_data)
                 await self._flush_message_queue(target_chat_id)
+            elif route and await self._route_to_owner(
+                f"socket:{target_chat_id}",
+                {"op": "envelope", "chat_id": target_chat_id, "envelope": event_data},
+            ):
+                # Socket lives on another node; it queues the envelope there.
+                return
             else:
                 # H4: Buffer message until the websocket connects
                 buf = self._pre_connection_buffers.setdefault(target_chat_id, [])
@@ -944,6 +1152,10 @@ class SimpleTransport:
             if not app_id:
                 raise RuntimeError("Missing app_id for resume")
 
+            # Short reconnects: the missed envelopes are usually still buffered.
+            if await self._resume_from_memory(chat_id, int(last_client_index)):
+                return
+
             # Use the AG2-aligned resumer so visibility filtering and UI tool replay
             # semantics stay consistent with live events (no leaking hidden agents).
             from mozaiksai.core.transport.resume_groupchat import GroupChatResumer
@@ -962,6 +1174,10 @@ class SimpleTransport:
                 existing_seq = self._sequence_counters.get(chat_id, 0)
                 if existing_seq < last_idx_sent + 1:
                     self._sequence_counters[chat_id] = last_idx_sent + 1
+            # The persisted total tells us where the next live message lands in the transcript.
+            total_messages = summary.get("total_messages") if isinstance(summary, dict) else None
+            if isinstance(total_messages, int):
+                self._replay_next_index[chat_id] = total_messages
 
             logger.info(
                 "✅ Resume complete chat=%s replayed=%s missing_from>%s now_at_index=%s total=%s",
@@ -975,6 +1191,109 @@ class SimpleTransport:
             logger.error(f"❌ Resume failed chat={chat_id}: {e}")
             raise
 
+    def _record_replay(self, chat_id: str, envelope: Dict[str, Any], *, hidden: bool = False) -> None:
+        """Buffer a live chat.text under its transcript sequence (persisted index + 1).
+
+        Every live text message is persisted once, in send order, so positions are
+        counted forward from the last known index: a user message's ``index`` (its
+        persisted position) or a persisted resume's total. Until one is known nothing
+        is buffered. Hidden and filtered messages are persisted but not sent; they only
+        take a slot (see ``reserve_replay_slot`` for persisted messages with no envelope).
+        """
+        if envelope.get("type") != "chat.text":
+            return
+        data = envelope.get("data")
+        if not isinstance(data, dict) or data.get("replay"):
+            return
+        index = data.get("index")
+        index = index if isinstance(index, int) else None
+        self._buffer_replay(chat_id, index, None if hidden else envelope)
+
+    def reserve_replay_slot(self, chat_id: str, *, index: Optional[int] = None) -> None:
+        """Take the transcript position of a message persisted without a live chat.text.
+
+        ``index`` is the persisted position when the caller knows it; otherwise the
+        next counted position is used.
+        """
+        self._buffer_replay(chat_id, index, None)
+
+    def _buffer_replay(self, chat_id: str, index: Optional[int], envelope: Optional[Dict[str, Any]]) -> None:
+        if index is None:
+            index = self._replay_next_index.get(chat_id)
+            if index is None:
+                return
+        self._replay_next_index[chat_id] = index + 1
+        recorded = None if envelope is None else {**envelope, "data": {**envelope["data"], "index": index}}
+        self._replay_buffer.record(chat_id, index + 1, recorded)
+
+    async def _resume_from_memory(self, chat_id: str, last_client_index: int) -> bool:
+        """Serve a resume from the replay buffer; False when its window does not cover the cursor.
+
+        Buffered envelopes are keyed by transcript sequence, so message index ``i``
+        is sequence ``i + 1`` exactly as in the persisted transcript.
+        """
+        after_seq = last_client_index + 1
+        envelopes = self._replay_buffer.since(chat_id, after_seq)
+        if envelopes is None:
+            return False
+        for envelope in envelopes:
+            data = envelope.get("data")
+            replayed = {**envelope, "data": {**data, "replay": True}} if isinstance(data, dict) else envelope
+            await self._queue_message_with_backpressure(chat_id, replayed)
+        last_index = (self._replay_buffer.newest(chat_id) or after_seq) - 1
+        now = datetime.now(timezone.utc).isoformat()
+        await self._queue_message_with_backpressure(chat_id, {
+            "type": "chat.resume_boundary",
+            "data": {
+                "kind": "resume_boundary",
+                "chat_id": chat_id,
+                "replayed_messages": len(envelopes),
+                "last_message_index": last_index,
+                "resume_mode": "memory",
+                "resume_context": {"reason": "client_resume", "last_client_index": last_client_index},
+                "timestamp": now,
+            },
+            "timestamp": now,
+        })
+        await self._flush_message_queue(chat_id)
+        logger.info(
+            "✅ Resume served from memory chat=%s replayed=%s missing_from>%s now_at_index=%s",
+            chat_id, len(envelopes), last_client_index, last_index,
+        )
+        return True
+
+    def get_replay_buffer_stats(self) -> Dict[str, Any]:
+        """Replay buffer occupancy and memory-resume hit/miss counters."""
+        return self._replay_buffer.snapshot()
+
+    async def _handle_replay_page_request(self, chat_id: str, before_index: Any, limit: Any = None) -> None:
+        """Send the page of persisted history before ``before_index`` as one chat.replay_batch."""
+        if not isinstance(before_index, int):
+            raise ValueError("beforeIndex must be int")
+        conn_meta = self.connections.get(chat_id) or {}
+        app_id = conn_meta.get('app_id')
+        if not app_id:
+            raise RuntimeError("Missing app_id for replay page")
+        startup_mode = None
+        workflow_name = conn_meta.get("workflow_name")
+        if workflow_name:
+            try:
+                startup_mode = workflow_manager.get_config(workflow_name).get("startup_mode", "AgentDriven")
+            except Exception:
+                startup_mode = None
+
+        from mozaiksai.core.transport.resume_groupchat import GroupChatResumer
+
+        summary = await GroupChatResumer().handle_replay_page_request(
+            chat_id=str(chat_id),
+            app_id=str(app_id),
+            before_index=before_index,
+            limit=limit if isinstance(limit, int) and limit > 0 else None,
+            send_event=self.send_event_to_ui,
+            startup_mode=startup_mode,
+        )
+        logger.debug("Replay page sent chat=%s before=%s summary=%s", chat_id, before_index, summary)
+
     def _validate_inbound_message(self, message_data: dict) -> bool:
         """H3: Validate inbound WebSocket message schema"""
         if not isinstance(message_data, dict):
@@ -1001,6 +1320,15 @@ class SimpleTransport:
         elif msg_type == "client.resume":
             # Canonical resume field: lastClientIndex (0-based index of last message the client has)
             return all(field in message_data for field in ["chat_id", "lastClientIndex"]) and isinstance(message_data.get("lastClientIndex"), int)
+
+        elif msg_type == "client.replay_page":
+            # Older-history paging: beforeIndex is the first index the client already has
+            limit = message_data.get("limit")
+            return (
+                "chat_id" in message_data
+                and isinstance(message_data.get("beforeIndex"), int)
+                and (limit is None or isinstance(limit, int))
+            )
         
         elif msg_type in (
             "chat.enter_general_mode",
@@ -1062,14 +1390,17 @@ class SimpleTransport:
             "app_id": app_id,
             "active": True,
             "ws_id": ws_id,  # Track WebSocket ID for session switching
+            "last_activity": time.monotonic(),
         }
+        await self._backplane_claim(f"socket:{chat_id}")
         logger.info(f"🔌 WebSocket connected for chat_id: {chat_id} (ws_id={ws_id})")
         
         # H2: Start heartbeat for connection
         await self._start_heartbeat(chat_id, websocket)
         
-        # H1: Initialize message queue for backpressure control
-        self._message_queues[chat_id] = []
+        # H1: Initialize message queue for backpressure control and its writer task
+        self._message_queues[chat_id] = OutboundQueue(self._max_queue_size)
+        self._start_writer(chat_id, websocket)
 
         # H4: Flush any pre-connection buffered messages (if orchestration
         # started emitting before the UI finished the handshake)
@@ -1092,6 +1423,9 @@ class SimpleTransport:
                 except Exception as recv_err:
                     # Client disconnected
                     raise recv_err
+                conn_meta = self.connections.get(chat_id)
+                if conn_meta is not None:
+                    conn_meta["last_activity"] = time.monotonic()
                 if not msg:
                     await asyncio.sleep(0.05)
                     continue
@@ -1623,6 +1957,17 @@ class SimpleTransport:
                             "timestamp": datetime.now(timezone.utc).isoformat()
                         })
                     continue
+                if mtype == "client.replay_page":
+                    try:
+                        await self._handle_replay_page_request(chat_id, data.get("beforeIndex"), data.get("limit"))
+                    except Exception as pe:
+                        logger.error(f"❌ Failed to process client.replay_page for chat {chat_id}: {pe}")
+                        await websocket.send_json({
+                            "type": "chat.error",
+                            "data": {"message": f"Replay page failed: {str(pe)}", "error_code": "REPLAY_PAGE_FAILED"},
+                            "timestamp": datetime.now(timezone.utc).isoformat()
+                        })
+                    continue
                 # Unknown control message -> ignore silently
         except Exception as e:
             logger.warning(f"WebSocket error for chat {chat_id}: {e}")
@@ -2402,23 +2747,27 @@ class SimpleTransport:
             instance.pending_ui_tool_responses[event_id] = asyncio.Future()
 
         fut = instance.pending_ui_tool_responses[event_id]
+        await instance._backplane_claim(f"ui_tool:{event_id}")
+        timer = instance._timers.call_later(timeout, _expire_ui_tool_future, fut) if timeout else None
         try:
-            response_data = await asyncio.wait_for(fut, timeout=timeout) if timeout else await fut
+            response_data = await fut
             return response_data
         except asyncio.TimeoutError:
-            if not fut.done():
-                fut.set_exception(asyncio.TimeoutError("UI tool response timed out"))
             logger.error(f"⏰ UI tool response timed out for event {event_id}")
             raise
         finally:
+            if timer is not None:
+                timer.cancel()
             instance.pending_ui_tool_responses.pop(event_id, None)
+            await instance._backplane_release(f"ui_tool:{event_id}")
 
-    async def submit_ui_tool_response(self, event_id: str, response_data: Dict[str, Any]) -> bool:
+    async def submit_ui_tool_response(self, event_id: str, response_data: Dict[str, Any], *, route: bool = True) -> bool:
         """
         Submit response data for a pending UI tool event.
         
         This method is called by an API endpoint when the frontend submits data
-        from an interactive UI component.
+        from an interactive UI component. Responses for events awaited on another
+        node are forwarded there.
         """
         if event_id in self.pending_ui_tool_responses:
             future = self.pending_ui_tool_responses[event_id]
@@ -2460,6 +2809,12 @@ class SimpleTransport:
                 logger.warning(f"⚠️ [UI_TOOL] Event {event_id} already completed")
                 return False
         else:
+            if route and await self._route_to_owner(
+                f"ui_tool:{event_id}",
+                {"op": "ui_tool_response", "event_id": event_id, "response_data": response_data},
+            ):
+                logger.info(f"📡 [UI_TOOL] Forwarded response for {event_id} to owning node")
+                return True
             logger.warning(f"⚠️ [UI_TOOL] No pending event found for {event_id}")
             return False
 
@@ -2485,26 +2840,14 @@ class SimpleTransport:
         return self._sequence_counters[chat_id]
     
     # H1: Server backpressure implementation
-    async def _check_backpressure(self, chat_id: str) -> bool:
-        """Check if connection should be throttled due to backpressure."""
-        if chat_id not in self._message_queues:
-            self._message_queues[chat_id] = []
-        
-        queue_size = len(self._message_queues[chat_id])
-        if queue_size >= self._max_queue_size:
-            logger.warning(f"🚨 Backpressure triggered for {chat_id}: queue size {queue_size}")
-            # Drop oldest messages to make room
-            dropped = queue_size - self._max_queue_size + 10  # Keep some buffer
-            self._message_queues[chat_id] = self._message_queues[chat_id][dropped:]
-            logger.info(f"📉 Dropped {dropped} queued messages for {chat_id}")
-            return True
-        return False
+    def _get_outbound_queue(self, chat_id: str) -> OutboundQueue:
+        queue = self._message_queues.get(chat_id)
+        if queue is None:
+            queue = self._message_queues[chat_id] = OutboundQueue(self._max_queue_size)
+        return queue
 
     async def _queue_message_with_backpressure(self, chat_id: str, message_data: Dict[str, Any]) -> bool:
-        """Queue message with backpressure control."""
-        if await self._check_backpressure(chat_id):
-            # Connection is under backpressure - message may have been dropped
-            pass
+        """Queue message with backpressure control (bounded, coalescing; see OutboundQueue)."""
         # Early serialization guard: ensure no raw AG2 objects linger in queue.
         if not isinstance(message_data, (dict, list, tuple, str, int, float, bool, type(None))):
             try:
@@ -2512,119 +2855,203 @@ class SimpleTransport:
             except Exception:
                 message_data = {"type": "log", "data": {"message": self._stringify_unknown(message_data)}}
 
-        self._message_queues[chat_id].append(message_data)
+        queue = self._get_outbound_queue(chat_id)
+        dropped_before = sum(queue.dropped.values())
+        queue.push(message_data)
+        if sum(queue.dropped.values()) != dropped_before:
+            _trace.count("queue_dropped")
+            logger.warning("🚨 Backpressure: dropped oldest queued message for %s (queue size %s)", chat_id, len(queue))
+        self._check_slow_consumer(chat_id, queue)
         return True
 
-    async def _flush_message_queue(self, chat_id: str) -> None:
-        """Flush queued messages for a connection."""
-        if chat_id not in self._message_queues or not self._message_queues[chat_id]:
+    def get_outbound_queue_stats(self) -> Dict[str, Any]:
+        """Per-connection outbound queue depth, coalesce/drop counters and slow-consumer flag."""
+        stats: Dict[str, Any] = {}
+        for chat_id, queue in self._message_queues.items():
+            conn = self.connections.get(chat_id) or {}
+            stats[chat_id] = {**queue.snapshot(), "slow_consumer": bool(conn.get("slow_consumer"))}
+        return stats
+
+    def _check_slow_consumer(self, chat_id: str, queue: OutboundQueue) -> None:
+        conn = self.connections.get(chat_id)
+        if not conn:
+            return
+        depth = len(queue)
+        if not self._queue_high_water:
             return
+        if depth >= self._queue_high_water:
+            if not conn.get("slow_consumer"):
+                conn["slow_consumer"] = True
+                conn["slow_since"] = time.monotonic()
+                _trace.count("slow_consumer_flagged")
+                logger.warning(
+                    "🐢 Slow consumer %s: outbound queue depth %s >= high-water %s",
+                    chat_id, depth, self._queue_high_water,
+                )
+            elif (
+                self._slow_consumer_disconnect_sec
+                and not conn.get("closing")
+                and time.monotonic() - conn["slow_since"] >= self._slow_consumer_disconnect_sec
+            ):
+                conn["closing"] = True
+                _trace.count("slow_consumer_disconnected")
+                logger.warning("🐢 Disconnecting slow consumer %s after %ss above high-water", chat_id, self._slow_consumer_disconnect_sec)
+                asyncio.create_task(self._close_slow_consumer(conn.get("websocket")))
+        elif conn.get("slow_consumer") and depth <= self._queue_high_water // 2:
+            conn["slow_consumer"] = False
+            conn.pop("slow_since", None)
+            logger.info("🐇 Consumer %s caught up (queue depth %s)", chat_id, depth)
+
+    async def _close_slow_consumer(self, websocket: Any) -> None:
+        # 1013 = try again later; the receive loop then exits and cleans up the connection.
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            logger.debug("Slow consumer close failed", exc_info=True)
+
+    async def _flush_message_queue(self, chat_id: str) -> None:
+        """Wake the connection's writer task; producers never await websocket sends."""
+        wake = self._writer_wakeups.get(chat_id)
+        if wake is not None:
+            wake.set()
+
+    def _start_writer(self, chat_id: str, websocket: Any) -> None:
+        existing = self._writer_tasks.pop(chat_id, None)
+        if existing is not None:
+            existing.cancel()
+        wake = asyncio.Event()
+        self._writer_wakeups[chat_id] = wake
+        self._writer_tasks[chat_id] = asyncio.create_task(
+            self._writer_loop(chat_id, websocket, wake), name=f"ws_writer:{chat_id}"
+        )
+
+    async def _writer_loop(self, chat_id: str, websocket: Any, wake: asyncio.Event) -> None:
+        """Sole sender of queued envelopes for one connection, in queue order."""
+        try:
+            while True:
+                await wake.wait()
+                wake.clear()
+                if not await self._drain_outbound_queue(chat_id, websocket):
+                    # Send failed; the message is back at the head. Retry after a short backoff.
+                    retry = asyncio.Event()
+                    self._timers.call_later(self._writer_retry_delay, retry.set)
+                    await retry.wait()
+                    wake.set()
+        except asyncio.CancelledError:
+            pass
+
+    async def _drain_outbound_queue(self, chat_id: str, websocket: Any) -> bool:
+        queue = self._message_queues.get(chat_id)
+        if not queue:
+            return True
         
-        logger.info(f"🔄 [TRANSPORT] Flushing message queue for chat_id={chat_id}, queue_size={len(self._message_queues[chat_id])}")
+        _trace.count("queue_flushes")
+        if _trace.sampled():
+            _trace.emit("flush", chat_id=chat_id, queue_size=len(queue))
         
-        if chat_id in self.connections:
-            websocket = self.connections[chat_id]["websocket"]
-            messages_to_send = self._message_queues[chat_id].copy()
-            self._message_queues[chat_id].clear()
-            
-            for message in messages_to_send:
-                try:
-                    # Check if message is already in proper format for WebSocket
-                    if isinstance(message, dict) and 'type' in message and 'data' in message:
-                        # Ensure the 'data' payload is JSON-serializable (may contain AG2 objects)
-                        try:
-                            safe_message = message.copy()
-                            safe_message['data'] = self._serialize_ag2_events(message['data'])
-                            
-                            # Extract agent name from data payload and add to top-level envelope for frontend attribution
-                            if isinstance(safe_message.get('data'), dict):
-                                agent_from_data = safe_message['data'].get('agent') or safe_message['data'].get('sender')
-                                if agent_from_data and isinstance(agent_from_data, str):
-                                    safe_message['agent'] = agent_from_data
-                                elif 'agent' not in safe_message:
-                                    # Fallback to generic if no agent in data
-                                    safe_message['agent'] = 'Agent'
-                            
-                            if safe_message.get('type') == 'chat.tool_call':
-                                payload_obj = safe_message.get('data', {}).get('payload', {})
-                                payload_keys = list(payload_obj.keys()) if isinstance(payload_obj, dict) else []
-                                logger.info('TRANSPORT payload keys before send: %s', payload_keys[:12])
-                            await websocket.send_json(safe_message)
-                            logger.info(f"✅ [TRANSPORT] WebSocket send_json completed for envelope type={safe_message.get('type')}, chat_id={chat_id}")
-                        except Exception:
-                            # Fallback: attempt to serialize whole message as a last resort
-                            try:
-                                await websocket.send_json(self._serialize_ag2_events(message))
-                            except Exception:
-                                raise
-                    else:
-                        serialized_message = self._serialize_ag2_events(message)
-                        await websocket.send_json(serialized_message)
-                except Exception as e:
-                    logger.error(f"Failed to send queued message to {chat_id}: {e}. Will retry shortly.")
-                    # Re-queue remaining (including current) for retry
-                    remaining = [message] + messages_to_send[messages_to_send.index(message)+1:]
-                    self._message_queues[chat_id] = remaining + self._message_queues[chat_id]
-                    # Schedule a retry flush with small backoff
-                    self._schedule_flush_retry(chat_id)
-                    break
+        while queue:
+            message = queue.pop()
+            try:
+                await self._send_queued_message(websocket, message)
+            except Exception as e:
+                logger.error(f"Failed to send queued message to {chat_id}: {e}. Will retry shortly.")
+                queue.push_front(message)
+                return False
+        self._check_slow_consumer(chat_id, queue)
+        return True
 
-    def _schedule_flush_retry(self, chat_id: str, delay: float = 0.5) -> None:
-        """Schedule a single retry flush if not already pending."""
-        if chat_id in self._scheduled_flush_tasks and not self._scheduled_flush_tasks[chat_id].done():
-            return  # already scheduled
-        async def _delayed():
+    async def _send_queued_message(self, websocket: Any, message: Any) -> None:
+        # Check if message is already in proper format for WebSocket
+        if isinstance(message, dict) and 'type' in message and 'data' in message:
+            # Ensure the 'data' payload is JSON-serializable (may contain AG2 objects)
             try:
-                await asyncio.sleep(delay)
-                await self._flush_message_queue(chat_id)
-            finally:
-                # Clear handle so future retries can be scheduled
-                self._scheduled_flush_tasks.pop(chat_id, None)
-        self._scheduled_flush_tasks[chat_id] = asyncio.create_task(_delayed())
+                safe_message = message.copy()
+                safe_message['data'] = self._serialize_ag2_events(message['data'])
+                
+                # Extract agent name from data payload and add to top-level envelope for frontend attribution
+                if isinstance(safe_message.get('data'), dict):
+                    agent_from_data = safe_message['data'].get('agent') or safe_message['data'].get('sender')
+                    if agent_from_data and isinstance(agent_from_data, str):
+                        safe_message['agent'] = agent_from_data
+                    elif 'agent' not in safe_message:
+                        # Fallback to generic if no agent in data
+                        safe_message['agent'] = 'Agent'
+                
+                if safe_message.get('type') == 'chat.tool_call' and logger.isEnabledFor(logging.DEBUG):
+                    payload_obj = safe_message.get('data', {}).get('payload', {})
+                    payload_keys = list(payload_obj.keys()) if isinstance(payload_obj, dict) else []
+                    logger.debug('TRANSPORT payload keys before send: %s', payload_keys[:12])
+                await websocket.send_json(safe_message)
+                _trace.count("ws_messages_sent")
+            except Exception:
+                # Fallback: attempt to serialize whole message as a last resort
+                await websocket.send_json(self._serialize_ag2_events(message))
+        else:
+            serialized_message = self._serialize_ag2_events(message)
+            await websocket.send_json(serialized_message)
 
-    # H2: Heartbeat implementation
+    # H2: Heartbeat implementation (timer wheel entries, not per-connection tasks)
     async def _start_heartbeat(self, chat_id: str, websocket) -> None:
-        """Start heartbeat task for a connection."""
-        if chat_id in self._heartbeat_tasks:
-            self._heartbeat_tasks[chat_id].cancel()
-        
-        self._heartbeat_tasks[chat_id] = asyncio.create_task(
-            self._heartbeat_loop(chat_id, websocket)
-        )
+        """Schedule the first heartbeat for a connection."""
+        existing = self._heartbeat_timers.pop(chat_id, None)
+        if existing is not None:
+            existing.cancel()
+        self._schedule_heartbeat(chat_id, websocket)
         logger.info(f"💓 Started heartbeat for {chat_id}")
 
-    async def _heartbeat_loop(self, chat_id: str, websocket) -> None:
-        """Heartbeat loop for detecting silent disconnects."""
+    def _schedule_heartbeat(self, chat_id: str, websocket) -> None:
+        self._heartbeat_timers[chat_id] = self._timers.call_later(
+            self._heartbeat_interval, self._heartbeat_due, chat_id, websocket
+        )
+
+    def _heartbeat_due(self, chat_id: str, websocket):
+        """Timer callback: idle check, re-arm, and return the ping coroutine to run."""
+        conn = self.connections.get(chat_id)
+        if not conn or conn.get("websocket") is not websocket:
+            self._heartbeat_timers.pop(chat_id, None)
+            return None
+        idle_for = time.monotonic() - conn.get("last_activity", time.monotonic())
+        if self._idle_timeout_sec and idle_for >= self._idle_timeout_sec and not conn.get("closing"):
+            conn["closing"] = True
+            self._heartbeat_timers.pop(chat_id, None)
+            _trace.count("idle_disconnected")
+            logger.info(f"💤 Closing idle connection {chat_id} (no client messages for {idle_for:.0f}s)")
+            return self._close_idle_connection(websocket)
+        self._schedule_heartbeat(chat_id, websocket)
+        return self._send_heartbeat_ping(chat_id, websocket)
+
+    async def _send_heartbeat_ping(self, chat_id: str, websocket) -> None:
+        """Send one ping; a failed send means a silent disconnect."""
+        ping_data = {
+            "type": "ping",
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
         try:
-            while chat_id in self.connections:
-                await asyncio.sleep(self._heartbeat_interval)
-                
-                # Send ping
-                ping_data = {
-                    "type": "ping",
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                }
-                
-                try:
-                    await websocket.send_json(ping_data)
-                    logger.debug(f"📡 Sent ping to {chat_id}")
-                except Exception as e:
-                    logger.warning(f"💔 Heartbeat failed for {chat_id}: {e}")
-                    # Connection is dead - clean up
-                    await self._cleanup_connection(chat_id)
-                    break
-        except asyncio.CancelledError:
-            logger.debug(f"💔 Heartbeat cancelled for {chat_id}")
+            await websocket.send_json(ping_data)
+            logger.debug(f"📡 Sent ping to {chat_id}")
         except Exception as e:
-            logger.error(f"💔 Heartbeat error for {chat_id}: {e}")
+            logger.warning(f"💔 Heartbeat failed for {chat_id}: {e}")
+            # Connection is dead - clean up
+            await self._cleanup_connection(chat_id)
+
+    async def _close_idle_connection(self, websocket: Any) -> None:
+        # 1001 = going away; the receive loop then exits and cleans up the connection.
+        try:
+            await websocket.close(code=1001)
+        except Exception:
+            logger.debug("Idle connection close failed", exc_info=True)
 
     async def _stop_heartbeat(self, chat_id: str) -> None:
-        """Stop heartbeat task for a connection."""
-        if chat_id in self._heartbeat_tasks:
-            self._heartbeat_tasks[chat_id].cancel()
-            del self._heartbeat_tasks[chat_id]
+        """Cancel the pending heartbeat for a connection."""
+        timer = self._heartbeat_timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
             logger.debug(f"💔 Stopped heartbeat for {chat_id}")
 
+    def get_timer_stats(self) -> Dict[str, Any]:
+        """Pending/fired counts of the shared transport timer wheel."""
+        return {**self._timers.snapshot(), "heartbeats": len(self._heartbeat_timers)}
+
     async def _auto_resume_if_needed(self, chat_id: str, websocket, app_id: Optional[str]) -> None:
         """Automatically restore chat history for IN_PROGRESS chats on WebSocket connection."""
         try:
@@ -2670,6 +3097,10 @@ class SimpleTransport:
                             "metadata": event_dict.get("metadata"),
                         }
                     })
+                elif kind == "replay_batch":
+                    await self._queue_message_with_backpressure(
+                        chat_id, self._build_replay_batch_envelope(event_dict, chat_id)
+                    )
                 elif kind == "resume_boundary":
                     # Convert boundary to transport format
                     await self._queue_message_with_backpressure(chat_id, {
@@ -2694,10 +3125,16 @@ class SimpleTransport:
         """Clean up connection resources."""
         if chat_id in self.connections:
             del self.connections[chat_id]
+            await self._backplane_release(f"socket:{chat_id}")
 
         if chat_id in self._message_queues:
             del self._message_queues[chat_id]
 
+        writer = self._writer_tasks.pop(chat_id, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        self._writer_wakeups.pop(chat_id, None)
+
         await self._stop_heartbeat(chat_id)
         logger.info(f"🧹 Cleaned up connection resources for {chat_id}")
     
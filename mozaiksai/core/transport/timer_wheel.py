@@ -0,0 +1,234 @@
+# ==============================================================================
+# FILE: timer_wheel.py
+# DESCRIPTION: Shared hierarchical timer wheel for transport timers
+# ==============================================================================
+
+# === MOZAIKS-CORE-HEADER ===
+
+"""One scheduler for every per-connection transport timer.
+
+Heartbeats, idle detection, writer retry backoff and UI tool timeouts used to
+each own a sleeping task (or a ``wait_for`` timer handle), so timer cost grew
+with the number of connections. They are now entries in a single hierarchical
+timer wheel driven by one task:
+
+- Level 0 has ``slots`` buckets of one ``tick`` each; level ``n`` buckets span
+  ``slots ** n`` ticks. A timer goes into the lowest level whose range covers
+  its delay and cascades down as the wheel turns, so insert and cancel are O(1)
+  and each tick only touches the due bucket.
+- Resolution is one tick (``MOZAIKS_TIMER_WHEEL_TICK_MS``, default 100ms): a
+  timer never fires early and fires at most about one tick late.
+- Callbacks run on the driver task and must be quick; a callback that returns a
+  coroutine has it scheduled as a task (e.g. a websocket ping), which the wheel
+  keeps referenced until it finishes.
+- The driver parks on an event while no timers are pending.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+import time
+from typing import Any, Callable, List, Optional, Set
+
+from logs.logging_config import get_core_logger
+
+logger = get_core_logger("transport.timer_wheel")
+
+
+class TimerHandle:
+    """Scheduled callback; ``cancel()`` is O(1) and idempotent."""
+
+    __slots__ = ("deadline_tick", "callback", "args", "cancelled", "_bucket", "_wheel")
+
+    def __init__(self, wheel: "TimerWheel", deadline_tick: int, callback: Callable[..., Any], args: tuple) -> None:
+        self.deadline_tick = deadline_tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._bucket: Optional[Set["TimerHandle"]] = None
+        self._wheel = wheel
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self._bucket is not None:
+            self._bucket.discard(self)
+            self._bucket = None
+            self._wheel._pending -= 1
+
+
+class TimerWheel:
+    """Hierarchical timing wheel with a single asyncio driver task."""
+
+    def __init__(
+        self,
+        tick_sec: float = 0.1,
+        slots: int = 64,
+        levels: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.tick_sec = max(0.001, float(tick_sec))
+        self.slots = max(2, int(slots))
+        self.levels = max(1, int(levels))
+        self._clock = clock
+        self._origin = clock()
+        self._current_tick = 0
+        self._wheels: List[List[Set[TimerHandle]]] = [
+            [set() for _ in range(self.slots)] for _ in range(self.levels)
+        ]
+        self._pending = 0
+        self._driver: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # Tasks spawned by coroutine callbacks; held so they are not garbage collected mid-run.
+        self._callback_tasks: Set[asyncio.Future] = set()
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> TimerHandle:
+        """Run ``callback(*args)`` after at least ``delay`` seconds."""
+        now_tick = self._tick_at(self._clock())
+        if self._pending == 0:
+            # Empty wheel: jump to now instead of replaying idle ticks.
+            self._current_tick = max(self._current_tick, now_tick)
+        # Round up so a timer never fires early relative to the wall clock.
+        ticks = max(1, -int(-max(0.0, delay) // self.tick_sec))
+        handle = TimerHandle(self, max(now_tick, self._current_tick) + ticks, callback, args)
+        self._insert(handle)
+        self._pending += 1
+        self._ensure_driver()
+        return handle
+
+    def _insert(self, handle: TimerHandle) -> None:
+        remaining = handle.deadline_tick - self._current_tick
+        level = 0
+        span = self.slots
+        while level < self.levels - 1 and remaining >= span:
+            level += 1
+            span *= self.slots
+        # Beyond the top level's range: park in the furthest bucket and re-cascade.
+        slot_tick = min(handle.deadline_tick, self._current_tick + span - 1)
+        bucket = self._wheels[level][(slot_tick // (span // self.slots)) % self.slots]
+        bucket.add(handle)
+        handle._bucket = bucket
+
+    # ------------------------------------------------------------------
+    # Turning the wheel
+    # ------------------------------------------------------------------
+    def _tick_at(self, now: float) -> int:
+        return int((now - self._origin) / self.tick_sec)
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Process every tick up to ``now`` (default: the clock). Returns timers fired."""
+        target = self._tick_at(self._clock() if now is None else now)
+        fired = 0
+        while self._current_tick < target:
+            self._current_tick += 1
+            tick = self._current_tick
+            # Cascade higher levels whose bucket boundary was just crossed.
+            span = 1
+            for level in range(1, self.levels):
+                span *= self.slots
+                if tick % span:
+                    break
+                bucket = self._wheels[level][(tick // span) % self.slots]
+                moved = list(bucket)
+                bucket.clear()
+                for handle in moved:
+                    handle._bucket = None
+                    self._insert(handle)
+            due = self._wheels[0][tick % self.slots]
+            if not due:
+                continue
+            ready = [h for h in due if h.deadline_tick <= tick]
+            for handle in ready:
+                due.discard(handle)
+                handle._bucket = None
+            for handle in sorted(ready, key=lambda h: h.deadline_tick):
+                fired += self._fire(handle)
+        return fired
+
+    def _fire(self, handle: TimerHandle) -> int:
+        self._pending -= 1
+        if handle.cancelled:
+            return 0  # cancelled by an earlier callback in the same tick
+        handle.cancelled = True
+        self.fired += 1
+        try:
+            result = handle.callback(*handle.args)
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                self._callback_tasks.add(task)
+                task.add_done_callback(self._on_callback_done)
+        except Exception as e:
+            logger.error(f"Timer callback {getattr(handle.callback, '__name__', handle.callback)} failed: {e}", exc_info=True)
+        return 1
+
+    def _on_callback_done(self, task: asyncio.Future) -> None:
+        self._callback_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Timer callback task failed: {task.exception()}", exc_info=task.exception())
+
+    # ------------------------------------------------------------------
+    # Driver task
+    # ------------------------------------------------------------------
+    def _ensure_driver(self) -> None:
+        if self._driver is not None and not self._driver.done():
+            if self._wakeup is not None:
+                self._wakeup.set()
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet; timers are processed once a loop schedules one
+        self._wakeup = asyncio.Event()
+        self._driver = loop.create_task(self._run(), name="transport_timer_wheel")
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        try:
+            while True:
+                if self._pending == 0:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                next_at = self._origin + (self._current_tick + 1) * self.tick_sec
+                await asyncio.sleep(max(0.0, next_at - self._clock()))
+                self.advance()
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self) -> None:
+        if self._driver is not None:
+            self._driver.cancel()
+            self._driver = None
+
+    def snapshot(self) -> dict:
+        return {
+            "pending": self._pending,
+            "fired": self.fired,
+            "running_callbacks": len(self._callback_tasks),
+            "tick_ms": round(self.tick_sec * 1000, 3),
+        }
+
+
+_timer_wheel: Optional[TimerWheel] = None
+
+
+def get_timer_wheel() -> TimerWheel:
+    """Process-wide wheel shared by every transport component."""
+    global _timer_wheel
+    if _timer_wheel is None:
+        try:
+            tick_ms = float(os.getenv("MOZAIKS_TIMER_WHEEL_TICK_MS", "100"))
+        except ValueError:
+            tick_ms = 100.0
+        _timer_wheel = TimerWheel(tick_sec=max(1.0, tick_ms) / 1000.0)
+    return _timer_wheel
+
+
+__all__ = ["TimerHandle", "TimerWheel", "get_timer_wheel"]
@@ -12,6 +12,7 @@ from datetime import datetime, timezone
 from typing import Any, Callable, Dict, List, Optional
 
 from logs.logging_config import get_core_logger
+from mozaiksai.core.transport.timer_wheel import TimerHandle, get_timer_wheel
 
 
 class WebSocketSessionManager:
@@ -30,8 +31,10 @@ class WebSocketSessionManager:
         self._stringify_unknown = stringify_unknown
         self.connections: Dict[str, Dict[str, Any]] = {}
         self._message_queues: Dict[str, List[Any]] = {}
-        self._heartbeat_tasks: Dict[str, asyncio.Task] = {}
-        self._scheduled_flush_tasks: Dict[str, asyncio.Task] = {}
+        # Heartbeats and flush retries are entries on the shared transport timer wheel.
+        self._timers = get_timer_wheel()
+        self._heartbeat_timers: Dict[str, TimerHandle] = {}
+        self._scheduled_flush_timers: Dict[str, TimerHandle] = {}
         self._pre_connection_buffers: Dict[str, List[Any]] = {}
         self._max_queue_size = max_queue_size
         self._heartbeat_interval = heartbeat_interval
@@ -70,9 +73,9 @@ class WebSocketSessionManager:
         self._message_queues.pop(chat_id, None)
         self._pre_connection_buffers.pop(chat_id, None)
 
-        task = self._scheduled_flush_tasks.pop(chat_id, None)
-        if task and not task.done():
-            task.cancel()
+        timer = self._scheduled_flush_timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
 
         await self.stop_heartbeat(chat_id)
         self.logger.info("Cleaned up WebSocket resources for %s", chat_id)
@@ -178,60 +181,54 @@ class WebSocketSessionManager:
             )
 
     def _schedule_flush_retry(self, chat_id: str, delay: float = 0.5) -> None:
-        existing = self._scheduled_flush_tasks.get(chat_id)
-        if existing and not existing.done():
+        if chat_id in self._scheduled_flush_timers:
             return
 
-        async def _delayed_flush() -> None:
-            try:
-                await asyncio.sleep(delay)
-                await self.flush_message_queue(chat_id)
-            finally:
-                self._scheduled_flush_tasks.pop(chat_id, None)
+        def _due():
+            self._scheduled_flush_timers.pop(chat_id, None)
+            return self.flush_message_queue(chat_id)
 
-        self._scheduled_flush_tasks[chat_id] = asyncio.create_task(_delayed_flush())
+        self._scheduled_flush_timers[chat_id] = self._timers.call_later(delay, _due)
 
     # ---------------------------------------------------------------------
     # Heartbeat management
     # ---------------------------------------------------------------------
     async def start_heartbeat(self, chat_id: str, websocket) -> None:
-        task = self._heartbeat_tasks.get(chat_id)
-        if task and not task.done():
-            task.cancel()
-        self._heartbeat_tasks[chat_id] = asyncio.create_task(
-            self._heartbeat_loop(chat_id, websocket)
-        )
+        timer = self._heartbeat_timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._schedule_heartbeat(chat_id, websocket)
         self.logger.info("Started WebSocket heartbeat for %s", chat_id)
 
     async def stop_heartbeat(self, chat_id: str) -> None:
-        task = self._heartbeat_tasks.pop(chat_id, None)
-        if task and not task.done():
-            task.cancel()
-            try:
-                await task
-            except Exception:
-                pass
+        timer = self._heartbeat_timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
         self.logger.debug("Stopped WebSocket heartbeat for %s", chat_id)
 
-    async def _heartbeat_loop(self, chat_id: str, websocket) -> None:
+    def _schedule_heartbeat(self, chat_id: str, websocket) -> None:
+        self._heartbeat_timers[chat_id] = self._timers.call_later(
+            self._heartbeat_interval, self._heartbeat_due, chat_id, websocket
+        )
+
+    def _heartbeat_due(self, chat_id: str, websocket):
+        if chat_id not in self.connections:
+            self._heartbeat_timers.pop(chat_id, None)
+            return None
+        self._schedule_heartbeat(chat_id, websocket)
+        return self._send_ping(chat_id, websocket)
+
+    async def _send_ping(self, chat_id: str, websocket) -> None:
+        ping_data = {
+            "type": "ping",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
         try:
-            while chat_id in self.connections:
-                await asyncio.sleep(self._heartbeat_interval)
-                ping_data = {
-                    "type": "ping",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                }
-                try:
-                    await websocket.send_json(ping_data)
-                    self.logger.debug("Sent heartbeat ping to %s", chat_id)
-                except Exception as exc:
-                    self.logger.warning("Heartbeat failed for %s: %s", chat_id, exc)
-                    await self.cleanup(chat_id)
-                    break
-        except asyncio.CancelledError:
-            self.logger.debug("Heartbeat loop cancelled for %s", chat_id)
+            await websocket.send_json(ping_data)
+            self.logger.debug("Sent heartbeat ping to %s", chat_id)
         except Exception as exc:
-            self.logger.error("Heartbeat loop error for %s: %s", chat_id, exc)
+            self.logger.warning("Heartbeat failed for %s: %s", chat_id, exc)
+            await self.cleanup(chat_id)
 
 
 __all__ = ["WebSocketSessionManager"]
@@ -19,8 +19,6 @@
 # ============================================================================
 from __future__ import annotations
 import logging
-import importlib
-import importlib.util
 import sys
 import inspect
 from functools import wraps
@@ -28,6 +26,8 @@ from pathlib import Path
 from typing import Callable, Dict, List, Optional
 import json
 
+from ..source_cache import clear_source_cache, load_module_cached, load_yaml_cached
+
 logger = logging.getLogger(__name__)
 
 
@@ -228,8 +228,7 @@ def load_agent_tool_functions(workflow_name: str) -> Dict[str, List[Callable]]:
         return mapping
     
     try:
-        import yaml
-        data = yaml.safe_load(tools_yaml_path.read_text(encoding='utf-8')) or {}
+        data = load_yaml_cached(tools_yaml_path) or {}
     except Exception as jerr:
         logger.warning(f"[TOOLS] Failed to parse tools.yaml for '{workflow_name}': {jerr}")
         return mapping
@@ -250,7 +249,7 @@ def load_agent_tool_functions(workflow_name: str) -> Dict[str, List[Callable]]:
             reg_err,
         )
 
-    # Disable per-process tool module caching to always load fresh tool code
+    # Tool modules are reused across chats while their file content is unchanged (see source_cache)
     logger.debug(f"[TOOLS][TRACE] Starting tool load for workflow '{workflow_name}' (entries={len(entries)})")
     for idx, tool in enumerate(entries, start=1):
         if not isinstance(tool, dict):
@@ -278,17 +277,9 @@ def load_agent_tool_functions(workflow_name: str) -> Dict[str, List[Callable]]:
         if not file_path:
             logger.warning(f"[TOOLS][TRACE] File not found for entry #{idx}: {file_name} (searched: {candidate_paths})")
             continue
-        # Always load a fresh module instance under an ephemeral name (no sys.modules caching)
-        module = None
+        # Module instances are cached per file content; edits are picked up on the next load
         try:
-            spec = importlib.util.spec_from_file_location(f"mozaiks_{workflow_name}_{file_path.stem}_ephemeral", file_path)
-            if spec and spec.loader:
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)  # type: ignore[attr-defined]
-                logger.debug(f"[TOOLS] Loaded module fresh (no cache): {file_path.name}")
-            else:
-                logger.warning(f"[TOOLS] Could not load spec for {file_path}")
-                continue
+            module = load_module_cached(f"mozaiks_{workflow_name}_{file_path.stem}", file_path)
         except Exception as imp_err:
             logger.warning(f"[TOOLS][TRACE] Import failed for {file_path}: {imp_err}")
             continue
@@ -364,9 +355,9 @@ def clear_tool_cache(workflow_name: Optional[str] = None) -> int:
                       If None, clear all mozaiks_* modules.
     
     Returns:
-        Number of modules cleared from sys.modules cache.
+        Number of modules cleared from the source cache and sys.modules.
     """
-    cleared_count = 0
+    cleared_count = clear_source_cache(f"mozaiks_{workflow_name}_" if workflow_name else None)
     modules_to_clear = []
     
     # Find modules to clear
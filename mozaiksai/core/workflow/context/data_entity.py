@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
 from logs.logging_config import get_workflow_logger
+from .db_adapters import invalidate_data_reference_cache
 
 try:  # Local import with fallback for unit tests
     from mozaiksai.core.core_config import get_mongo_client
@@ -61,6 +62,7 @@ class DataEntityManager:
         doc = self._validate_payload(data)
         if self._write_strategy == "immediate":
             await self._collection.insert_one(doc)
+            self._invalidate_references()
         else:
             self._pending.append(_PendingWrite("insert", doc))
         return doc
@@ -74,6 +76,7 @@ class DataEntityManager:
         payload = self._validate_updates(updates)
         if self._write_strategy == "immediate":
             await self._collection.update_one({self._search_by: search_value}, {"$set": payload}, upsert=False)
+            self._invalidate_references()
         else:
             self._pending.append(_PendingWrite("update", payload, search_value))
 
@@ -90,6 +93,7 @@ class DataEntityManager:
                 await collection.insert_one(item.payload)
             elif item.operation == "update":
                 await collection.update_one({self._search_by: item.search_value}, {"$set": item.payload}, upsert=False)
+        self._invalidate_references()
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -113,6 +117,9 @@ class DataEntityManager:
             raise ValueError("DataEntityManager.update expects a dict payload")
         return dict(updates)
 
+    def _invalidate_references(self) -> None:
+        invalidate_data_reference_cache(self._database_name, self._collection_name)
+
     @property
     def _collection(self):  # pragma: no cover - exercised via public methods
         return self._client[self._database_name][self._collection_name]
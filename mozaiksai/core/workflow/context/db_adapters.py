@@ -5,14 +5,120 @@
 
 from __future__ import annotations
 
+import copy
+import json
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
 from logs.logging_config import get_workflow_logger
 from .schema import ContextVariableSource
 
 logger = get_workflow_logger("db_adapters")
 
+DATA_REFERENCE_CACHE_MAX = max(1, int(os.getenv("CONTEXT_DATA_REFERENCE_CACHE_MAX", "512") or 512))
+
+_CacheKey = Tuple[str, str, str, str]
+
+
+class DataReferenceCache:
+    """Process-wide TTL + LRU cache for ``data_reference`` lookups.
+
+    Only sources that declare ``cache_ttl_sec`` are cached. Entries are keyed by
+    ``(database, collection, materialized query, projection)`` so different apps
+    (whose queries differ by ``app_id``) never share a document. "Not found" is
+    cached too; writes through ``DataEntityManager`` drop every entry for the
+    affected collection.
+    """
+
+    def __init__(self, max_entries: int = DATA_REFERENCE_CACHE_MAX) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[_CacheKey, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        db_name: str,
+        collection: str,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]],
+    ) -> _CacheKey:
+        # default=str keeps ObjectId / datetime values in materialized queries hashable.
+        return (
+            db_name,
+            collection,
+            json.dumps(query, sort_keys=True, default=str),
+            json.dumps(projection, sort_keys=True, default=str),
+        )
+
+    def get(self, key: _CacheKey) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Return ``(hit, document)``; the document is a copy callers may mutate."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        expires_at, doc = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, copy.deepcopy(doc)
+
+    def put(self, key: _CacheKey, doc: Optional[Dict[str, Any]], ttl_sec: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_sec, copy.deepcopy(doc))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_collection(self, db_name: str, collection: str) -> int:
+        """Drop every cached lookup against ``db_name.collection``."""
+        stale = [key for key in self._entries if key[0] == db_name and key[1] == collection]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_data_reference_cache = DataReferenceCache()
+
+
+def get_data_reference_cache() -> DataReferenceCache:
+    return _data_reference_cache
+
+
+def invalidate_data_reference_cache(db_name: str, collection: str) -> int:
+    """Invalidation hook for writers of a collection that data_reference sources read."""
+    dropped = _data_reference_cache.invalidate_collection(db_name, collection)
+    if dropped:
+        logger.debug(f"Invalidated {dropped} cached data_reference lookups for {db_name}.{collection}")
+    return dropped
+
 
 class DatabaseAdapter(ABC):
     """Abstract base class for database adapters."""
@@ -58,6 +164,14 @@ class MongoAdapter(DatabaseAdapter):
             )
             return None
 
+        ttl = source.cache_ttl_sec or 0
+        cache_key = DataReferenceCache.make_key(db_name, collection, query, projection) if ttl > 0 else None
+        if cache_key is not None:
+            hit, cached = _data_reference_cache.get(cache_key)
+            if hit:
+                logger.debug(f"MongoAdapter cache hit for {db_name}.{collection}")
+                return cached
+
         try:
             from mozaiksai.core.core_config import get_mongo_client
 
@@ -73,6 +187,8 @@ class MongoAdapter(DatabaseAdapter):
             logger.info(f"MongoAdapter query result: doc={'found (most recent)' if doc else 'None'}")
             if doc:
                 logger.info(f"MongoAdapter document keys: {list(doc.keys())}")
+            if cache_key is not None:
+                _data_reference_cache.put(cache_key, doc, ttl)
             return doc
         except Exception as err:
             logger.error(
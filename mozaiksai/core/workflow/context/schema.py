@@ -73,6 +73,7 @@ class ContextVariableSource(BaseModel):
     query_template: Optional[Dict[str, Any]] = None
     fields: Optional[List[str]] = None
     refresh_strategy: Optional[Literal["once", "per_phase", "on_demand"]] = None
+    cache_ttl_sec: Optional[int] = None  # share lookups across chats for this long (process-wide)
     
     # Data entity source fields (type="data_entity")
     # Reuses database_name
@@ -5,10 +5,13 @@
 
 from __future__ import annotations
 
+import asyncio
+import copy
 import os
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from time import monotonic, perf_counter
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from .adapter import create_context_container
 from .data_entity import DataEntityManager
@@ -25,6 +28,15 @@ business_logger = get_workflow_logger("context_variables")
 
 _TRUE_FLAG_VALUES = {"1", "true", "yes", "on"}
 TRUNCATE_CHARS = int(os.getenv("CONTEXT_SCHEMA_TRUNCATE_CHARS", "4000") or 4000)
+# Max data_reference queries in flight while building one context.
+DATA_REFERENCE_CONCURRENCY = max(1, int(os.getenv("CONTEXT_DATA_REFERENCE_CONCURRENCY", "8") or 8))
+# Schema overview introspection (CONTEXT_INCLUDE_SCHEMA): documents sampled per
+# collection, sampling fan-out, and how long samples are reused across chats.
+SCHEMA_SAMPLE_SIZE = max(1, int(os.getenv("CONTEXT_SCHEMA_SAMPLE_SIZE", "1") or 1))
+SCHEMA_SAMPLE_CONCURRENCY = max(1, int(os.getenv("CONTEXT_SCHEMA_SAMPLE_CONCURRENCY", "8") or 8))
+SCHEMA_CACHE_TTL_SEC = max(0, int(os.getenv("CONTEXT_SCHEMA_CACHE_TTL_SEC", "300") or 0))
+_SCHEMA_SAMPLE_CACHE: Dict[str, Tuple[float, Dict[str, Dict[str, Any]]]] = {}
+_SCHEMA_SAMPLE_INFLIGHT: Dict[str, "asyncio.Future[Dict[str, Dict[str, Any]]]"] = {}
 _FILE_CONTEXT_ALLOW_OUTSIDE_ROOT = os.getenv("CONTEXT_FILE_ALLOW_OUTSIDE_ROOT", "false").strip().lower() in _TRUE_FLAG_VALUES
 
 
@@ -222,6 +234,22 @@ def _resolve_template_value(template: Any, context: Any, app_id: str) -> Any:
     return base_value
 
 
+def _template_dependencies(template: Optional[Dict[str, Any]]) -> Set[str]:
+    """Context variable names referenced by ``{{...}}`` placeholders in a query template."""
+    deps: Set[str] = set()
+    for value in (template or {}).values():
+        if not isinstance(value, str) or not value.startswith("{{") or not value.endswith("}}"):
+            continue
+        inner = value[2:-2].strip()
+        if inner.startswith("runtime."):
+            key = inner.split(".", 1)[1]
+            if key != "app_id":
+                deps.add(key)
+        elif inner:
+            deps.add(inner.split(".")[0])
+    return deps
+
+
 def _materialize_query_template(
     template: Optional[Dict[str, Any]],
     context: Any,
@@ -235,6 +263,53 @@ def _materialize_query_template(
     return resolved
 
 
+async def _load_data_references(
+    refs: Dict[str, ContextVariableDefinition],
+    *,
+    default_database_name: Optional[str],
+    app_id: str,
+    context: Any,
+    timings: Dict[str, float],
+) -> None:
+    """Resolve data_reference variables concurrently, respecting template dependencies.
+
+    A variable whose query template references another data_reference waits for it;
+    everything else loads in waves of at most ``DATA_REFERENCE_CONCURRENCY`` queries.
+    """
+    deps = {name: _template_dependencies(d.source.query_template) & set(refs) - {name} for name, d in refs.items()}
+    semaphore = asyncio.Semaphore(DATA_REFERENCE_CONCURRENCY)
+
+    async def _load(name: str) -> None:
+        async with semaphore:
+            started = perf_counter()
+            business_logger.info(f"[DATA_REFERENCE] Loading '{name}' for app_id={app_id}")
+            value = await _load_data_reference_value(
+                name,
+                refs[name],
+                default_database_name=default_database_name,
+                app_id=app_id,
+                context=context,
+            )
+            timings[name] = round((perf_counter() - started) * 1000, 3)
+        context.set(name, value)
+        business_logger.info(
+            f"[DATA_REFERENCE] Loaded '{name}' in {timings[name]}ms - type={type(value).__name__}, "
+            f"value_preview={str(value)[:100] if value else 'None'}"
+        )
+
+    pending = list(refs)
+    loaded: Set[str] = set()
+    while pending:
+        ready = [name for name in pending if deps[name] <= loaded]
+        if not ready:
+            # Dependency cycle: load the rest in declaration order (unresolved refs read as None).
+            business_logger.warning(f"[DATA_REFERENCE] Cyclic query template dependencies among {pending}")
+            ready = pending[:1]
+        await asyncio.gather(*(_load(name) for name in ready))
+        loaded.update(ready)
+        pending = [name for name in pending if name not in loaded]
+
+
 async def _load_data_reference_value(
     name: str,
     definition: ContextVariableDefinition,
@@ -358,30 +433,81 @@ def _load_workflow_plan(workflow_name: str) -> Tuple[ContextVariablesPlan, Dict[
 # Schema utilities (optional, reused from legacy implementation)
 # ---------------------------------------------------------------------------
 
-async def _get_all_collections_first_docs(database_name: str) -> Dict[str, Any]:
+async def _sample_collection(db: Any, collection_name: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    async with semaphore:
+        try:
+            cursor = db[collection_name].find().limit(SCHEMA_SAMPLE_SIZE)
+            return {"docs": await cursor.to_list(length=SCHEMA_SAMPLE_SIZE)}
+        except Exception as err:
+            business_logger.debug(f"Could not analyze {collection_name}: {err}")
+            return {"error": str(err)}
+
+
+async def _introspect_database(database_name: str) -> Dict[str, Dict[str, Any]]:
+    """List collections once and sample each one concurrently.
+
+    Returns ``{collection: {"docs": [...]} | {"error": "..."}}``. Raises if the
+    collection list itself cannot be read, so failures are never cached.
+    """
     from mozaiksai.core.core_config import get_mongo_client  # local import
 
+    db = get_mongo_client()[database_name]
+    names = await db.list_collection_names()
+    semaphore = asyncio.Semaphore(SCHEMA_SAMPLE_CONCURRENCY)
+    samples = await asyncio.gather(*(_sample_collection(db, name, semaphore) for name in names))
+    return dict(zip(names, samples))
+
+
+async def _get_schema_samples(database_name: str) -> Dict[str, Dict[str, Any]]:
+    """Schema samples for ``database_name``, cached for ``SCHEMA_CACHE_TTL_SEC``.
+
+    Concurrent chat starts share one introspection pass per database.
+    """
+    cached = _SCHEMA_SAMPLE_CACHE.get(database_name)
+    if cached and cached[0] > monotonic():
+        return cached[1]
+
+    pending = _SCHEMA_SAMPLE_INFLIGHT.get(database_name)
+    if pending is None:
+        pending = asyncio.ensure_future(_introspect_database(database_name))
+        _SCHEMA_SAMPLE_INFLIGHT[database_name] = pending
+        pending.add_done_callback(lambda task: _finish_schema_introspection(database_name, task))
+    # Shielded for every caller (the one that started it too): a cancelled chat
+    # start must not cancel the introspection other chats are waiting on.
+    return await asyncio.shield(pending)
+
+
+def _finish_schema_introspection(database_name: str, task: "asyncio.Future[Dict[str, Dict[str, Any]]]") -> None:
+    if _SCHEMA_SAMPLE_INFLIGHT.get(database_name) is task:
+        del _SCHEMA_SAMPLE_INFLIGHT[database_name]
+    if task.cancelled() or task.exception() is not None:
+        return
+    if SCHEMA_CACHE_TTL_SEC > 0:
+        _SCHEMA_SAMPLE_CACHE[database_name] = (monotonic() + SCHEMA_CACHE_TTL_SEC, task.result())
+
+
+def clear_schema_cache(database_name: Optional[str] = None) -> None:
+    """Drop cached schema samples (all databases when ``database_name`` is None)."""
+    if database_name is None:
+        _SCHEMA_SAMPLE_CACHE.clear()
+    else:
+        _SCHEMA_SAMPLE_CACHE.pop(database_name, None)
+
+
+async def _get_all_collections_first_docs(database_name: str) -> Dict[str, Any]:
     result: Dict[str, Any] = {}
     try:
-        client = get_mongo_client()
-        db = client[database_name]
-        try:
-            names = await db.list_collection_names()
-        except Exception as err:  # pragma: no cover
-            business_logger.error(f"list_collection_names failed for {database_name}: {err}")
-            return result
-        for cname in names:
-            try:
-                doc = await db[cname].find_one()
-                if not doc:
-                    result[cname] = {"_note": "empty_collection"}
-                else:
-                    cleaned = {k: v for k, v in doc.items() if k != "_id"}
-                    result[cname] = cleaned
-            except Exception as ce:
-                result[cname] = {"_error": str(ce)}
-    except Exception as outer:
-        business_logger.error(f"Failed collecting first docs for {database_name}: {outer}")
+        samples = await _get_schema_samples(database_name)
+    except Exception as err:
+        business_logger.error(f"Failed collecting first docs for {database_name}: {err}")
+        return result
+    for cname, sample in samples.items():
+        if "error" in sample:
+            result[cname] = {"_error": sample["error"]}
+        elif not sample["docs"]:
+            result[cname] = {"_note": "empty_collection"}
+        else:
+            result[cname] = copy.deepcopy({k: v for k, v in sample["docs"][0].items() if k != "_id"})
     return result
 
 
@@ -389,54 +515,37 @@ async def _get_database_schema_async(database_name: str) -> Dict[str, Any]:
     schema_info: Dict[str, Any] = {}
 
     try:
-        from mozaiksai.core.core_config import get_mongo_client
-
-        client = get_mongo_client()
-        db = client[database_name]
-        collection_names = await db.list_collection_names()
+        samples = await _get_schema_samples(database_name)
 
         schema_lines: List[str] = []
         schema_lines.append(f"DATABASE: {database_name}")
-        schema_lines.append(f"TOTAL COLLECTIONS: {len(collection_names)}")
+        schema_lines.append(f"TOTAL COLLECTIONS: {len(samples)}")
         schema_lines.append("")
 
         app_collections: List[str] = []
-        collection_schemas: Dict[str, Dict[str, str]] = {}
+        for collection_name, sample in samples.items():
+            docs = sample.get("docs")
+            if not docs:
+                continue
 
-        for collection_name in collection_names:
-            try:
-                collection = db[collection_name]
-                sample_doc = await collection.find_one()
-                if not sample_doc:
-                    collection_schemas[collection_name] = {"note": "No sample data available"}
-                    continue
-
-                field_types: Dict[str, str] = {}
-                for field_name, value in sample_doc.items():
+            # Field types are unioned across the sampled documents.
+            field_types: Dict[str, List[str]] = {}
+            for doc in docs:
+                for field_name, value in doc.items():
                     if field_name == "_id":
                         continue
+                    seen = field_types.setdefault(field_name, [])
                     field_type = type(value).__name__
-                    if field_type == "ObjectId":
-                        field_type = "ObjectId"
-                    field_types[field_name] = field_type
-                collection_schemas[collection_name] = field_types
-
-                if "app_id" in sample_doc:
-                    app_collections.append(collection_name)
-            except Exception as err:
-                business_logger.debug(f"Could not analyze {collection_name}: {err}")
-                collection_schemas[collection_name] = {"error": f"Analysis failed: {err}"}
+                    if field_type not in seen:
+                        seen.append(field_type)
+            if any("app_id" in doc for doc in docs):
+                app_collections.append(collection_name)
 
-        for collection_name, fields in collection_schemas.items():
-            note = fields.get("note") if isinstance(fields, dict) else None
-            error = fields.get("error") if isinstance(fields, dict) else None
-            if note or error:
-                continue
             is_app = " [app-specific]" if collection_name in app_collections else ""
             schema_lines.append(f"{collection_name.upper()}{is_app}:")
             schema_lines.append("  Fields:")
-            for field_name, field_type in fields.items():
-                schema_lines.append(f"    - {field_name}: {field_type}")
+            for field_name, types in field_types.items():
+                schema_lines.append(f"    - {field_name}: {' | '.join(types)}")
             schema_lines.append("")
 
         schema_info["schema_overview"] = "\n".join(schema_lines)
@@ -444,7 +553,7 @@ async def _get_database_schema_async(database_name: str) -> Dict[str, Any]:
             "Schema loaded",
             extra={
                 "database": database_name,
-                "collections": len(collection_names),
+                "collections": len(samples),
                 "app_collections": len(app_collections),
             },
         )
@@ -501,27 +610,23 @@ async def _load_context_async(workflow_name: str, app_id: Optional[str]):
     definitions = plan.definitions or {}
     default_db = _database_defaults(raw_context_section)
     data_entity_managers: List[DataEntityManager] = []
+    data_references: Dict[str, ContextVariableDefinition] = {}
+    timings: Dict[str, float] = {}
 
     for name, definition in definitions.items():
         source = definition.source
         source_type = source.type
+        started = perf_counter()
 
         if source_type == "config":
             value = _resolve_config(definition)
             context.set(name, value)
             business_logger.info("Loaded config variable %s", name)
         elif source_type == "data_reference":
-            business_logger.info(f"[DATA_REFERENCE] Loading '{name}' for app_id={internal_app_id}")
-            value = await _load_data_reference_value(
-                name,
-                definition,
-                default_database_name=default_db,
-                app_id=internal_app_id,
-                context=context,
-            )
-            context.set(name, value)
-            business_logger.info(f"[DATA_REFERENCE] Loaded '{name}' - type={type(value).__name__}, value_preview={str(value)[:100] if value else 'None'}")
-            business_logger.info("Loaded data_reference %s", name)
+            # Placeholder keeps declaration order; queries run concurrently below.
+            context.set(name, None)
+            data_references[name] = definition
+            continue
         elif source_type == "data_entity":
             manager = _create_data_entity_manager(
                 name,
@@ -558,6 +663,16 @@ async def _load_context_async(workflow_name: str, app_id: Optional[str]):
             business_logger.info("Loaded file variable %s", name)
         else:
             business_logger.debug("Unsupported source type for %s: %s", name, source_type)
+        timings[name] = round((perf_counter() - started) * 1000, 3)
+
+    if data_references:
+        await _load_data_references(
+            data_references,
+            default_database_name=default_db,
+            app_id=internal_app_id,
+            context=context,
+            timings=timings,
+        )
 
     if data_entity_managers:
         setattr(context, "_mozaiks_data_entity_managers", data_entity_managers)
@@ -567,6 +682,7 @@ async def _load_context_async(workflow_name: str, app_id: Optional[str]):
         setattr(context, "_mozaiks_context_definitions", definitions)
     if plan.agents:
         setattr(context, "_mozaiks_context_agents", plan.agents)
+    setattr(context, "_mozaiks_context_timings_ms", timings)
 
     # Log context summary
     try:
@@ -579,6 +695,7 @@ async def _load_context_async(workflow_name: str, app_id: Optional[str]):
             "workflow": workflow_name,
             "variable_count": len(keys),
             "variables": keys,
+            "variable_timings_ms": timings,
         },
     )
     for key in keys:
@@ -593,7 +710,7 @@ async def _load_context_async(workflow_name: str, app_id: Optional[str]):
     return context
 
 
-__all__ = ["_create_minimal_context", "_load_context_async"]
+__all__ = ["_create_minimal_context", "_load_context_async", "clear_schema_cache"]
 
 
 
@@ -33,7 +33,6 @@ Runtime Contract:
 
 from __future__ import annotations
 import asyncio
-import importlib.util
 import inspect
 import json
 import logging
@@ -44,6 +43,7 @@ from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional
 
 from logs.logging_config import get_workflow_logger
+from ..source_cache import load_module_cached
 from logs.tools_logs import get_tool_logger, log_tool_event
 
 logger = logging.getLogger(__name__)
@@ -200,14 +200,10 @@ class LifecycleToolManager:
             logger.warning(f"[LIFECYCLE] Tool file '{file_name}' not found in workflow '{self.workflow_name}'")
             return None
 
-        # Load module (ephemeral, no sys.modules caching)
-        module_name = f"mozaiks_lifecycle_{self.workflow_name}_{file_path.stem}_{id(file_path)}"
+        # Load module (cached per file content, no sys.modules registration)
+        module_name = f"mozaiks_lifecycle_{self.workflow_name}_{file_path.stem}"
         try:
-            spec = importlib.util.spec_from_file_location(module_name, file_path)
-            if not spec or not spec.loader:
-                return None
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            module = load_module_cached(module_name, file_path)
         except Exception as err:
             logger.warning(f"[LIFECYCLE] Failed to import {file_path}: {err}")
             return None
@@ -16,7 +16,7 @@ Sections (skim map)
 - logging helpers: agent message details and full conversation logging
 """
 
-from typing import Dict, List, Optional, Any, Callable, Tuple
+from typing import Dict, List, Optional, Any, Awaitable, Callable, Tuple
 import os
 import uuid
 from datetime import datetime, UTC
@@ -48,6 +48,7 @@ from mozaiksai.core.events.event_serialization import (
 )
 
 from ..data.persistence import AG2PersistenceManager
+from ..data.persistence.run_lease import get_run_lease_manager, run_leases_enabled
 from .execution import create_termination_handler, LifecycleTrigger
 from .context import DerivedContextManager
 from logs.logging_config import get_workflow_logger
@@ -359,6 +360,68 @@ async def _create_agents(agents_factory: Optional[Callable], workflow_name: str,
     return await create_agents(workflow_name, context_variables=context_variables, cache_seed=cache_seed)
 
 
+async def _gather_or_cancel(*aws):
+    """``asyncio.gather`` that cancels the remaining awaitables when one of them fails."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def _run_startup_dag(
+    *,
+    chat_id: str,
+    perf_mgr,
+    resume_or_initialize: Callable[[], Awaitable[Tuple[List[Any], List[Any]]]],
+    cache_seed: Callable[[], Awaitable[Optional[int]]],
+    llm_config: Callable[[Optional[int]], Awaitable[Any]],
+    extra_context: Callable[[], Awaitable[Dict[str, Any]]],
+    preload_structured_outputs: Callable[[], None],
+    build_context: Callable[[], Awaitable[Any]],
+) -> Tuple[Tuple[List[Any], List[Any], Optional[int], Any, Dict[str, Any], Any], Dict[str, float]]:
+    """Run the chat start-up stages, overlapping those that do not depend on each other.
+
+    session branch: resume/create chat -> (cache seed -> LLM config) | persisted extra context
+    independent:    structured outputs preload (thread), context build
+
+    Each stage's wall time is recorded on ``perf_mgr`` and returned in the
+    stage-duration map. If any stage fails the sibling stages are cancelled.
+    """
+    stage_ms: Dict[str, float] = {}
+
+    async def _stage(name: str, awaitable):
+        stage_start = perf_counter()
+        try:
+            return await awaitable
+        finally:
+            stage_ms[name] = (perf_counter() - stage_start) * 1000
+            await perf_mgr.record_startup_stage(chat_id, name, stage_ms[name])
+
+    async def _seed_and_llm_config():
+        # Per-chat cache seed is persisted on the session doc, so it follows resume/create.
+        seed = await _stage("cache_seed", cache_seed())
+        return seed, await _stage("llm_config", llm_config(seed))
+
+    async def _session_branch():
+        resumed, initial = await _stage("resume_or_initialize", resume_or_initialize())
+        (seed, llm), extra = await _gather_or_cancel(
+            _seed_and_llm_config(),
+            _stage("extra_context", extra_context()),
+        )
+        return resumed, initial, seed, llm, extra
+
+    (resumed, initial, seed, llm, extra), _, context = await _gather_or_cancel(
+        _session_branch(),
+        _stage("structured_outputs", asyncio.to_thread(preload_structured_outputs)),
+        _stage("context", build_context()),
+    )
+    return (resumed, initial, seed, llm, extra, context), stage_ms
+
+
 def _ensure_user_proxy(
     agents: Dict[str, ConversableAgent],
     config: Dict[str, Any],
@@ -855,6 +918,8 @@ async def _stream_events(
                                 if seed_user_messages[content_key] <= 0:
                                     seed_user_messages.pop(content_key, None)
                                 wf_logger.debug(f" [{workflow_name_upper}] Suppressed seeded initial message for chat {chat_id}")
+                                # save_event persisted the echo above; keep buffered replay positions aligned.
+                                transport.reserve_replay_slot(chat_id)
                                 continue
 
                             wf_logger.info(
@@ -1086,7 +1151,7 @@ async def _stream_events(
                         next_agent_name = getattr(next_agent, "name", None) or str(next_agent)
                         from mozaiksai.core.observability.realtime_token_logger import get_realtime_token_logger
                         realtime_logger = get_realtime_token_logger()
-                        realtime_logger.set_active_agent(next_agent_name)
+                        realtime_logger.set_active_agent(next_agent_name, chat_id=chat_id)
                         wf_logger.debug(f"[REALTIME_TOKENS] Context updated for agent: {next_agent_name}")
                 except Exception as ctx_err:
                     wf_logger.debug(f"Failed to update realtime token context: {ctx_err}")
@@ -1173,7 +1238,7 @@ async def _stream_events(
                     pending_input_requests[request_id] = respond_cb
                     try:
                         if transport:
-                            registered_id = transport.register_input_request(chat_id, request_id, respond_cb)  # type: ignore[attr-defined]
+                            registered_id = await transport.register_input_request(chat_id, request_id, respond_cb)  # type: ignore[attr-defined]
                             if registered_id and registered_id != request_id:
                                 pending_input_requests.pop(request_id, None)
                                 pending_input_requests[registered_id] = respond_cb
@@ -1565,6 +1630,12 @@ async def _stream_events(
             )
         except Exception as lc_err:
             wf_logger.warning(f" [{workflow_name_upper}] after_chat lifecycle tools failed: {lc_err}")
+
+        # Drain write-behind transcript messages for this run (no-op when disabled)
+        try:
+            await persistence_manager.flush_pending_events(chat_id)
+        except Exception as flush_err:
+            wf_logger.warning(f" [{workflow_name_upper}] transcript flush failed: {flush_err}")
         
         # AG2-native: No manual context cleanup needed - AG2 handles lifecycle automatically
         pass
@@ -1590,6 +1661,48 @@ async def run_workflow_orchestration(
     context_factory: Optional[Callable] = None,
     handoffs_factory: Optional[Callable] = None,
     **kwargs
+) -> Any:
+    """Run the workflow for ``chat_id`` if this node can hold the chat's run lease.
+
+    With run leases enabled (multi-node deployments) a second start for a chat that
+    is already running elsewhere returns None without running; events from the
+    holder still reach the client through the transport backplane.
+    """
+    async def _run() -> Any:
+        return await _run_workflow_orchestration(
+            workflow_name,
+            app_id,
+            chat_id,
+            user_id=user_id,
+            initial_message=initial_message,
+            initial_agent_name_override=initial_agent_name_override,
+            agents_factory=agents_factory,
+            context_factory=context_factory,
+            handoffs_factory=handoffs_factory,
+            **kwargs,
+        )
+
+    if not run_leases_enabled():
+        return await _run()
+
+    async with get_run_lease_manager().hold(chat_id) as lease:
+        if lease is None:
+            chat_logger.info(f"[RUN_LEASE] Skipping {workflow_name} run for {chat_id}: lease held by another run")
+            return None
+        return await _run()
+
+
+async def _run_workflow_orchestration(
+    workflow_name: str,
+    app_id: str,
+    chat_id: str,
+    user_id: Optional[str] = None,
+    initial_message: Optional[str] = None,
+    initial_agent_name_override: Optional[str] = None,
+    agents_factory: Optional[Callable] = None,
+    context_factory: Optional[Callable] = None,
+    handoffs_factory: Optional[Callable] = None,
+    **kwargs
 ) -> Any:
     start_time = perf_counter()
     workflow_name_upper = workflow_name.upper()
@@ -1645,13 +1758,13 @@ async def run_workflow_orchestration(
 
     # Start AG2 runtime logging for this workflow session and keep it active
     # across the orchestration run so AG2 events (like LLM/tool calls) are captured.
-    with ag2_logging_session(chat_id, workflow_name, app_id):
+    with ag2_logging_session(chat_id, workflow_name, app_id, user_id):
         # Set up realtime token logger for immediate token tracking
         try:
             from mozaiksai.core.observability.realtime_token_logger import get_realtime_token_logger
             realtime_logger = get_realtime_token_logger()
-            realtime_logger.set_user(user_id or "unknown")
-            realtime_logger.set_active_agent(workflow_name)
+            realtime_logger.set_user(user_id or "unknown", chat_id=chat_id)
+            realtime_logger.set_active_agent(workflow_name, chat_id=chat_id)
             wf_logger.info(f" [REALTIME_TOKENS] Realtime token logging prepared for chat {chat_id}")
         except Exception as rt_err:
             wf_logger.warning(f" [REALTIME_TOKENS] Failed to prepare realtime token logging: {rt_err}")
@@ -1683,44 +1796,77 @@ async def run_workflow_orchestration(
                 logger.debug(f"config log failed: {_cfg_log_err}")
 
             # -----------------------------------------------------------------
-            # 2) Resume or start chat
+            # 2-4) Start-up DAG: stages that do not depend on each other run
+            # concurrently; each stage's wall time goes to the PerformanceManager.
             # -----------------------------------------------------------------
-            resumed_messages, initial_messages = await _resume_or_initialize_chat(
-                persistence_manager=persistence_manager,
-                termination_handler=termination_handler,
-                config=config,
+            async def _cache_seed():
+                try:
+                    return await persistence_manager.get_or_assign_cache_seed(chat_id, app_id)
+                except Exception as seed_err:
+                    wf_logger.debug(f" [{workflow_name_upper}] cache_seed assignment failed for chat {chat_id}: {seed_err}")
+                    return None
+
+            async def _persisted_extra_context():
+                # Persisted session metadata (extra_fields) enables parent/child correlation
+                # and generator-subrun seeding.
+                try:
+                    return await persistence_manager.fetch_chat_session_extra_context(chat_id=chat_id, app_id=app_id)
+                except Exception as _seed_err:
+                    wf_logger.debug(f" [{workflow_name_upper}] Failed loading persisted extra context: {_seed_err}")
+                    return {}
+
+            def _preload_structured_outputs():
+                try:
+                    from .outputs.structured import load_workflow_structured_outputs as _preload_so
+                    _preload_so(workflow_name)
+                    wf_logger.info(f" [{workflow_name_upper}] Structured outputs preloaded")
+                except Exception as so_err:
+                    # Do not fail the run, but surface misconfiguration early
+                    wf_logger.warning(f" [{workflow_name_upper}] Structured outputs preload failed: {so_err}")
+
+            # Retrieve frontend context from transport connection metadata (set by host app)
+            frontend_context = None
+            try:
+                if transport and hasattr(transport, 'connections') and chat_id in transport.connections:
+                    frontend_context = transport.connections[chat_id].get("frontend_context")
+                    if frontend_context:
+                        wf_logger.info(f" [{workflow_name_upper}] Found frontend context: {list(frontend_context.keys())}")
+            except Exception as fc_lookup_err:
+                wf_logger.debug(f" [{workflow_name_upper}] Frontend context lookup failed: {fc_lookup_err}")
+
+            (resumed_messages, initial_messages, cache_seed, llm_config, extra_ctx, context), stage_ms = await _run_startup_dag(
                 chat_id=chat_id,
-                app_id=app_id,
-                workflow_name=workflow_name,
-                user_id=user_id,
-                initial_message=initial_message,
-                wf_logger=wf_logger,
+                perf_mgr=perf_mgr,
+                resume_or_initialize=lambda: _resume_or_initialize_chat(
+                    persistence_manager=persistence_manager,
+                    termination_handler=termination_handler,
+                    config=config,
+                    chat_id=chat_id,
+                    app_id=app_id,
+                    workflow_name=workflow_name,
+                    user_id=user_id,
+                    initial_message=initial_message,
+                    wf_logger=wf_logger,
+                ),
+                cache_seed=_cache_seed,
+                llm_config=lambda seed: _load_llm_config(workflow_name, wf_logger, workflow_name_upper, cache_seed=seed),
+                extra_context=_persisted_extra_context,
+                preload_structured_outputs=_preload_structured_outputs,
+                build_context=lambda: _build_context_blocking(
+                    context_factory=context_factory,
+                    workflow_name=workflow_name,
+                    app_id=app_id,
+                    chat_id=chat_id,
+                    user_id=user_id,
+                    wf_logger=wf_logger,
+                    workflow_name_upper=workflow_name_upper,
+                    frontend_context=frontend_context,
+                ),
             )
 
             # Track resume mode early so downstream logging can reference it safely
             resumed_mode = bool(resumed_messages)
 
-            # -----------------------------------------------------------------
-            # 3) LLM config (per-chat cache seed)
-            # -----------------------------------------------------------------
-            try:
-                cache_seed = await persistence_manager.get_or_assign_cache_seed(chat_id, app_id)
-            except Exception as seed_err:
-                cache_seed = None
-                wf_logger.debug(f" [{workflow_name_upper}] cache_seed assignment failed for chat {chat_id}: {seed_err}")
-            llm_config = await _load_llm_config(workflow_name, wf_logger, workflow_name_upper, cache_seed=cache_seed)
-
-            # -----------------------------------------------------------------
-            # 3.5) Structured outputs preload (blocking)
-            # -----------------------------------------------------------------
-            try:
-                from .outputs.structured import load_workflow_structured_outputs as _preload_so
-                _preload_so(workflow_name)
-                wf_logger.info(f" [{workflow_name_upper}] Structured outputs preloaded")
-            except Exception as so_err:
-                # Do not fail the run, but surface misconfiguration early
-                wf_logger.warning(f" [{workflow_name_upper}] Structured outputs preload failed: {so_err}")
-
             # Log start
             chat_logger.info(f"[{workflow_name_upper}] WORKFLOW_STARTED chat_id={chat_id} pattern={orchestration_pattern}")
             wf_logger.info(
@@ -1736,62 +1882,32 @@ async def run_workflow_orchestration(
                 trace_id=trace_id_hex,
             )
 
-            # -----------------------------------------------------------------
-            # 4) Context build
-            # -----------------------------------------------------------------
-            context = None
-            context_start = perf_counter()
-            
-            # Retrieve frontend context from transport connection metadata (set by host app)
-            frontend_context = None
-            try:
-                if transport and hasattr(transport, 'connections') and chat_id in transport.connections:
-                    frontend_context = transport.connections[chat_id].get("frontend_context")
-                    if frontend_context:
-                        wf_logger.info(f" [{workflow_name_upper}] Found frontend context: {list(frontend_context.keys())}")
-            except Exception as fc_lookup_err:
-                wf_logger.debug(f" [{workflow_name_upper}] Frontend context lookup failed: {fc_lookup_err}")
-            
-            context = await _build_context_blocking(
-                context_factory=context_factory,
-                workflow_name=workflow_name,
-                app_id=app_id,
-                chat_id=chat_id,
-                user_id=user_id,
-                wf_logger=wf_logger,
-                workflow_name_upper=workflow_name_upper,
-                frontend_context=frontend_context,
-            )
-
             # Merge persisted session metadata (extra_fields) into context.
-            # This enables parent/child correlation and generator-subrun seeding.
             try:
-                if context is not None:
-                    extra_ctx = await persistence_manager.fetch_chat_session_extra_context(chat_id=chat_id, app_id=app_id)
-                    if isinstance(extra_ctx, dict) and extra_ctx:
-                        for k, v in extra_ctx.items():
-                            try:
-                                # Do not clobber existing keys.
-                                existing = None
-                                if hasattr(context, "get"):
-                                    existing = context.get(k)  # type: ignore[call-arg]
-                                elif hasattr(context, "data") and isinstance(getattr(context, "data"), dict):
-                                    existing = getattr(context, "data").get(k)
-                                if existing is None:
-                                    if hasattr(context, "set"):
-                                        context.set(k, v)
-                                    elif hasattr(context, "__setitem__"):
-                                        context[k] = v
-                            except Exception:
-                                continue
-
-                        # Derive child marker when parent_chat_id exists.
+                if context is not None and isinstance(extra_ctx, dict) and extra_ctx:
+                    for k, v in extra_ctx.items():
                         try:
-                            parent_chat_id = extra_ctx.get("parent_chat_id")
-                            if parent_chat_id and hasattr(context, "get") and not context.get("is_child_workflow"):
-                                context.set("is_child_workflow", True)
+                            # Do not clobber existing keys.
+                            existing = None
+                            if hasattr(context, "get"):
+                                existing = context.get(k)  # type: ignore[call-arg]
+                            elif hasattr(context, "data") and isinstance(getattr(context, "data"), dict):
+                                existing = getattr(context, "data").get(k)
+                            if existing is None:
+                                if hasattr(context, "set"):
+                                    context.set(k, v)
+                                elif hasattr(context, "__setitem__"):
+                                    context[k] = v
                         except Exception:
-                            pass
+                            continue
+
+                    # Derive child marker when parent_chat_id exists.
+                    try:
+                        parent_chat_id = extra_ctx.get("parent_chat_id")
+                        if parent_chat_id and hasattr(context, "get") and not context.get("is_child_workflow"):
+                            context.set("is_child_workflow", True)
+                    except Exception:
+                        pass
             except Exception as _seed_err:
                 wf_logger.debug(f" [{workflow_name_upper}] Failed merging persisted extra context: {_seed_err}")
 
@@ -1803,7 +1919,7 @@ async def run_workflow_orchestration(
                     context.set("has_children", bool(workflow_has_nested_chats(workflow_name)))
             except Exception:
                 pass
-            context_time = (perf_counter() - context_start) * 1000
+            context_time = stage_ms.get("context", 0.0)
             performance_logger.info(
                 "context_load_duration_ms",
                 extra={
@@ -1818,7 +1934,11 @@ async def run_workflow_orchestration(
             # -----------------------------------------------------------------
             # 6) Agents creation following AG2 patterns
             # -----------------------------------------------------------------
-            agents = await _create_agents(agents_factory, workflow_name, context_variables=context, cache_seed=cache_seed)
+            agents_start = perf_counter()
+            try:
+                agents = await _create_agents(agents_factory, workflow_name, context_variables=context, cache_seed=cache_seed)
+            finally:
+                await perf_mgr.record_startup_stage(chat_id, "create_agents", (perf_counter() - agents_start) * 1000)
             agents = agents or {}
             if not agents:
                 raise RuntimeError(f"No agents defined for workflow '{workflow_name}'")
@@ -2135,6 +2255,9 @@ async def run_workflow_orchestration(
                     persisted_completion = 0
                     persisted_cost = 0.0
                     try:
+                        # Buffered realtime usage must land before the persisted counters are read.
+                        from mozaiksai.core.observability.realtime_token_logger import get_realtime_token_logger
+                        await get_realtime_token_logger().flush_usage(chat_id)
                         coll = await persistence_manager._coll()
                         persisted = await coll.find_one(
                             {"_id": chat_id, "app_id": app_id},
@@ -9,7 +9,7 @@ from .config import (
     list_workflow_ids,
     load_pack_config,
 )
-from .gating import list_workflow_availability, validate_pack_prereqs
+from .gating import invalidate_pack_gating_cache, list_workflow_availability, validate_pack_prereqs
 from .graph import load_pack_graph, workflow_has_nested_chats
 
 __all__ = [
@@ -18,6 +18,7 @@ __all__ = [
     "get_pack_config_path",
     "get_workflow_entry",
     "infer_auto_journey_for_start",
+    "invalidate_pack_gating_cache",
     "journey_next_step",
     "list_journeys",
     "list_workflow_availability",
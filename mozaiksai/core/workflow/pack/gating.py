@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import os
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from mozaiksai.core.data.models import WorkflowStatus
 from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
@@ -8,6 +10,89 @@ from mozaiksai.core.multitenant import build_app_scope_filter
 from mozaiksai.core.workflow.pack.config import compute_required_gates, load_pack_config
 
 
+def _cache_ttl_sec() -> float:
+    try:
+        return max(0.0, float(os.getenv("PACK_GATING_CACHE_TTL_SEC", "30") or 0))
+    except ValueError:
+        return 30.0
+
+
+# (app_id, user_id) -> (expires_at monotonic, workflow names with a COMPLETED run)
+_completed_cache: Dict[Tuple[str, str], Tuple[float, FrozenSet[str]]] = {}
+
+
+def invalidate_pack_gating_cache(*, app_id: Optional[str] = None, user_id: Optional[str] = None) -> None:
+    """Drop cached completed-workflow sets (all of them when no app_id is given)."""
+    scope_id = str(app_id or "").strip()
+    uid = str(user_id or "").strip()
+    if not scope_id:
+        _completed_cache.clear()
+    elif uid:
+        _completed_cache.pop((scope_id, uid), None)
+    else:
+        for key in [k for k in _completed_cache if k[0] == scope_id]:
+            _completed_cache.pop(key, None)
+
+
+def handle_run_complete(payload: Dict[str, Any]) -> None:
+    """`chat.run_complete` listener: a finished run may unlock downstream gates."""
+    if not isinstance(payload, dict):
+        return
+    invalidate_pack_gating_cache(
+        app_id=payload.get("app_id") or payload.get("app"),
+        user_id=payload.get("user_id") or payload.get("user"),
+    )
+
+
+async def _completed_workflows(pm: AG2PersistenceManager, scope_id: str, uid: str) -> FrozenSet[str]:
+    """Return the workflow names the user has at least one COMPLETED run for.
+
+    One `$group` aggregation per (app, user), cached for `PACK_GATING_CACHE_TTL_SEC`.
+    """
+    key = (scope_id, uid)
+    ttl = _cache_ttl_sec()
+    cached = _completed_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    coll = await pm._coll()
+    pipeline = [
+        {
+            "$match": {
+                "user_id": uid,
+                "status": int(WorkflowStatus.COMPLETED),
+                **build_app_scope_filter(scope_id),
+            }
+        },
+        {"$group": {"_id": "$workflow_name"}},
+    ]
+    groups = await coll.aggregate(pipeline).to_list(length=None)
+    completed = frozenset(str(g["_id"]) for g in groups if g.get("_id"))
+    if ttl > 0:
+        _completed_cache[key] = (time.monotonic() + ttl, completed)
+    return completed
+
+
+def _resolve_gates(wf: str, required_gates: List[Dict[str, Any]], completed: FrozenSet[str]) -> Tuple[bool, Optional[str]]:
+    missing_msgs: List[str] = []
+    for gate in required_gates:
+        if not isinstance(gate, dict):
+            continue
+        parent = str(gate.get("from") or "").strip()
+        if not parent:
+            continue
+        if parent not in completed:
+            reason = str(gate.get("reason") or "").strip()
+            missing_msgs.append(reason or f"{wf} requires {parent} to be completed first.")
+
+    if not missing_msgs:
+        return True, None
+
+    # De-dupe while preserving order.
+    uniq = list(dict.fromkeys(missing_msgs))
+    return False, " ".join(uniq)
+
+
 async def validate_pack_prereqs(
     *,
     app_id: str,
@@ -45,44 +130,8 @@ async def validate_pack_prereqs(
             return True, None
 
         pm = persistence or AG2PersistenceManager()
-        coll = await pm._coll()
-
-        missing_msgs: List[str] = []
-        for gate in required_gates:
-            if not isinstance(gate, dict):
-                continue
-            parent = str(gate.get("from") or "").strip()
-            if not parent:
-                continue
-            reason = str(gate.get("reason") or "").strip()
-
-            query: Dict[str, Any] = {
-                "workflow_name": parent,
-                "user_id": uid,
-                "status": int(WorkflowStatus.COMPLETED),
-                **build_app_scope_filter(scope_id),
-            }
-
-            doc = await coll.find_one(
-                query,
-                projection={"_id": 1},
-                sort=[("completed_at", -1), ("created_at", -1)],
-            )
-            if not doc:
-                missing_msgs.append(reason or f"{wf} requires {parent} to be completed first.")
-
-        if not missing_msgs:
-            return True, None
-
-        # De-dupe while preserving order.
-        seen = set()
-        uniq: List[str] = []
-        for msg in missing_msgs:
-            if msg in seen:
-                continue
-            seen.add(msg)
-            uniq.append(msg)
-        return False, " ".join(uniq)
+        completed = await _completed_workflows(pm, scope_id, uid)
+        return _resolve_gates(wf, required_gates, completed)
     except Exception:
         return False, "Failed to validate workflow prerequisites. Please try again."
 
@@ -107,23 +156,30 @@ async def list_workflow_availability(
     if not isinstance(workflows, list):
         return []
 
-    pm = persistence or AG2PersistenceManager()
-    coll = await pm._coll()
-
-    results: List[Dict[str, Any]] = []
+    entries: List[Tuple[Dict[str, Any], str, List[Dict[str, Any]]]] = []
     for w in workflows:
         if not isinstance(w, dict):
             continue
         wf = str(w.get("id") or "").strip()
-        if not wf:
-            continue
+        if wf:
+            entries.append((w, wf, compute_required_gates(pack, wf)))
 
-        ok, reason = await validate_pack_prereqs(
-            app_id=scope_id,
-            user_id=uid,
-            workflow_name=wf,
-            persistence=pm,
-        )
+    # One round trip for the whole pack; every workflow's gates resolve in memory.
+    completed: Optional[FrozenSet[str]] = frozenset()
+    if any(gates for _, _, gates in entries):
+        try:
+            completed = await _completed_workflows(persistence or AG2PersistenceManager(), scope_id, uid)
+        except Exception:
+            completed = None
+
+    results: List[Dict[str, Any]] = []
+    for w, wf, required_gates in entries:
+        if not required_gates:
+            ok, reason = True, None
+        elif completed is None:
+            ok, reason = False, "Failed to validate workflow prerequisites. Please try again."
+        else:
+            ok, reason = _resolve_gates(wf, required_gates, completed)
         results.append(
             {
                 "workflow_name": wf,
@@ -131,11 +187,11 @@ async def list_workflow_availability(
                 "reason": reason or "All prerequisites met",
                 "type": str(w.get("type") or "").strip() or None,
                 "description": str(w.get("description") or "").strip() or None,
-                "required_gates": compute_required_gates(pack, wf),
+                "required_gates": required_gates,
             }
         )
 
     return results
 
 
-__all__ = ["validate_pack_prereqs", "list_workflow_availability"]
+__all__ = ["validate_pack_prereqs", "list_workflow_availability", "invalidate_pack_gating_cache"]
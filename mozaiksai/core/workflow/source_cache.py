@@ -0,0 +1,154 @@
+# ==============================================================================
+# FILE: core/workflow/source_cache.py
+# DESCRIPTION: Content-validated cache for workflow YAML files and tool modules
+# ==============================================================================
+
+"""Process-wide cache of parsed workflow YAML and imported tool modules.
+
+Every chat start used to re-parse ``tools.yaml`` and re-execute each tool module
+(under an ephemeral name), which re-imports heavy dependencies and churns memory.
+Entries here are validated on every lookup so hot reload keeps working:
+
+- ``(mtime_ns, size)`` unchanged -> cached value is returned (one ``stat``).
+- stat changed -> the file is read and hashed; if the SHA-256 still matches
+  (touched / re-saved without edits) the cached value is kept, otherwise the file
+  is re-parsed / re-executed.
+
+Only the file itself is tracked: edits to helper modules a tool imports are not
+detected; ``clear_tool_cache`` / ``clear_source_cache`` force a fresh import.
+Set ``WORKFLOW_SOURCE_CACHE_ENABLED=false`` to restore the always-fresh behavior.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import importlib.util
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import yaml
+
+from logs.logging_config import get_workflow_logger
+
+logger = get_workflow_logger("source_cache")
+
+_TRUE_FLAG_VALUES = {"1", "true", "yes", "on"}
+
+
+def _cache_enabled() -> bool:
+    return os.getenv("WORKFLOW_SOURCE_CACHE_ENABLED", "true").strip().lower() in _TRUE_FLAG_VALUES
+
+
+@dataclass
+class _Entry:
+    stat_key: Tuple[int, int]
+    digest: str
+    value: Any
+
+
+_yaml_cache: Dict[str, _Entry] = {}
+_module_cache: Dict[Tuple[str, str], _Entry] = {}
+_lock = threading.RLock()
+_stats = {"hits": 0, "revalidated": 0, "loads": 0}
+
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _lookup(cache: Dict[Any, _Entry], key: Any, path: Path, load: Callable[[bytes], Any]) -> Any:
+    """Return the cached value for ``key`` or (re)load it via ``load(raw_bytes)``."""
+    stat_key = _stat_key(path)
+    with _lock:
+        entry = cache.get(key)
+        if entry is not None and entry.stat_key == stat_key:
+            _stats["hits"] += 1
+            return entry.value
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if entry is not None and entry.digest == digest:
+            entry.stat_key = stat_key
+            _stats["revalidated"] += 1
+            return entry.value
+        value = load(raw)
+        cache[key] = _Entry(stat_key=stat_key, digest=digest, value=value)
+        _stats["loads"] += 1
+        if entry is not None:
+            logger.info(f"[SOURCE_CACHE] Reloaded changed file: {path}")
+        return value
+
+
+def load_yaml_cached(path: Path) -> Any:
+    """Parse a YAML file (``utf-8-sig``), reusing the previous parse while unchanged.
+
+    Returns a deep copy so callers may mutate the result. Raises on read/parse
+    errors exactly like ``yaml.safe_load`` (failed parses are not cached).
+    """
+    path = Path(path)
+    if not _cache_enabled():
+        return yaml.safe_load(path.read_text(encoding="utf-8-sig"))
+    data = _lookup(
+        _yaml_cache,
+        str(path.resolve()),
+        path,
+        lambda raw: yaml.safe_load(raw.decode("utf-8-sig")),
+    )
+    return copy.deepcopy(data)
+
+
+def load_module_cached(module_name: str, path: Path) -> ModuleType:
+    """Execute a tool module once per file content and reuse it afterwards.
+
+    Modules are not registered in ``sys.modules``; each ``module_name`` gets its
+    own instance so namespaced loaders (agent tools vs lifecycle tools) never
+    share module state. Raises ImportError if no loader can be created.
+    """
+    path = Path(path)
+
+    def _exec(_raw: bytes) -> ModuleType:
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        if not spec or not spec.loader:
+            raise ImportError(f"Could not load spec for {path}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)  # type: ignore[attr-defined]
+        return module
+
+    if not _cache_enabled():
+        return _exec(b"")
+    return _lookup(_module_cache, (module_name, str(path.resolve())), path, _exec)
+
+
+def clear_source_cache(module_prefix: Optional[str] = None) -> int:
+    """Drop cached modules whose name starts with ``module_prefix`` (everything if None).
+
+    Parsed YAML is dropped only when clearing everything. Returns entries removed.
+    """
+    with _lock:
+        if module_prefix is None:
+            removed = len(_module_cache) + len(_yaml_cache)
+            _module_cache.clear()
+            _yaml_cache.clear()
+            return removed
+        stale = [key for key in _module_cache if key[0].startswith(module_prefix)]
+        for key in stale:
+            del _module_cache[key]
+        return len(stale)
+
+
+def get_source_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {"yaml_entries": len(_yaml_cache), "module_entries": len(_module_cache), **_stats}
+
+
+__all__ = [
+    "load_yaml_cached",
+    "load_module_cached",
+    "clear_source_cache",
+    "get_source_cache_stats",
+]
@@ -7,11 +7,13 @@
 import json
 import yaml
 import importlib
-from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Set
+from types import MappingProxyType
+from typing import Dict, Any, FrozenSet, List, Mapping, Optional, Tuple, Callable, Awaitable, Set
 from pathlib import Path
 from dataclasses import dataclass
 
 from logs.logging_config import get_workflow_logger
+from .source_cache import load_yaml_cached
 
 logger = get_workflow_logger(workflow_name="unified_workflow_manager")
 
@@ -38,6 +40,25 @@ class WorkflowInfo:
             'error': self.error
         }
 
+@dataclass(frozen=True)
+class WorkflowEventPolicy:
+    """Per-workflow agent flags used on the outbound event hot path.
+
+    Compiled once from the workflow config + UI tool registry (see
+    ``UnifiedWorkflowManager.get_event_policy``) so envelope building is a set
+    of O(1) lookups instead of re-walking the YAML-derived dicts per event.
+    """
+    hidden_triggers: Mapping[str, FrozenSet[str]]
+    auto_tool_agents: FrozenSet[str]
+    structured_agents: FrozenSet[str]
+    visual_agents: FrozenSet[str]
+    tool_agents: FrozenSet[str]
+
+    def is_hidden_trigger(self, agent_name: str, content: str) -> bool:
+        triggers = self.hidden_triggers.get(agent_name)
+        return bool(triggers) and content.strip() in triggers
+
+
 class UnifiedWorkflowManager:
     """Unified workflow manager focusing on config + UI tool metadata.
 
@@ -59,6 +80,7 @@ class UnifiedWorkflowManager:
         self.workflows_base_path = Path(workflows_base_path)
         self._workflows: Dict[str, WorkflowInfo] = {}
         self._config_cache: Dict[str, Dict[str, Any]] = {}
+        self._policy_cache: Dict[str, WorkflowEventPolicy] = {}
         self._ui_registry: Dict[str, Dict[str, Any]] = {}
         self._ui_tool_path_cache: Dict[str, str] = {}
         self._ui_loaded_workflows: set[str] = set()
@@ -363,6 +385,7 @@ class UnifiedWorkflowManager:
         normalized_name = workflow_name.lower()
         self._workflows[normalized_name] = workflow_info
         self._config_cache[normalized_name] = config
+        self._invalidate_event_policy(normalized_name)
         logger.info(f"Successfully loaded workflow: {workflow_name}")
         return workflow_info
     
@@ -561,6 +584,42 @@ class UnifiedWorkflowManager:
         reg = self.get_structured_output_registry(workflow_name)
         return {agent: (model is not None) for agent, model in reg.items()}
     
+    def get_event_policy(self, workflow_name: str) -> WorkflowEventPolicy:
+        """Return the compiled event policy for a workflow (built on first use after load)."""
+        policy = self._policy_cache.get(workflow_name)
+        if policy is None:
+            policy = self._compile_event_policy(workflow_name)
+            self._policy_cache[workflow_name] = policy
+        return policy
+
+    def _compile_event_policy(self, workflow_name: str) -> WorkflowEventPolicy:
+        tool_agents: Set[str] = set()
+        for tool in self.get_ui_tools(workflow_name).values():
+            for key in ('agent', 'caller'):
+                if isinstance(tool.get(key), str):
+                    tool_agents.add(tool[key])
+        return WorkflowEventPolicy(
+            hidden_triggers=MappingProxyType({
+                agent: frozenset(values)
+                for agent, values in self.get_ui_hidden_triggers(workflow_name).items()
+            }),
+            auto_tool_agents=frozenset(self.get_auto_tool_agents(workflow_name)),
+            structured_agents=frozenset(
+                agent for agent, flag in self.get_agent_structured_outputs_config(workflow_name).items() if flag
+            ),
+            visual_agents=frozenset(self.get_visual_agents(workflow_name)),
+            tool_agents=frozenset(tool_agents),
+        )
+
+    def _invalidate_event_policy(self, workflow_name: Optional[str] = None) -> None:
+        # Policies are keyed by the caller-supplied name; match case-insensitively like get_config.
+        if workflow_name is None:
+            self._policy_cache.clear()
+            return
+        normalized_name = workflow_name.lower()
+        for key in [k for k in self._policy_cache if k.lower() == normalized_name]:
+            self._policy_cache.pop(key, None)
+
     def get_all_workflow_names(self) -> List[str]:
         """Get list of all loaded workflow names"""
         return [info.name for info in self._workflows.values() if info.status == "loaded"]
@@ -572,6 +631,7 @@ class UnifiedWorkflowManager:
     def reload_workflow(self, workflow_name: str) -> Dict[str, Any]:
         """Hot-reload a workflow and its tools"""
         normalized_name = workflow_name.lower()
+        self._invalidate_event_policy(normalized_name)
         
         # Reload module if it exists
         if normalized_name in self._workflows:
@@ -610,6 +670,7 @@ class UnifiedWorkflowManager:
         
         if normalized_name in self._config_cache:
             del self._config_cache[normalized_name]
+        self._invalidate_event_policy(normalized_name)
         
         logger.info(f"Unloaded workflow: {workflow_name}")
     
@@ -722,6 +783,7 @@ class UnifiedWorkflowManager:
         logger.info("Refreshing all workflows...")
         self._workflows.clear()
         self._config_cache.clear()
+        self._invalidate_event_policy()
         self._hooks_loaded_workflows.clear()
         self._load_all_workflows()
         return self.get_status_summary()
@@ -745,9 +807,8 @@ class UnifiedWorkflowManager:
             return {}
         
         try:
-            with open(yaml_path, 'r', encoding='utf-8-sig') as f:
-                data = yaml.safe_load(f)
-                return data if isinstance(data, dict) else {}
+            data = load_yaml_cached(yaml_path)
+            return data if isinstance(data, dict) else {}
         except Exception as e:
             logger.error(f"Failed reading YAML {yaml_path}: {e}")
             return {}
@@ -964,6 +1025,7 @@ def initialize_workflows(base_path: str = "workflows") -> Dict[str, Dict[str, An
     new_manager.workflows_base_path = Path(base_path)
     new_manager._workflows = {}
     new_manager._config_cache = {}
+    new_manager._policy_cache = {}
     new_manager._initialized = False
     new_manager._load_all_workflows()
     new_manager._initialized = True
@@ -996,6 +1058,7 @@ def get_workflow_tools(workflow_name: str):
 __all__ = [
     "UnifiedWorkflowManager",
     "WorkflowInfo",
+    "WorkflowEventPolicy",
     "get_workflow_manager",
     "initialize_workflows",
     "workflow_manager",
@@ -0,0 +1,92 @@
+"""MozaiksAI microbenchmark: outbound event envelopes per second.
+
+Compares `UnifiedEventDispatcher.build_outbound_event_envelope` for text events
+with the compiled per-workflow event policy cached (current behaviour) against
+recompiling it for every event, which costs the same config walk the dispatcher
+used to do per event (get_ui_hidden_triggers, get_auto_tool_agents,
+get_agent_structured_outputs_config, get_visual_agents, get_ui_tools).
+
+A synthetic workflow config is injected into the workflow manager, so no
+workflows need to exist on disk. INFO logging is disabled while timing so the
+numbers reflect envelope work rather than log I/O.
+
+Usage:
+    python scripts/bench_event_envelope.py [--events 20000] [--agents 12]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+_WORKFLOW = "BenchEnvelopeWorkflow"
+
+
+def _synthetic_config(agent_count: int) -> Dict[str, Any]:
+    agents = {f"Agent{i}": {"auto_tool_mode": i % 4 == 0} for i in range(agent_count)}
+    triggers = [
+        {"agent": f"Agent{i}", "ui_hidden": True, "match": {"equals": "NEXT"}}
+        for i in range(0, agent_count, 3)
+    ]
+    return {
+        "agents": {"agents": agents},
+        "visual_agents": [f"Agent{i}" for i in range(0, agent_count, 2)],
+        "structured_outputs": {"registry": {f"Agent{i}": ("Model" if i % 2 else None) for i in range(agent_count)}},
+        "context_variables": {
+            "definitions": [
+                {"name": f"var{i}", "source": {"type": "state", "triggers": triggers}} for i in range(8)
+            ]
+        },
+    }
+
+
+def _run(dispatcher: Any, manager: Any, events: int, agent_count: int, *, cached: bool) -> float:
+    started = time.perf_counter()
+    for n in range(events):
+        if not cached:
+            manager._invalidate_event_policy(_WORKFLOW)
+        dispatcher.build_outbound_event_envelope(
+            raw_event={"kind": "text", "agent": f"Agent{(n % agent_count) | 1}", "content": f"message {n}"},
+            chat_id="bench_chat",
+            workflow_name=_WORKFLOW,
+        )
+    return events / (time.perf_counter() - started)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark outbound event envelope building.")
+    parser.add_argument("--events", type=int, default=20000, help="Envelopes built per run")
+    parser.add_argument("--agents", type=int, default=12, help="Agents in the synthetic workflow")
+    args = parser.parse_args(argv)
+
+    from mozaiksai.core.events.unified_event_dispatcher import UnifiedEventDispatcher
+    from mozaiksai.core.workflow.workflow_manager import workflow_manager
+
+    workflow_manager._config_cache[_WORKFLOW.lower()] = _synthetic_config(args.agents)
+    for i in range(0, args.agents, 5):
+        workflow_manager._ui_registry[f"bench_tool_{i}"] = {"workflow_name": _WORKFLOW, "agent": f"Agent{i}"}
+    dispatcher = UnifiedEventDispatcher()
+
+    logging.disable(logging.INFO)
+    try:
+        _run(dispatcher, workflow_manager, min(args.events, 1000), args.agents, cached=True)  # warm-up
+        before = _run(dispatcher, workflow_manager, args.events, args.agents, cached=False)
+        after = _run(dispatcher, workflow_manager, args.events, args.agents, cached=True)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print(f"events={args.events} agents={args.agents}")
+    print(f"per-event config walk (before): {before:12,.0f} envelopes/sec")
+    print(f"compiled event policy (after):  {after:12,.0f} envelopes/sec")
+    print(f"speedup: {after / before:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,153 @@
+"""MozaiksAI utility: move embedded ChatSessions.messages into ChatMessageBuckets.
+
+Companion to `CHAT_TRANSCRIPT_STORAGE=bucketed`. For each ChatSessions document
+that still carries a non-empty `messages` array, the transcript is re-sequenced
+positionally (sequence = index + 1, so replay indices seen by clients stay the
+same), written to `ChatMessageBuckets` in buckets of `--bucket-size` messages,
+and the embedded array is cleared.
+
+Safety goals (same as `clear_collections.py`):
+- Defaults to a dry run unless `--yes` is provided.
+- Refuses to touch non-local MongoDB hosts unless explicitly allowed.
+- Bucket writes are idempotent (deterministic _id, replace semantics), so an
+  interrupted run can simply be re-run.
+- Run it while the runtime is stopped (or before switching the runtime to
+  bucketed mode); live chats appending during the copy would be lost.
+
+This script intentionally avoids importing runtime modules; bucket id/shape
+must stay in sync with `persistence_manager.message_bucket_id`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from pymongo import MongoClient, ReplaceOne
+
+from clear_collections import (
+    _extract_hosts,
+    _get_mongo_uri,
+    _is_local_host,
+    _load_env,
+    _ping,
+    _resolve_database_name,
+)
+
+_SESSIONS_COLLECTION = "ChatSessions"
+_BUCKET_COLLECTION = "ChatMessageBuckets"
+
+
+def _bucket_id(chat_id: str, bucket: int) -> str:
+    return f"{chat_id}:{int(bucket):06d}"
+
+
+def _build_buckets(session: Dict[str, Any], bucket_size: int) -> List[Dict[str, Any]]:
+    chat_id = str(session["_id"])
+    now = datetime.now(timezone.utc)
+    buckets: Dict[int, Dict[str, Any]] = {}
+    messages = [m for m in session.get("messages") or [] if isinstance(m, dict)]
+    for position, message in enumerate(messages):
+        sequence = position + 1
+        original = message.get("sequence")
+        if original is not None and original != sequence:
+            message["legacy_sequence"] = original
+        message["sequence"] = sequence
+        bucket = (sequence - 1) // bucket_size
+        doc = buckets.setdefault(
+            bucket,
+            {
+                "_id": _bucket_id(chat_id, bucket),
+                "chat_id": chat_id,
+                "app_id": session.get("app_id"),
+                "bucket": bucket,
+                "seq_start": bucket * bucket_size + 1,
+                "seq_end": (bucket + 1) * bucket_size,
+                "count": 0,
+                "messages": [],
+                "created_at": now,
+                "last_updated_at": now,
+            },
+        )
+        doc["messages"].append(message)
+        doc["count"] += 1
+    return [buckets[b] for b in sorted(buckets)]
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Migrate embedded chat transcripts to ChatMessageBuckets.")
+    parser.add_argument("--database", default=None, help="Database name override (defaults to DB in URI)")
+    parser.add_argument("--bucket-size", type=int, default=200, help="Messages per bucket (match CHAT_MESSAGE_BUCKET_SIZE)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Sessions processed per cursor batch")
+    parser.add_argument("--keep-embedded", action="store_true", help="Do not clear ChatSessions.messages after copying")
+    parser.add_argument("--yes", action="store_true", help="Apply changes (otherwise dry run)")
+    parser.add_argument(
+        "--allow-nonlocal",
+        action="store_true",
+        help="Allow operating on non-local Mongo hosts (DANGEROUS).",
+    )
+    parser.add_argument("--timeout-ms", type=int, default=2000, help="Server selection timeout in ms (default: 2000)")
+
+    args = parser.parse_args(argv)
+    if args.bucket_size <= 0:
+        print("--bucket-size must be positive.")
+        return 1
+
+    _load_env()
+    mongo_uri = _get_mongo_uri()
+    if not mongo_uri:
+        print("MONGO_URI is not set; nothing to migrate.")
+        return 0
+
+    nonlocal_hosts = [h for h in _extract_hosts(mongo_uri) if not _is_local_host(h)]
+    if nonlocal_hosts and not args.allow_nonlocal:
+        print("Refusing to migrate non-local MongoDB host(s): " + ", ".join(nonlocal_hosts))
+        print("Set --allow-nonlocal only if you are 100% sure this is safe.")
+        return 2
+
+    db_name = _resolve_database_name(mongo_uri, args.database)
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=int(args.timeout_ms))
+    try:
+        _ping(client)
+    except Exception as e:
+        print(f"Could not connect to MongoDB ({e}); nothing migrated.")
+        return 4
+
+    db = client[db_name]
+    sessions = db[_SESSIONS_COLLECTION]
+    buckets = db[_BUCKET_COLLECTION]
+    if args.yes:
+        buckets.create_index([("chat_id", 1), ("seq_start", 1)], name="cmb_chat_seq", unique=True)
+
+    query = {"messages.0": {"$exists": True}}
+    migrated_sessions = 0
+    migrated_messages = 0
+    cursor = sessions.find(query, {"messages": 1, "app_id": 1, "last_sequence": 1}, batch_size=args.batch_size)
+    for session in cursor:
+        bucket_docs = _build_buckets(session, args.bucket_size)
+        count = sum(doc["count"] for doc in bucket_docs)
+        migrated_sessions += 1
+        migrated_messages += count
+        if not args.yes:
+            print(f"{session['_id']}: would move {count} messages into {len(bucket_docs)} bucket(s)")
+            continue
+        buckets.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in bucket_docs], ordered=True)
+        # last_sequence is reset to the positional count so new messages continue
+        # contiguously (bucketed mode reads index = sequence - 1).
+        update_fields: Dict[str, Any] = {"last_sequence": count, "transcript_storage": "bucketed"}
+        if not args.keep_embedded:
+            update_fields["messages"] = []
+        sessions.update_one({"_id": session["_id"]}, {"$set": update_fields})
+        print(f"{session['_id']}: moved {count} messages into {len(bucket_docs)} bucket(s)")
+
+    verb = "Migrated" if args.yes else "Dry run: would migrate"
+    print(f"{verb} {migrated_messages} messages across {migrated_sessions} sessions.")
+    if not args.yes:
+        print("Re-run with --yes to apply.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -24,6 +24,8 @@ from mozaiksai.core.core_config import get_mongo_client
 from mozaiksai.core.transport.simple_transport import SimpleTransport
 from mozaiksai.core.workflow.workflow_manager import workflow_status_summary, get_workflow_transport, get_workflow_tools
 from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
+from mozaiksai.core.data.persistence.write_behind import get_transcript_write_behind
+from mozaiksai.core.observability.event_trace import snapshot_event_traces
 from mozaiksai.core.data.themes.theme_manager import ThemeManager, ThemeResponse
 from mozaiksai.core.multitenant import build_app_scope_filter, coalesce_app_id
 from mozaiksai.core.artifacts.attachments import handle_chat_upload
@@ -318,6 +320,14 @@ async def health_active_runs(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/health/run-leases")
+async def health_run_leases(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return run leases held by this node and acquire/refuse/lost counters."""
+    from mozaiksai.core.data.persistence.run_lease import get_run_lease_manager
+    return get_run_lease_manager().snapshot()
+
 @app.get("/metrics/perf/aggregate")
 async def metrics_perf_aggregate(
     principal: UserPrincipal = Depends(require_any_auth),
@@ -340,6 +350,73 @@ async def metrics_perf_chats(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to collect chat metrics: {e}")
 
+@app.get("/metrics/persistence/write-behind")
+async def metrics_transcript_write_behind(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return transcript write-behind queue depth and flush lag (no DB hits)."""
+    try:
+        return get_transcript_write_behind().snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect write-behind metrics: {e}")
+
+@app.get("/metrics/events/trace")
+async def metrics_event_trace(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return hot-path event counters for the transport and dispatcher (no DB hits)."""
+    try:
+        return snapshot_event_traces()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect event trace metrics: {e}")
+
+@app.get("/metrics/transport/queues")
+async def metrics_transport_queues(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return per-connection outbound queue depth, coalesce and drop counters."""
+    try:
+        return simple_transport.get_outbound_queue_stats() if simple_transport else {}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect transport queue metrics: {e}")
+
+@app.get("/metrics/transport/replay-buffer")
+async def metrics_transport_replay_buffer(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return replay buffer size and memory-resume hit/miss counters."""
+    return simple_transport.get_replay_buffer_stats() if simple_transport else {}
+
+@app.get("/metrics/transport/timers")
+async def metrics_transport_timers(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return pending/fired counts of the shared transport timer wheel."""
+    return simple_transport.get_timer_stats() if simple_transport else {}
+
+@app.get("/metrics/transport/backplane")
+async def metrics_transport_backplane(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return the cross-node backplane backend, node id and message counters."""
+    return simple_transport.get_backplane_stats() if simple_transport else {}
+
+@app.get("/metrics/logging/queues")
+async def metrics_logging_queues(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return log queue depth and drop counters (queue logging mode)."""
+    from logs.logging_config import get_logging_queue_stats
+    return get_logging_queue_stats()
+
+@app.get("/metrics/context/data-reference-cache")
+async def metrics_data_reference_cache(
+    principal: UserPrincipal = Depends(require_any_auth),
+):
+    """Return hit/miss/eviction counters for the shared data_reference cache."""
+    from mozaiksai.core.workflow.context.db_adapters import get_data_reference_cache
+    return get_data_reference_cache().snapshot()
+
 @app.get("/metrics/perf/chats/{chat_id}")
 async def metrics_perf_chat(
     chat_id: str,
@@ -601,6 +678,12 @@ async def startup():
             )
             raise
 
+        # Cross-node routing for websockets / UI tool responses / input callbacks
+        await simple_transport.start_backplane()
+
+        # Ensure persistence indexes (session listing queries rely on them) before serving traffic
+        await persistence_manager.persistence._ensure_client()
+
         # Import workflow modules
         import_start = datetime.now(UTC)
         await _import_workflow_modules()
@@ -686,8 +769,22 @@ async def shutdown():
         _runtime_services = []
 
         if simple_transport:
-            # No explicit disconnect needed for websockets with this transport design
-            pass
+            # No explicit disconnect needed for websockets; just leave the backplane
+            try:
+                await simple_transport.stop_backplane()
+            except Exception as bp_err:
+                wf_logger.warning(f"BACKPLANE_STOP_FAILED: {bp_err}")
+
+        # Persist buffered usage deltas and write-behind transcript messages before the Mongo client goes away
+        try:
+            from mozaiksai.core.observability.realtime_token_logger import get_realtime_token_logger
+            await get_realtime_token_logger().flush_usage()
+        except Exception as flush_err:
+            wf_logger.warning(f"USAGE_FLUSH_FAILED: {flush_err}")
+        try:
+            await get_transcript_write_behind().flush_all()
+        except Exception as flush_err:
+            wf_logger.warning(f"TRANSCRIPT_FLUSH_FAILED: {flush_err}")
         
         if mongo_client:
             mongo_client.close()
@@ -1171,13 +1268,12 @@ async def list_chats(
 ):
     """List recent chat IDs for a given app and workflow."""
     try:
-        coll = await _chat_coll()
-        query: Dict[str, Any] = {"workflow_name": workflow_name, **build_app_scope_filter(app_id)}
-        if principal.user_id != "anonymous":
-            query["user_id"] = principal.user_id
-        cursor = coll.find(query).sort("created_at", -1)
-        docs = await cursor.to_list(length=20)
-        chat_ids = [doc.get("_id") for doc in docs]
+        chat_ids = await persistence_manager.list_workflow_chat_ids(
+            app_id=app_id,
+            workflow_name=workflow_name,
+            user_id=principal.user_id if principal.user_id != "anonymous" else None,
+            limit=20,
+        )
         return {"chat_ids": chat_ids}
     except Exception as e:
         logger.error(f"❌ Failed to list chats for app {app_id}, workflow {workflow_name}: {e}")
@@ -1229,15 +1325,8 @@ async def list_user_sessions(
     user_id = _validate_user_id_against_principal(principal, path_user_id=user_id)
     
     try:
-        from mozaiksai.core.data.models import WorkflowStatus
-        coll = await _chat_coll()
-        
-        # Find all IN_PROGRESS sessions for this user
-        sessions = await coll.find({
-            "user_id": user_id,
-            "status": int(WorkflowStatus.IN_PROGRESS),
-            **build_app_scope_filter(app_id),
-        }).sort("last_updated_at", -1).to_list(length=100)
+        # Find all IN_PROGRESS sessions for this user (summary projection only)
+        sessions = await persistence_manager.list_in_progress_sessions(app_id=app_id, user_id=user_id, limit=100)
         
         result = []
         for session in sessions:
@@ -1276,23 +1365,10 @@ async def get_most_recent_workflow_session(
     user_id = _validate_user_id_against_principal(principal, path_user_id=user_id)
     
     try:
-        from mozaiksai.core.data.models import WorkflowStatus
-        coll = await _chat_coll()
-
-        # Find all IN_PROGRESS sessions, sorted by last_updated_at descending (most recent first)
-        sessions = (
-            await coll.find(
-                {
-                    "user_id": user_id,
-                    "status": int(WorkflowStatus.IN_PROGRESS),
-                    **build_app_scope_filter(app_id),
-                }
-            )
-            .sort("last_updated_at", -1)
-            .to_list(length=100)
-        )
+        # Most recently updated IN_PROGRESS session (sort + limit(1) on the summary index)
+        recent = await persistence_manager.get_most_recent_in_progress_session(app_id=app_id, user_id=user_id)
 
-        if not sessions:
+        if recent is None:
             wf_logger.debug(f"[RECENT_SESSION] No IN_PROGRESS workflows for user {user_id}")
             return {
                 "found": False,
@@ -1300,8 +1376,6 @@ async def get_most_recent_workflow_session(
                 "workflow_name": None,
             }
 
-        recent = sessions[0]
-
         wf_logger.debug(
             f"[RECENT_SESSION] Returning most recent workflow {recent.get('workflow_name')} "
             f"chat_id={recent['_id']} for user {user_id}"
@@ -32,6 +32,167 @@ class TestWorkflowDiscovery:
             # Should have basic structure
             assert config is not None
 
+    def test_data_references_load_concurrently_after_dependencies(self, monkeypatch):
+        """Verify independent data_reference queries overlap and dependent ones see resolved values."""
+        import asyncio
+        from mozaiksai.core.workflow.context import variables
+        from mozaiksai.core.workflow.context.schema import ContextVariablesPlan
+
+        plan = ContextVariablesPlan.model_validate({"definitions": {
+            "a": {"source": {"type": "data_reference", "collection": "x", "fields": ["v"]}},
+            "b": {"source": {"type": "data_reference", "collection": "x", "fields": ["v"]}},
+            "c": {"source": {"type": "data_reference", "collection": "x", "fields": ["v"], "query_template": {"key": "{{a}}"}}},
+        }})
+        in_flight, queries = [0, 0], []
+
+        class _Adapter:
+            async def fetch_one(self, source, query, projection):
+                queries.append(query)
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+                await asyncio.sleep(0.01)
+                in_flight[0] -= 1
+                return {"v": f"value:{query.get('key', 'root')}"}
+
+        monkeypatch.setattr(variables, "_load_workflow_plan", lambda wf: (plan, {}))
+        monkeypatch.setattr(variables, "get_db_adapter", lambda source: _Adapter())
+        context = asyncio.run(variables._load_context_async("wf", "app"))
+
+        assert in_flight[1] == 2
+        assert context.get("c") == "value:value:root"
+        assert set(context._mozaiks_context_timings_ms) == {"a", "b", "c"}
+
+    def test_data_reference_cache_shared_until_entity_write(self, monkeypatch):
+        """Verify cache_ttl_sec lookups hit Mongo once and DataEntityManager writes invalidate them."""
+        import asyncio
+        from mozaiksai.core import core_config
+        from mozaiksai.core.workflow.context import data_entity, db_adapters
+        from mozaiksai.core.workflow.context.schema import ContextVariableSource
+
+        finds = []
+
+        class _Cursor:
+            def sort(self, *args):
+                return self
+
+            def limit(self, n):
+                return self
+
+            async def to_list(self, length):
+                return [{"_id": 1, "plan": "pro"}]
+
+        class _Collection:
+            def find(self, query, projection):
+                finds.append(query)
+                return _Cursor()
+
+            async def insert_one(self, doc):
+                return None
+
+        client = {"db": {"apps": _Collection()}}
+        monkeypatch.setattr(core_config, "get_mongo_client", lambda: client)
+        monkeypatch.setattr(data_entity, "get_mongo_client", lambda: client)
+        monkeypatch.setattr(db_adapters, "_data_reference_cache", db_adapters.DataReferenceCache(max_entries=1))
+        source = ContextVariableSource(type="data_reference", database_name="db", collection="apps", cache_ttl_sec=60)
+        adapter = db_adapters.MongoAdapter()
+
+        async def _run():
+            first = await adapter.fetch_one(source, {"app_id": "a"}, None)
+            first["plan"] = "mutated"
+            second = await adapter.fetch_one(source, {"app_id": "a"}, None)
+            await data_entity.DataEntityManager(database_name="db", collection="apps").create({"app_id": "a"})
+            await adapter.fetch_one(source, {"app_id": "a"}, None)
+            await adapter.fetch_one(source, {"app_id": "b"}, None)
+            return second
+
+        assert asyncio.run(_run())["plan"] == "pro"
+        assert finds == [{"app_id": "a"}, {"app_id": "a"}, {"app_id": "b"}]
+        stats = db_adapters.get_data_reference_cache().snapshot()
+        assert (stats["hits"], stats["invalidations"], stats["evictions"], stats["size"]) == (1, 1, 1, 1)
+
+    def test_schema_overview_introspects_once_and_unions_types(self, monkeypatch):
+        """Verify schema overview and first docs share one cached, multi-document introspection."""
+        import asyncio
+        from mozaiksai.core import core_config
+        from mozaiksai.core.workflow.context import variables
+
+        calls = {"list": 0, "find": 0}
+        docs = {"apps": [{"_id": 1, "app_id": "a", "name": "x"}, {"_id": 2, "app_id": "b", "name": None}], "empty": []}
+
+        class _Cursor:
+            def __init__(self, items):
+                self._items = items
+
+            def limit(self, n):
+                return _Cursor(self._items[:n])
+
+            async def to_list(self, length):
+                return list(self._items)
+
+        class _Collection:
+            def __init__(self, name):
+                self._name = name
+
+            def find(self):
+                calls["find"] += 1
+                return _Cursor(docs[self._name])
+
+        class _Db:
+            async def list_collection_names(self):
+                calls["list"] += 1
+                return list(docs)
+
+            def __getitem__(self, name):
+                return _Collection(name)
+
+        monkeypatch.setattr(core_config, "get_mongo_client", lambda: {"db": _Db()})
+        monkeypatch.setattr(variables, "SCHEMA_SAMPLE_SIZE", 2)
+        variables.clear_schema_cache()
+
+        async def _run():
+            return await asyncio.gather(
+                variables._get_database_schema_async("db"),
+                variables._get_all_collections_first_docs("db"),
+                variables._get_database_schema_async("db"),
+            )
+
+        try:
+            overview, first_docs, _ = asyncio.run(_run())
+            asyncio.run(variables._get_all_collections_first_docs("db"))
+        finally:
+            variables.clear_schema_cache()
+
+        assert calls == {"list": 1, "find": 2}
+        assert "APPS [app-specific]:" in overview["schema_overview"]
+        assert "- name: str | NoneType" in overview["schema_overview"]
+        assert first_docs == {"apps": {"app_id": "a", "name": "x"}, "empty": {"_note": "empty_collection"}}
+
+    def test_source_cache_reuses_unchanged_files(self, tmp_path):
+        """Verify YAML/tool modules are reused until their content changes."""
+        import os
+        from mozaiksai.core.workflow import source_cache
+
+        tool = tmp_path / "tool.py"
+        tool.write_text("import itertools\nCOUNTER = itertools.count()\nVALUE = 1\n")
+        config = tmp_path / "tools.yaml"
+        config.write_text("tools: [a]\n")
+        source_cache.clear_source_cache()
+        try:
+            first = source_cache.load_module_cached("mozaiks_test_tool", tool)
+            assert source_cache.load_module_cached("mozaiks_test_tool", tool) is first
+            os.utime(tool, ns=(1, 1))  # touched, content unchanged
+            assert source_cache.load_module_cached("mozaiks_test_tool", tool) is first
+
+            tool.write_text("VALUE = 2\n")
+            assert source_cache.load_module_cached("mozaiks_test_tool", tool).VALUE == 2
+
+            parsed = source_cache.load_yaml_cached(config)
+            parsed["tools"].append("mutated")
+            assert source_cache.load_yaml_cached(config) == {"tools": ["a"]}
+            assert source_cache.clear_source_cache("mozaiks_test_") == 1
+        finally:
+            source_cache.clear_source_cache()
+
 
 class TestRuntimeExtensions:
     """Test runtime extension loading."""
@@ -53,6 +214,74 @@ class TestRuntimeExtensions:
         assert "on_complete" in hooks
         assert "on_fail" in hooks
 
+    def test_startup_dag_orders_stages_and_cancels_siblings(self):
+        """Verify start-up stages respect dependencies, record durations and cancel siblings on failure."""
+        import asyncio
+        from mozaiksai.core.workflow.orchestration_patterns import _run_startup_dag
+
+        log, recorded, cancelled = [], {}, []
+
+        class _Perf:
+            async def record_startup_stage(self, chat_id, stage, duration_ms):
+                recorded[stage] = duration_ms
+
+        def _stages(fail_context=False):
+            async def resume_or_initialize():
+                log.append("session:start")
+                await asyncio.sleep(0.02)
+                log.append("session:end")
+                return ["resumed"], ["initial"]
+
+            async def cache_seed():
+                log.append("seed")
+                return 7
+
+            async def llm_config(seed):
+                log.append(f"llm:{seed}")
+                return {"cache_seed": seed}
+
+            async def extra_context():
+                log.append("extra")
+                try:
+                    await asyncio.sleep(0.05 if fail_context else 0)
+                except asyncio.CancelledError:
+                    cancelled.append("extra_context")
+                    raise
+                return {"parent_chat_id": "p"}
+
+            async def build_context():
+                log.append("context:start")
+                await asyncio.sleep(0.03 if fail_context else 0)
+                if fail_context:
+                    raise RuntimeError("context failed")
+                return {"ctx": True}
+
+            return dict(
+                chat_id="c1",
+                perf_mgr=_Perf(),
+                resume_or_initialize=resume_or_initialize,
+                cache_seed=cache_seed,
+                llm_config=llm_config,
+                extra_context=extra_context,
+                preload_structured_outputs=lambda: log.append("structured_outputs"),
+                build_context=build_context,
+            )
+
+        results, stage_ms = asyncio.run(_run_startup_dag(**_stages()))
+        assert results == (["resumed"], ["initial"], 7, {"cache_seed": 7}, {"parent_chat_id": "p"}, {"ctx": True})
+        # Context build overlaps the session branch; seed, LLM config and extra context wait for it.
+        assert log.index("context:start") < log.index("session:end")
+        for stage in ("seed", "llm:7", "extra"):
+            assert log.index("session:end") < log.index(stage)
+        assert log.index("seed") < log.index("llm:7")
+        expected = {"resume_or_initialize", "cache_seed", "llm_config", "extra_context", "structured_outputs", "context"}
+        assert set(recorded) == set(stage_ms) == expected
+        assert recorded["context"] == stage_ms["context"] < recorded["resume_or_initialize"]
+
+        with pytest.raises(RuntimeError, match="context failed"):
+            asyncio.run(_run_startup_dag(**_stages(fail_context=True)))
+        assert cancelled == ["extra_context"]
+
 
 class TestEventSystem:
     """Test event dispatching."""
@@ -68,6 +297,49 @@ class TestEventSystem:
         dispatcher = UnifiedEventDispatcher()
         assert dispatcher is not None
 
+    def test_envelope_uses_compiled_event_policy(self):
+        """Verify envelope flags come from the compiled workflow policy and reload invalidates it."""
+        from mozaiksai.core.events.unified_event_dispatcher import UnifiedEventDispatcher
+        from mozaiksai.core.workflow.workflow_manager import workflow_manager
+
+        workflow_manager._config_cache["policytestwf"] = {
+            "agents": {"Auto": {"auto_tool_mode": True}, "Viz": {}},
+            "visual_agents": ["Viz"],
+            "context_variables": {"definitions": [
+                {"name": "v", "source": {"type": "state", "triggers": [
+                    {"agent": "Viz", "ui_hidden": True, "match": {"equals": "NEXT"}},
+                ]}},
+            ]},
+        }
+        dispatcher = UnifiedEventDispatcher()
+        build = lambda agent, content: dispatcher.build_outbound_event_envelope(
+            raw_event={"kind": "text", "agent": agent, "content": content}, chat_id="c1", workflow_name="PolicyTestWf",
+        )["data"]
+
+        assert build("Viz", "hello")["is_visual"] is True
+        assert build("Viz", " NEXT ").get("_mozaiks_hide") is True
+        assert build("Auto", "hi").get("_mozaiks_hide") is True
+        policy = workflow_manager.get_event_policy("PolicyTestWf")
+        assert workflow_manager.get_event_policy("PolicyTestWf") is policy
+
+        workflow_manager.unload_workflow("PolicyTestWf")
+        assert workflow_manager.get_event_policy("PolicyTestWf") is not policy
+        assert build("Viz", "hello")["is_visual"] is False
+
+    def test_event_trace_counts_without_sampling(self):
+        """Verify the trace channel counts events and only samples when enabled."""
+        from mozaiksai.core.observability.event_trace import EventTrace
+
+        off = EventTrace("test_off", sample_rate=0.0)
+        off.count("events_in")
+        off.count("events_in")
+        assert off.sampled() is False
+        assert off.snapshot() == {"sample_rate": 0.0, "counters": {"events_in": 2}}
+
+        on = EventTrace("test_on", sample_rate=1.0)
+        on.logger.setLevel("INFO")
+        assert on.sampled() is True
+
 
 class TestPersistence:
     """Test persistence layer (requires MongoDB)."""
@@ -80,3 +352,519 @@ class TestPersistence:
         """Verify persistence manager can be imported."""
         from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
         assert AG2PersistenceManager is not None
+
+    def test_message_bucket_addressing(self):
+        """Verify transcript bucket numbering for bucketed storage."""
+        from mozaiksai.core.data.persistence.persistence_manager import message_bucket_id, message_bucket_index
+
+        assert message_bucket_index(1, 200) == 0
+        assert message_bucket_index(200, 200) == 0
+        assert message_bucket_index(201, 200) == 1
+        assert message_bucket_id("chat_1", 3) == "chat_1:000003"
+
+    def test_bucketed_append_requires_chat_session(self):
+        """Verify bucketed appends reserve sequences only for existing chats and never upsert orphan buckets."""
+        import asyncio
+        from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
+
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        db = mongomock_motor.AsyncMongoMockClient()["MozaiksAI"]
+        pm = AG2PersistenceManager()
+        pm.transcript_mode = "bucketed"
+
+        async def _coll():
+            return db["ChatSessions"]
+
+        bucket_writes = []
+
+        class _Buckets:
+            async def bulk_write(self, operations, ordered=True):
+                bucket_writes.extend(op._filter["_id"] for op in operations)
+
+        async def _bucket_coll():
+            return _Buckets()
+
+        pm._coll = _coll
+        pm._message_bucket_coll = _bucket_coll
+
+        async def _run():
+            missing = await pm.append_sequenced_messages(chat_id="ghost", app_id="app", messages=[{"role": "user", "content": "x"}])
+            await pm.append_chat_messages(chat_id="ghost", app_id="app", messages=[{"role": "user", "content": "y"}])
+            await db["ChatSessions"].insert_one({"_id": "c", "app_id": "app", "last_sequence": 2})
+            batch = [{"role": "user", "content": "z"}]
+            present = await pm.append_sequenced_messages(chat_id="c", app_id="app", messages=batch)
+            # A retry of the same batch reuses its reserved sequence instead of reserving another.
+            retried = await pm.append_sequenced_messages(chat_id="c", app_id="app", messages=batch)
+            session = await db["ChatSessions"].find_one({"_id": "c"})
+            return missing, present, retried, session["last_sequence"]
+
+        missing, present, retried, last_sequence = asyncio.run(_run())
+        assert missing == [] and present == retried == [3] and last_sequence == 3
+        assert bucket_writes == ["c:000000", "c:000000"]
+
+    def test_sequenced_append_single_round_trip(self, monkeypatch):
+        """Verify sequence reservation and append share one update and workflow names are LRU-cached."""
+        import asyncio
+        from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
+
+        calls = {"update": [], "find_one": []}
+        session = {"last_sequence": 4}
+
+        class _Coll:
+            async def find_one_and_update(self, flt, pipeline, projection=None, return_document=None):
+                calls["update"].append(pipeline)
+                session["last_sequence"] += len(pipeline[0]["$set"]["messages"]["$concatArrays"][1])
+                return {"last_sequence": session["last_sequence"]}
+
+            async def find_one(self, flt, projection=None):
+                calls["find_one"].append(flt["_id"])
+                return {"workflow_name": f"wf_{flt['_id']}"}
+
+        pm = AG2PersistenceManager()
+        pm.transcript_mode = "embedded"
+        monkeypatch.setattr(pm, "_WORKFLOW_NAME_CACHE_MAX", 2)
+
+        async def _coll():
+            return _Coll()
+
+        pm._coll = _coll
+        messages = [{"role": "user", "content": "$foo"}, {"role": "assistant", "content": "hi"}]
+
+        async def _run():
+            seqs = await pm.append_sequenced_messages(chat_id="c", app_id="app", messages=messages)
+            names = [await pm._chat_workflow_name(cid, "app") for cid in ("a", "b", "a", "c", "b")]
+            return seqs, names
+
+        seqs, names = asyncio.run(_run())
+        assert seqs == [5, 6] and [m["sequence"] for m in messages] == [5, 6]
+        assert len(calls["update"]) == 1
+        entry = calls["update"][0][0]["$set"]["messages"]["$concatArrays"][1][0]
+        assert entry["$mergeObjects"][0] == {"$literal": {"role": "user", "content": "$foo"}}
+        assert names == ["wf_a", "wf_b", "wf_a", "wf_c", "wf_b"]
+        # "b" was least recently used when "c" arrived, so only it is fetched again.
+        assert calls["find_one"] == ["a", "b", "c", "b"]
+        assert list(pm._workflow_name_cache) == ["c", "b"]
+
+    def test_session_summaries_match_full_document_queries(self):
+        """Verify projected session listings and grouped statuses match the full-document results."""
+        import asyncio
+        from datetime import datetime, timedelta, timezone
+        from mozaiksai.core.data.models import WorkflowStatus
+        from mozaiksai.core.data.persistence.persistence_manager import AG2PersistenceManager
+
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        coll = mongomock_motor.AsyncMongoMockClient()["MozaiksAI"]["ChatSessions"]
+        t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        in_progress, completed = int(WorkflowStatus.IN_PROGRESS), int(WorkflowStatus.COMPLETED)
+        docs = [
+            ("c1", "Build", completed, 0, 5),
+            ("c2", "Build", in_progress, 2, 3),
+            ("c3", "Review", in_progress, 1, 9),
+            ("c4", "Review", completed, 3, 4),
+            ("c5", None, in_progress, 4, 1),
+            ("c6", "Deploy", in_progress, 5, 7),
+        ]
+
+        pm = AG2PersistenceManager()
+
+        async def _coll():
+            return coll
+
+        pm._coll = _coll
+
+        async def _run():
+            for chat_id, wf, status, created, updated in docs:
+                doc = {
+                    "_id": chat_id, "app_id": "app1", "user_id": "u1", "status": status,
+                    "created_at": t0 + timedelta(minutes=created),
+                    "last_updated_at": t0 + timedelta(minutes=updated),
+                    "messages": [{"role": "user", "content": "x"}],
+                }
+                if wf:
+                    doc["workflow_name"] = wf
+                else:
+                    doc["workflow"] = "Legacy"
+                await coll.insert_one(doc)
+            await coll.insert_one({"_id": "other", "app_id": "app2", "user_id": "u1", "workflow_name": "Build",
+                                   "status": in_progress, "created_at": t0 + timedelta(hours=1), "last_updated_at": t0})
+            full = await coll.find({"user_id": "u1", "status": in_progress, "app_id": "app1"}).sort("last_updated_at", -1).to_list(length=100)
+            by_created = await coll.find({"user_id": "u1", "app_id": "app1"}).sort("created_at", -1).to_list(length=None)
+            listed = await pm.list_in_progress_sessions(app_id="app1", user_id="u1")
+            recent = await pm.get_most_recent_in_progress_session(app_id="app1", user_id="u1")
+            statuses = await pm.get_user_workflow_statuses(app_id="app1", user_id="u1")
+            return full, by_created, listed, recent, statuses
+
+        full, by_created, listed, recent, statuses = asyncio.run(_run())
+        summary_keys = ("_id", "workflow_name", "status", "created_at", "last_updated_at")
+        assert [{k: d.get(k) for k in summary_keys} for d in listed] == [{k: d.get(k) for k in summary_keys} for d in full]
+        assert all("messages" not in d for d in listed)
+        assert recent["_id"] == full[0]["_id"] == "c3"
+        # Previous behavior: newest session per workflow, keyed by workflow_name or legacy workflow field.
+        latest = {}
+        for d in by_created:
+            latest.setdefault(d.get("workflow_name") or d.get("workflow"), d["_id"])
+        assert {wf: s["chat_id"] for wf, s in statuses.items()} == latest
+        assert statuses["Review"]["status"] == "completed"
+
+    def test_write_behind_preserves_order(self):
+        """Verify write-behind batches flush in enqueue order."""
+        import asyncio
+        from mozaiksai.core.data.persistence.write_behind import TranscriptWriteBehind
+
+        batches = []
+
+        async def flush_fn(chat_id, app_id, messages):
+            batches.append([m["n"] for m in messages])
+            return list(range(len(messages)))
+
+        async def scenario():
+            wb = TranscriptWriteBehind(batch_size=3, flush_interval_ms=1000, max_pending=10)
+            for n in range(7):
+                await wb.enqueue(chat_id="c1", app_id="a1", message={"n": n}, flush_fn=flush_fn)
+            await wb.flush("c1")
+            return wb.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        assert [n for batch in batches for n in batch] == list(range(7))
+        assert max(len(batch) for batch in batches) <= 3
+        assert snapshot["flushed_messages"] == 7
+        assert snapshot["pending_total"] == 0
+
+    def test_write_behind_retries_only_unapplied_errors(self):
+        """Verify failed flushes are retried only when nothing can have been written."""
+        import asyncio
+        from pymongo.errors import NetworkTimeout, ServerSelectionTimeoutError
+        from mozaiksai.core.data.persistence.write_behind import TranscriptWriteBehind
+
+        errors = {"c1": [ServerSelectionTimeoutError("no primary")], "c2": [NetworkTimeout("timed out")]}
+        calls = []
+
+        async def flush_fn(chat_id, app_id, messages):
+            calls.append(chat_id)
+            if errors[chat_id]:
+                raise errors[chat_id].pop(0)
+            return [1]
+
+        async def scenario():
+            wb = TranscriptWriteBehind(batch_size=1, flush_interval_ms=1000, max_pending=10)
+            for chat_id in ("c1", "c2"):
+                await wb.enqueue(chat_id=chat_id, app_id="a1", message={"n": 0}, flush_fn=flush_fn)
+                await wb.flush(chat_id)
+            return wb.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        # c1 never reached a server and is retried; c2 may have been applied, so it is not resent.
+        assert calls == ["c1", "c1", "c2"]
+        assert snapshot["flushed_messages"] == 1 and snapshot["failed_batches"] == 1
+
+    def test_run_lease_single_holder_and_fencing(self, monkeypatch):
+        """Verify one holder per chat, takeover after expiry and fenced writes from the old holder."""
+        import asyncio
+        from datetime import datetime, timezone
+        from mozaiksai.core.data.persistence import run_lease
+        from mozaiksai.core.data.persistence.run_lease import RunLeaseManager
+
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        client = mongomock_motor.AsyncMongoMockClient()
+        node_a = RunLeaseManager(client=client, node_id="a", ttl_sec=30)
+        node_b = RunLeaseManager(client=client, node_id="b", ttl_sec=30)
+        sessions = client["MozaiksAI"]["ChatSessions"]
+
+        async def _fenced_match(manager):
+            monkeypatch.setattr(run_lease, "_run_lease_manager", manager)
+            return await sessions.find_one({"_id": "c", **run_lease.fence_filter("c")})
+
+        async def _run():
+            await sessions.insert_one({"_id": "c", "last_sequence": 0})
+            first = await node_a.acquire("c")
+            refused = await node_b.acquire("c")
+            # Node a stalls past expiry; node b takes over with a larger token.
+            await client["MozaiksAI"]["ChatRunLeases"].update_one({"_id": "c"}, {"$set": {"expires_at": datetime.now(timezone.utc)}})
+            second = await node_b.acquire("c")
+            still_held = await node_a.renew(first)
+            return first, refused, second, still_held, await _fenced_match(node_a), await _fenced_match(node_b)
+
+        first, refused, second, still_held, stale, current = asyncio.run(_run())
+        assert first.token == 1 and refused is None
+        assert second.token == 2 and not still_held
+        assert stale is None and current is not None
+
+        # The lost run ends: its token fences stragglers for one TTL, then is dropped.
+        first.lost = True
+        asyncio.run(node_a.release(first))
+        assert node_a.fence_token("c") == 1
+        clock = run_lease.time.monotonic() + 31
+        monkeypatch.setattr(run_lease.time, "monotonic", lambda: clock)
+        assert node_a.fence_token("c") is None and node_a.snapshot()["fenced_lost"] == 0
+
+    def test_rollup_averages_derived_from_totals(self):
+        """Verify rollup averages are derived from running totals on read."""
+        from mozaiksai.core.data.models import WorkflowSummaryDoc
+
+        summary = WorkflowSummaryDoc.model_validate({
+            "_id": "mon_app_wf",
+            "app_id": "app",
+            "workflow_name": "wf",
+            "totals": {"n": 4, "prompt_tokens": 400, "completion_tokens": 200, "total_tokens": 600, "cost_total_usd": 2.0, "duration_sec": 10.0},
+            "agents": {"planner": {"totals": {"n": 2, "prompt_tokens": 100}}},
+        })
+        assert summary.overall_avg.avg_prompt_tokens == 100
+        assert summary.overall_avg.avg_cost_total_usd == 0.5
+        assert summary.overall_avg.avg_duration_sec == 2.5
+        assert summary.agents["planner"].avg.avg_prompt_tokens == 50
+
+    def test_usage_deltas_aggregated_until_flush(self):
+        """Verify realtime usage deltas are buffered per chat/agent and flushed as one write."""
+        import asyncio
+        from datetime import datetime, timezone
+        from mozaiksai.core.observability.performance_manager import PerformanceConfig
+        from mozaiksai.core.observability.realtime_token_logger import RealtimeTokenLogger, _RunContext
+
+        writes = []
+
+        async def scenario():
+            rt = RealtimeTokenLogger(PerformanceConfig(flush_interval_sec=60, usage_flush_max_events=10))
+
+            async def record(**kwargs):
+                await asyncio.sleep(0.05)
+                writes.append(kwargs)
+
+            rt._record_agent_metrics = record
+            run = rt._runs["c1"] = _RunContext(chat_id="c1", workflow_name="wf", app_id="a1", user_id="u1")
+            def buffer(n):
+                for _ in range(n):
+                    rt._buffer_usage(
+                        run,
+                        invocation_id=f"inv{rt.pending_usage_events()}", agent_name="planner", prompt_tokens=10, completion_tokens=5,
+                        cost=0.01, duration_sec=0.5, model_name="m", event_ts=datetime.now(timezone.utc), cached=False,
+                    )
+
+            buffer(3)
+            assert writes == [] and rt.pending_usage_events() == 3
+
+            # A chat run that flushed earlier must not be awaited (or cancelled) by other flushers.
+            async def chat_run():
+                await rt.flush_usage("c1")
+                await asyncio.sleep(10)
+
+            orchestration = asyncio.create_task(chat_run())
+            await asyncio.sleep(0.01)  # chat_run's flush is now in flight
+            await asyncio.wait_for(rt.flush_usage(), timeout=1)
+            buffer(1)
+            orchestration2 = asyncio.create_task(chat_run())
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(rt.flush_usage())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await asyncio.sleep(0.01)
+            assert not orchestration.done() and not orchestration2.done()
+            await rt.flush_usage()  # waits for orchestration2's in-flight flush only
+            orchestration.cancel()
+            orchestration2.cancel()
+
+        asyncio.run(scenario())
+        assert len(writes) == 2
+        assert writes[0]["prompt_tokens"] == 30 and writes[0]["completion_tokens"] == 15
+        assert writes[0]["chat_id"] == "c1" and writes[0]["agent_name"] == "planner"
+        assert writes[0]["invocation_ids"] == ["inv0", "inv1", "inv2"] and writes[0]["event_count"] == 3
+
+    def test_concurrent_runs_attribute_usage_to_own_chat(self):
+        """Verify parallel runs sharing the realtime logger meter into their own chat."""
+        import asyncio
+        from mozaiksai.core.observability.performance_manager import PerformanceConfig
+        from mozaiksai.core.observability.realtime_token_logger import RealtimeTokenLogger
+
+        rt = RealtimeTokenLogger(PerformanceConfig(flush_interval_sec=60, usage_flush_max_events=100))
+        response = {"usage": {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}, "model": "m"}
+
+        async def run(chat_id, calls):
+            # Each gathered task gets its own context copy, so runs interleave without cleanup.
+            rt.begin_run(chat_id=chat_id, workflow_name="wf", app_id="a1", user_id="u1")
+            for _ in range(calls):
+                await asyncio.sleep(0)
+                rt.log_chat_completion(None, 0, 0, None, {}, response, 0, 0.0, "")
+
+        async def scenario():
+            return await asyncio.gather(run("c1", 2), run("c2", 5))
+
+        asyncio.run(scenario())
+        totals = {k[2]: p.prompt_tokens for k, p in rt._pending.items()}
+        assert totals == {"c1": 14, "c2": 35}
+
+    def test_pack_availability_single_query_and_invalidation(self, monkeypatch):
+        """Verify availability resolves all gates from one cached query, dropped on run_complete."""
+        import asyncio
+        from mozaiksai.core.workflow.pack import gating
+
+        pack = {"workflows": [{"id": "A"}, {"id": "B"}, {"id": "C"}], "gates": [
+            {"from": "A", "to": "B", "gating": "required"},
+            {"from": "B", "to": "C", "gating": "required"},
+        ]}
+        monkeypatch.setattr(gating, "load_pack_config", lambda: pack)
+        completed = [{"_id": "A"}]
+        calls = []
+
+        class _Cursor:
+            async def to_list(self, length=None):
+                return list(completed)
+
+        class _Coll:
+            def aggregate(self, pipeline):
+                calls.append(pipeline)
+                return _Cursor()
+
+        class _PM:
+            async def _coll(self):
+                return _Coll()
+
+        def available():
+            rows = asyncio.run(gating.list_workflow_availability(app_id="app", user_id="u", persistence=_PM()))
+            return {r["workflow_name"]: r["available"] for r in rows}
+
+        gating.invalidate_pack_gating_cache()
+        assert available() == {"A": True, "B": True, "C": False}
+        completed.append({"_id": "B"})
+        assert available()["C"] is False and len(calls) == 1
+        gating.handle_run_complete({"app_id": "app", "user_id": "u", "status": "completed"})
+        assert available()["C"] is True and len(calls) == 2
+
+
+class TestAuth:
+    """Test JWT validation caching."""
+
+    def test_verified_token_cache_honors_rotation(self, monkeypatch):
+        """Verify repeat tokens skip signature checks until their kid is rotated out."""
+        import asyncio
+        import json
+        import time
+        import jwt
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from mozaiksai.core.auth import jwks, jwt_validator
+        from mozaiksai.core.auth.config import AuthConfig
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwk["kid"] = "k1"
+        config = AuthConfig(issuer_override="iss", jwks_url_override="http://jwks", audience="aud", required_scope="")
+
+        client = jwks.JWKSClient(jwks_url="http://jwks", cache_ttl=60)
+        client._keys_by_kid = {"k1": jwk}
+        client._cache = jwks.CachedJWKS(keys={}, fetched_at=time.time(), ttl_seconds=60, source_url="http://jwks")
+        monkeypatch.setattr(jwks, "_jwks_client", client)
+
+        decodes = []
+        real_decode = jwt.decode
+        monkeypatch.setattr(jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+        token = jwt.encode(
+            {"sub": "u1", "iss": "iss", "aud": "aud", "exp": int(time.time()) + 300},
+            private_key, algorithm="RS256", headers={"kid": "k1"},
+        )
+        validator = jwt_validator.JWTValidator(config)
+        assert asyncio.run(validator.validate_token(token)).user_id == "u1"
+        assert asyncio.run(validator.validate_token(token)).user_id == "u1"
+        assert len(decodes) == 1
+
+        async def no_keys(force=False):
+            client._keys_by_kid = {}
+
+        client._keys_by_kid = {}
+        monkeypatch.setattr(client, "_fetch_keys", no_keys)
+        with pytest.raises(jwt_validator.AuthError):
+            asyncio.run(validator.validate_token(token))
+
+    def test_jwks_stale_while_revalidate_against_stub_idp(self):
+        """Verify JWKS refresh never blocks callers once loaded and unknown kids refetch once."""
+        import asyncio
+        import time
+        from aiohttp import web
+        from mozaiksai.core.auth.jwks import JWKSClient
+
+        idp = {"fetches": 0, "delay": 0.0, "status": 200, "kids": ["k1"]}
+
+        async def jwks_handler(request):
+            idp["fetches"] += 1
+            await asyncio.sleep(idp["delay"])
+            if idp["status"] != 200:
+                return web.Response(status=idp["status"])
+            return web.json_response({"keys": [{"kid": kid, "kty": "RSA"} for kid in idp["kids"]]})
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/jwks", jwks_handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            try:
+                client = JWKSClient(jwks_url=f"http://127.0.0.1:{port}/jwks", cache_ttl=100)
+                assert await client.get_signing_key("k1")
+                assert idp["fetches"] == 1
+
+                # Past the refresh-ahead point with a slow IdP: callers are served from cache.
+                idp["delay"] = 0.3
+                client._cache.fetched_at = time.time() - 90
+                started = time.perf_counter()
+                keys = await asyncio.gather(*(client.get_signing_key("k1") for _ in range(10)))
+                assert all(keys) and time.perf_counter() - started < 0.2
+                await asyncio.sleep(0.5)
+                assert idp["fetches"] == 2
+
+                # Expired within the grace window and the IdP failing: stale keys are served.
+                idp.update(delay=0.0, status=500)
+                client._cache.fetched_at = time.time() - 200
+                assert await client.get_signing_key("k1")
+                await asyncio.sleep(0.1)
+                assert idp["fetches"] == 3 and client.has_key("k1")
+
+                # Rotation: concurrent requests for a new kid share one refetch.
+                idp.update(status=200, kids=["k1", "k2"])
+                keys = await asyncio.gather(*(client.get_signing_key("k2") for _ in range(5)))
+                assert all(keys) and idp["fetches"] == 4
+            finally:
+                await runner.cleanup()
+
+        asyncio.run(scenario())
+
+
+class TestLogging:
+    """Test the queue-based logging pipeline."""
+
+    def test_queue_handler_drops_when_full_and_formats_on_listener(self):
+        """Verify bounded log queues count drops and agent blocks are rendered by the formatter."""
+        import logging
+        from logs.logging_config import AgentConversationFormatter, DroppingQueueHandler
+
+        qh = DroppingQueueHandler("test", maxsize=2)
+        log = logging.getLogger("test.queue_mode")
+        log.propagate = False
+        log.addHandler(qh)
+        try:
+            for n in range(5):
+                log.warning("message %s", n)
+        finally:
+            log.removeHandler(qh)
+        assert qh.snapshot()["enqueued"] == 2
+        assert qh.snapshot()["dropped_by_level"] == {"WARNING": 3}
+
+        # WARNING+ records evict queued lower-level records instead of being dropped.
+        severe = DroppingQueueHandler("test_severe", maxsize=2, block_sec=0.01)
+        log.addHandler(severe)
+        try:
+            log.setLevel(logging.DEBUG)
+            log.info("info 0")
+            log.debug("debug 1")
+            log.error("error 2")
+            log.critical("critical 3")
+        finally:
+            log.removeHandler(severe)
+        assert [r.getMessage() for r in list(severe.queue.queue)] == ["error 2", "critical 3"]
+        assert severe.snapshot()["dropped_by_level"] == {"INFO": 1, "DEBUG": 1}
+        assert severe.snapshot()["evicted"] == 2
+
+        record = qh.queue.get_nowait()
+        assert record.getMessage() == "message 0"
+        record.__dict__.update(agent_name="planner", agent_content='{"a": 1}', chat_id="c1", sequence=3)
+        rendered = AgentConversationFormatter().format(record)
+        assert "agent: planner" in rendered and '"a": 1' in rendered and "sequence: 3" in rendered
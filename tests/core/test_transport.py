@@ -32,3 +32,334 @@ class TestSimpleTransport:
         """Verify handler function exists."""
         from mozaiksai.core.transport.simple_transport import handle_user_input_api
         assert callable(handle_user_input_api)
+
+    def test_outbound_queue_coalesces_and_protects(self):
+        """Verify usage deltas coalesce and input requests / tool calls are never dropped."""
+        from mozaiksai.core.transport.outbound_queue import OutboundQueue
+
+        queue = OutboundQueue(maxlen=3)
+        usage = lambda n: {"type": "chat.usage_delta", "data": {"agent_name": "A", "prompt_tokens": n, "total_tokens": n}}
+        queue.push({"type": "chat.input_request", "data": {}})
+        queue.push(usage(5))
+        queue.push(usage(7))
+        queue.push({"type": "chat.text", "data": {"content": "a"}})
+        queue.push({"type": "chat.tool_call", "data": {}})
+        queue.push({"type": "chat.text", "data": {"content": "b"}})
+
+        types = []
+        while queue:
+            types.append(queue.pop())
+        assert [m["type"] for m in types] == ["chat.input_request", "chat.tool_call", "chat.text"]
+        assert queue.coalesced == 1
+        assert queue.dropped == {"chat.usage_delta": 1, "chat.text": 1}
+
+        queue.push(usage(1))
+        queue.push(usage(2))
+        merged = queue.pop()["data"]
+        assert merged["prompt_tokens"] == 3 and merged["coalesced_events"] == 2
+
+    def test_writer_task_isolates_slow_consumer(self, monkeypatch):
+        """Verify producers never wait on a slow socket, the slow flag has hysteresis and saturation closes with 1013."""
+        import asyncio
+        from mozaiksai.core.transport.simple_transport import SimpleTransport
+
+        monkeypatch.setenv("MOZAIKS_WS_QUEUE_HIGH_WATER", "4")
+        monkeypatch.setenv("MOZAIKS_WS_SLOW_CONSUMER_DISCONNECT_SEC", "1")
+        transport = SimpleTransport()
+
+        class _SlowSocket:
+            def __init__(self):
+                self.gate = asyncio.Event()
+                self.sent, self.closed = [], []
+
+            async def send_json(self, message):
+                await self.gate.wait()
+                self.sent.append(message["data"]["content"])
+
+            async def close(self, code):
+                self.closed.append(code)
+
+        async def _produce(content):
+            await transport._queue_message_with_backpressure("c", {"type": "chat.text", "data": {"content": content}})
+            await transport._flush_message_queue("c")
+
+        async def _run():
+            websocket = _SlowSocket()
+            conn = transport.connections["c"] = {"websocket": websocket}
+            transport._start_writer("c", websocket)
+            await _produce("m0")
+            await asyncio.sleep(0.01)  # writer is now blocked inside send_json
+            for i in range(1, 5):
+                await _produce(f"m{i}")
+            queued = len(transport._message_queues["c"])
+            flagged, sent_while_blocked = conn["slow_consumer"], list(websocket.sent)
+
+            # Hysteresis: still slow above half the high-water mark, cleared at half.
+            queue = transport._message_queues["c"]
+            queue.pop()
+            transport._check_slow_consumer("c", queue)
+            above_half = conn["slow_consumer"]
+            queue.pop()
+            transport._check_slow_consumer("c", queue)
+            at_half = conn["slow_consumer"]
+
+            # Saturated past the disconnect window: the socket is closed with 1013.
+            for i in range(5, 7):
+                await _produce(f"m{i}")
+            conn["slow_since"] -= 2
+            await _produce("m7")
+            await asyncio.sleep(0.01)
+
+            websocket.gate.set()
+            await asyncio.sleep(0.01)
+            transport._writer_tasks.pop("c").cancel()
+            return queued, flagged, sent_while_blocked, above_half, at_half, websocket, conn
+
+        queued, flagged, sent_while_blocked, above_half, at_half, websocket, conn = asyncio.run(_run())
+        assert queued == 4 and flagged and sent_while_blocked == []
+        assert above_half and not at_half
+        assert websocket.closed == [1013] and conn["closing"]
+        assert websocket.sent == ["m0", "m3", "m4", "m5", "m6", "m7"]
+        assert not conn["slow_consumer"]  # drained queue clears the flag
+
+    def test_resume_replays_pages_as_batches(self, monkeypatch):
+        """Verify reconnect sends the newest page as one batch and older pages on demand."""
+        import asyncio
+        from mozaiksai.core.transport.resume_groupchat import GroupChatResumer
+
+        monkeypatch.setenv("RESUME_REPLAY_PAGE_SIZE", "4")
+        transcript = [{"role": "assistant", "name": "A", "content": f"m{i}"} for i in range(10)]
+
+        class _Persistence:
+            async def load_transcript_page(self, *, chat_id, app_id, limit, start_index=None, before_index=None):
+                if start_index is not None:
+                    start, end = start_index, min(start_index + limit, len(transcript))
+                else:
+                    end = len(transcript) if before_index is None else min(before_index, len(transcript))
+                    start = max(0, end - limit)
+                return {"status": 0, "total_messages": len(transcript), "start_index": start, "messages": transcript[start:end]}
+
+        sent = []
+
+        async def _send(event, chat_id):
+            sent.append(event)
+
+        resumer = GroupChatResumer()
+        resumer._persistence_manager = _Persistence()
+
+        async def _run():
+            last = await resumer.auto_resume_if_needed(chat_id="c", app_id="app", send_event=_send)
+            await resumer.handle_replay_page_request(chat_id="c", app_id="app", before_index=6, send_event=_send)
+            summary = await resumer.handle_resume_request(chat_id="c", app_id="app", last_client_index=0, send_event=_send)
+            return last, summary
+
+        last, summary = asyncio.run(_run())
+        assert last == 9
+        latest, boundary, older = sent[:3]
+        assert [m["content"] for m in latest["messages"]] == ["m6", "m7", "m8", "m9"]
+        assert latest["has_more_before"] and boundary["kind"] == "resume_boundary"
+        assert (older["direction"], older["start_index"], older["messages"][0]["index"]) == ("older", 2, 2)
+        forward = [e for e in sent[3:] if e["kind"] == "replay_batch"]
+        assert [e["start_index"] for e in forward] == [1, 5, 9]
+        assert summary == {"replayed_messages": 9, "last_message_index": 9, "total_messages": 10}
+
+    def test_replay_buffer_window_and_budget(self):
+        """Verify resumes inside the buffered window are served and evicted ranges fall back."""
+        from mozaiksai.core.transport.replay_buffer import ReplayBuffer
+
+        buffer = ReplayBuffer(per_chat=3, max_bytes=10_000)
+        for seq in range(1, 6):
+            buffer.record("a", seq, {"type": "chat.text", "data": {"sequence": seq, "content": "x"}})
+
+        assert [e["data"]["sequence"] for e in buffer.since("a", 3)] == [4, 5]
+        assert buffer.since("a", 5) == []
+        assert buffer.since("a", 1) is None  # seq 2 was evicted
+        assert buffer.since("a", 9) is None  # client ahead (e.g. counter restarted)
+
+        buffer.record("a", 40, {"type": "chat.text", "data": {"sequence": 40, "content": "x"}})
+        assert buffer.since("a", 5) is None  # counter realigned: old window discarded
+        assert buffer.since("a", 39) == [{"type": "chat.text", "data": {"sequence": 40, "content": "x"}}]
+
+        small = ReplayBuffer(per_chat=10, max_bytes=800)
+        small.record("old", 1, {"data": {"content": "y" * 100}})
+        small.record("new", 1, {"data": {"content": "y" * 100}})
+        small.record("new", 2, {"data": {"content": "y" * 100}})
+        assert small.since("old", 0) is None and len(small.since("new", 0)) == 2
+        assert small.snapshot()["bytes"] <= 800
+
+    def test_memory_resume_uses_transcript_indexes(self):
+        """Verify memory resume maps cursors to persisted indexes across hidden messages and drops on completion."""
+        import asyncio
+        from mozaiksai.core.transport.simple_transport import SimpleTransport
+
+        transport = SimpleTransport()
+        sent = []
+
+        async def _queue(chat_id, message):
+            sent.append(message)
+
+        async def _noop(*args, **kwargs):
+            return None
+
+        transport._queue_message_with_backpressure = _queue
+        transport._flush_message_queue = _noop
+        transport._broadcast_to_websockets = _noop
+
+        def _text(content, **extra):
+            return {"type": "chat.text", "data": {"kind": "text", "content": content, **extra}}
+
+        transport._record_replay("c", _text("before any known index"))
+        transport._record_replay("c", _text("user", index=4))  # persisted at index 4
+        transport._record_replay("c", _text("a5", sequence=2))
+        transport._record_replay("c", _text("hidden6", sequence=3, _mozaiks_hide=True), hidden=True)
+        transport._record_replay("c", {"type": "chat.print", "data": {"content": "not persisted", "sequence": 4}})
+        transport._record_replay("c", _text("a7", sequence=5))
+
+        async def _run():
+            served = await transport._resume_from_memory("c", 4)
+            outside = await transport._resume_from_memory("c", 2)
+            await transport.send_event_to_ui({"kind": "run_complete", "reason": "done"}, "c")
+            return served, outside, await transport._resume_from_memory("c", 4)
+
+        served, outside, after_complete = asyncio.run(_run())
+        assert served and not outside and not after_complete
+        replayed = [m["data"] for m in sent if m["type"] == "chat.text"]
+        assert [(d["content"], d["index"], d["replay"]) for d in replayed] == [("a5", 5, True), ("a7", 7, True)]
+        boundary = next(m["data"] for m in sent if m["type"] == "chat.resume_boundary")
+        assert boundary["last_message_index"] == 7 and boundary["replayed_messages"] == 2
+        assert transport.get_replay_buffer_stats()["chats"] == 0 and "c" not in transport._replay_next_index
+
+    def test_memory_resume_counts_persisted_unsent_messages(self):
+        """Verify filtered agents, seeded echoes and context snapshots keep buffered positions aligned."""
+        import asyncio
+        from mozaiksai.core.transport.simple_transport import SimpleTransport
+
+        transport = SimpleTransport()
+        sent = []
+
+        async def _queue(chat_id, message):
+            sent.append(message)
+
+        async def _noop(*args, **kwargs):
+            return None
+
+        class _Persistence:
+            async def flush_pending_events(self, chat_id):
+                return None
+
+            async def append_sequenced_messages(self, *, chat_id, app_id, messages):
+                return [9]
+
+        class _Context:
+            def set(self, key, value):
+                return None
+
+        transport._queue_message_with_backpressure = _queue
+        transport._flush_message_queue = _noop
+        transport._broadcast_to_websockets = _noop
+        transport._persistence_manager = _Persistence()
+        transport.connections["c"] = {"context": _Context()}
+        transport.should_show_to_user = lambda agent_name, chat_id=None: agent_name != "Hidden"
+
+        async def _run():
+            await transport.send_event_to_ui({"kind": "text", "agent": "user", "content": "u4", "index": 4}, "c")
+            await transport.send_event_to_ui({"kind": "text", "agent": "A", "content": "a5"}, "c")
+            await transport.send_event_to_ui({"kind": "text", "agent": "Hidden", "content": "h6"}, "c")
+            transport.reserve_replay_slot("c")  # seeded user echo persisted at 7
+            await transport.process_component_action(
+                chat_id="c", app_id="app", component_id="form", action_type="submit", action_data={"set": {"k": 1}}
+            )  # context snapshot persisted at 8
+            await transport.send_event_to_ui({"kind": "text", "agent": "A", "content": "a9"}, "c")
+            sent.clear()
+            return await transport._resume_from_memory("c", 4)
+
+        assert asyncio.run(_run())
+        replayed = [m["data"] for m in sent if m["type"] == "chat.text"]
+        assert [(d["content"], d["index"]) for d in replayed] == [("a5", 5), ("h6", 6), ("a9", 9)]
+        assert replayed[1]["ui_visibility"] == "trace"
+        boundary = next(m["data"] for m in sent if m["type"] == "chat.resume_boundary")
+        assert boundary["last_message_index"] == 9 and boundary["replayed_messages"] == 3
+
+    def test_backplane_routes_to_owning_node(self):
+        """Verify envelopes, UI tool responses and user input reach the node that owns them."""
+        import asyncio
+        from mozaiksai.core.transport.backplane import InMemoryBackplane, InMemoryHub
+        from mozaiksai.core.transport.simple_transport import SimpleTransport
+
+        hub = InMemoryHub()
+        socket_node, run_node = SimpleTransport(), SimpleTransport()
+        socket_node._backplane = InMemoryBackplane("socket-node", hub)
+        run_node._backplane = InMemoryBackplane("run-node", hub)
+        delivered, answers = [], []
+
+        async def _queue(chat_id, message):
+            delivered.append((chat_id, message["type"]))
+
+        async def _flush(chat_id):
+            return None
+
+        socket_node._queue_message_with_backpressure = _queue
+        socket_node._flush_message_queue = _flush
+
+        async def _run():
+            await socket_node.start_backplane()
+            await run_node.start_backplane()
+            socket_node.connections["c"] = {"websocket": object()}
+            await socket_node._backplane_claim("socket:c")
+            await run_node._broadcast_to_websockets({"type": "chat.text", "data": {}}, "c")
+
+            future = asyncio.get_running_loop().create_future()
+            run_node.pending_ui_tool_responses["e1"] = future
+            await run_node._backplane_claim("ui_tool:e1")
+            forwarded_tool = await socket_node.submit_ui_tool_response("e1", {"ok": True})
+
+            await run_node.register_input_request("c", "r1", answers.append)
+            forwarded_input = await socket_node.submit_user_input("r1", "hello")
+            missing = await socket_node.submit_user_input("nope", "x")
+            return forwarded_tool, await future, forwarded_input, missing
+
+        forwarded_tool, tool_result, forwarded_input, missing = asyncio.run(_run())
+        assert delivered[0] == ("c", "chat.text")
+        assert forwarded_tool and tool_result == {"ok": True}
+        assert forwarded_input and answers == ["hello"] and not missing
+        assert "r1" not in run_node._input_request_registries["c"]
+        assert [t for _, t in delivered].count("chat.input_ack") == 1  # ack emitted on run node, sent via socket node
+
+    def test_timer_wheel_fires_on_time_and_cancels(self):
+        """Verify timers across wheel levels fire in order, never early, and cancelled ones never fire."""
+        import asyncio
+        from mozaiksai.core.transport.timer_wheel import TimerWheel
+
+        now = [0.0]
+        wheel = TimerWheel(tick_sec=0.1, slots=4, levels=2, clock=lambda: now[0])
+        fired = []
+        for delay in (0.25, 1.0, 3.7, 0.5):  # 3.7s exceeds the 1.6s wheel range and re-cascades
+            wheel.call_later(delay, lambda d=delay: fired.append((d, now[0])))
+        cancelled = wheel.call_later(0.3, fired.append, "cancelled")
+        cancelled.cancel()
+        assert len(wheel) == 4
+
+        while now[0] < 5.0:
+            now[0] = round(now[0] + 0.05, 2)
+            wheel.advance()
+
+        assert [d for d, _ in fired] == [0.25, 0.5, 1.0, 3.7]
+        assert all(d <= at <= d + 0.15 for d, at in fired)
+        assert len(wheel) == 0
+
+        # Coroutine callbacks run as tasks the wheel holds until they finish.
+        async def _ping():
+            await asyncio.sleep(0)
+            fired.append("ping")
+
+        async def _run_coroutine_timer():
+            wheel.call_later(0.1, _ping)
+            now[0] += 0.2
+            wheel.advance()
+            held = wheel.snapshot()["running_callbacks"]
+            await asyncio.sleep(0.01)
+            wheel.stop()
+            return held
+
+        assert asyncio.run(_run_coroutine_timer()) == 1
+        assert fired[-1] == "ping" and wheel.snapshot()["running_callbacks"] == 0